@@ -0,0 +1,101 @@
+"""
+Sequence-backed EAN-13 barcodes in the internal "2" prefix range.
+
+Numbers come from a Redis counter in blocks of BLOCK_SIZE per worker, so allocating a barcode
+needs neither a database round-trip nor an existence check. Each reserved block end is also
+recorded in `tabSeries` as a high-water mark; if the Redis counter is lost it restarts SEED_GAP
+above that mark, past any block a worker may still hold in memory.
+
+The mark is best-effort: it is written in the caller's transaction, so a block reserved by a
+request that rolls back leaves no mark. The Redis counter has still moved past that block, and
+SEED_GAP leaves room for many such blocks should the counter itself be lost.
+"""
+
+import threading
+
+import frappe
+from frappe import _
+
+BARCODE_PREFIX = "2"
+SEQUENCE_DIGITS = 11
+BLOCK_SIZE = 100
+SEED_GAP = 1_000_000
+SEQUENCE_CACHE_KEY = "klik_pos_barcode_sequence"
+SERIES_NAME = "KLIKPOS-EAN13-"
+
+# site -> [next number, end of block (exclusive)], shared by the threads of a worker
+_reserved_blocks = {}
+_reserved_blocks_lock = threading.Lock()
+
+
+def calculate_ean13_check_digit(barcode_12: str) -> str:
+	"""
+	Calculate EAN-13 check digit using the standard algorithm.
+
+	Args:
+		barcode_12: 12-digit barcode without check digit
+
+	Returns:
+		Check digit (single digit as string)
+	"""
+	if len(barcode_12) != 12 or not barcode_12.isdigit():
+		raise ValueError("barcode_12 must be exactly 12 digits")
+
+	sum_even = sum(int(barcode_12[i]) for i in range(1, 12, 2))  # Even positions (1-indexed)
+	sum_odd = sum(int(barcode_12[i]) for i in range(0, 12, 2))  # Odd positions (1-indexed)
+	total = sum_odd + (sum_even * 3)
+	return str((10 - (total % 10)) % 10)
+
+
+def allocate_barcodes(count: int = 1) -> list[str]:
+	"""Allocate count new EAN-13 barcodes, drawing from this worker's reserved block."""
+	numbers = []
+	with _reserved_blocks_lock:
+		block = _reserved_blocks.get(frappe.local.site)
+		while len(numbers) < count:
+			if not block or block[0] >= block[1]:
+				block = _reserve_block(max(BLOCK_SIZE, count - len(numbers)))
+				_reserved_blocks[frappe.local.site] = block
+
+			take = min(count - len(numbers), block[1] - block[0])
+			numbers.extend(range(block[0], block[0] + take))
+			block[0] += take
+
+	return [_to_barcode(number) for number in numbers]
+
+
+def allocate_barcode() -> str:
+	"""Allocate one new EAN-13 barcode."""
+	return allocate_barcodes(1)[0]
+
+
+def _to_barcode(number: int) -> str:
+	barcode_12 = f"{BARCODE_PREFIX}{number:0{SEQUENCE_DIGITS}d}"
+	return barcode_12 + calculate_ean13_check_digit(barcode_12)
+
+
+def _reserve_block(size: int) -> list[int]:
+	"""Atomically take the next size numbers from the shared counter and record the mark."""
+	cache = frappe.cache()
+	key = cache.make_key(SEQUENCE_CACHE_KEY)
+	if cache.get(key) is None:
+		# nx: when several workers find the counter missing only the first seed is kept
+		cache.set(key, _get_high_water_mark() + SEED_GAP, nx=True)
+
+	end = cache.incrby(key, size)
+	if end >= 10**SEQUENCE_DIGITS:
+		frappe.throw(_("The internal barcode range is exhausted"))
+
+	frappe.db.sql(
+		"""
+		INSERT INTO `tabSeries` (name, current) VALUES (%s, %s)
+		ON DUPLICATE KEY UPDATE current = GREATEST(current, VALUES(current))
+		""",
+		(SERIES_NAME, end),
+	)
+	return [end - size + 1, end + 1]
+
+
+def _get_high_water_mark() -> int:
+	rows = frappe.db.sql("SELECT current FROM `tabSeries` WHERE name = %s", SERIES_NAME)
+	return int(rows[0][0]) if rows else 0
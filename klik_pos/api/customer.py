@@ -4,6 +4,10 @@ import frappe
 from erpnext.setup.utils import get_exchange_rate
 from frappe import _
 
+from klik_pos.api.customer_phone import claim_phone, get_customer_by_phone, get_region_code, to_e164
+from klik_pos.api.customer_search import search_customers
+from klik_pos.api.customer_stats import get_customer_stats, get_customer_stats_map
+from klik_pos.api.party import fetch_primary_addresses, fetch_primary_contacts
 from klik_pos.klik_pos.utils import get_current_pos_profile
 
 
@@ -41,118 +45,45 @@ def get_customers(limit: int = 100, start: int = 0, search: str = ""):
 				"total_count": 0,
 			}
 
-		# If there's a search term, broaden the query across name, customer_name, contact email/phone.
-		# Also increase limit for search results to surface older matches.
-		if search:
-			# Sanitize search input for LIKE
-			like_param = f"%{search}%"
-
-			# Build optional customer_type filter
-			cust_type_filter = ""
-			cust_type_params = []
-			if business_type == "B2B":
-				cust_type_filter = "AND c.customer_type = %s"
-				cust_type_params.append("Company")
-			elif business_type == "B2C":
-				cust_type_filter = "AND c.customer_type = %s"
-				cust_type_params.append("Individual")
-			print("Busines type", business_type)
-			# Build optional customer_group filter
-			cust_group_filter = ""
-			cust_group_params = []
-			if customer_group_names:
-				placeholders = ",".join(["%s"] * len(customer_group_names))
-				cust_group_filter = f"AND c.customer_group IN ({placeholders})"
-				cust_group_params.extend(customer_group_names)
-
-			# Build optional user permission filter
-			user_perm_filter = ""
-			user_perm_params = []
-			if permitted_customer_names:
-				placeholders = ",".join(["%s"] * len(permitted_customer_names))
-				user_perm_filter = f"AND c.name IN ({placeholders})"
-				user_perm_params.extend(permitted_customer_names)
+		customer_type = None
+		if business_type == "B2B":
+			customer_type = "Company"
+		elif business_type == "B2C":
+			customer_type = "Individual"
 
-			# Prefer higher cap when searching
-			try:
-				limit_val = int(limit) if limit else 100
-			except Exception:
-				limit_val = 100
-			# Boost limits for search to show more matches
-			limit_val = max(limit_val, 500)
-
-			customer_names = frappe.db.sql(
-				f"""
-                SELECT DISTINCT c.name, c.customer_name, c.customer_type, c.customer_group, c.territory, c.default_currency
-                FROM `tabCustomer` c
-                LEFT JOIN `tabDynamic Link` dl ON dl.link_doctype='Customer' AND dl.link_name=c.name AND dl.parenttype='Contact'
-                LEFT JOIN `tabContact` ct ON ct.name = dl.parent
-                LEFT JOIN `tabContact Email` ce ON ce.parent = ct.name
-                LEFT JOIN `tabContact Phone` cp ON cp.parent = ct.name
-                WHERE (
-                    c.customer_name LIKE %s OR c.name LIKE %s OR
-                    ce.email_id LIKE %s OR cp.phone LIKE %s
-                )
-                {cust_type_filter}
-                {cust_group_filter}
-                {user_perm_filter}
-                ORDER BY c.creation DESC
-                LIMIT %s OFFSET %s
-                """,
-				tuple(
-					[
-						like_param,
-						like_param,
-						like_param,
-						like_param,
-						*cust_type_params,
-						*cust_group_params,
-						*user_perm_params,
-						limit_val,
-						int(start) or 0,
-					]
-				),
-				as_dict=True,
+		# If there's a search term, rank matches on name tokens, phone digits and email from the search index
+		if search:
+			ranked_names, total_count = search_customers(
+				search,
+				customer_type=customer_type,
+				customer_groups=customer_group_names,
+				permitted_customers=permitted_customer_names,
+				limit=int(limit) if limit else 100,
+				start=int(start) if start else 0,
 			)
 
-			# Total count for search
-			total_count_row = frappe.db.sql(
-				f"""
-                SELECT COUNT(DISTINCT c.name) as total
-                FROM `tabCustomer` c
-                LEFT JOIN `tabDynamic Link` dl ON dl.link_doctype='Customer' AND dl.link_name=c.name AND dl.parenttype='Contact'
-                LEFT JOIN `tabContact` ct ON ct.name = dl.parent
-                LEFT JOIN `tabContact Email` ce ON ce.parent = ct.name
-                LEFT JOIN `tabContact Phone` cp ON cp.parent = ct.name
-                WHERE (
-                    c.customer_name LIKE %s OR c.name LIKE %s OR
-                    ce.email_id LIKE %s OR cp.phone LIKE %s
-                )
-                {cust_type_filter}
-                {cust_group_filter}
-                {user_perm_filter}
-                """,
-				tuple(
-					[
-						like_param,
-						like_param,
-						like_param,
-						like_param,
-						*cust_type_params,
-						*cust_group_params,
-						*user_perm_params,
-					]
-				),
-				as_dict=True,
-			)
-			total_count = (total_count_row[0].total if total_count_row else 0) or 0
+			# Load the ranked page in one query and keep the rank order
+			rows_by_name = {}
+			if ranked_names:
+				rows = frappe.get_all(
+					"Customer",
+					filters={"name": ["in", ranked_names]},
+					fields=[
+						"name",
+						"customer_name",
+						"customer_type",
+						"customer_group",
+						"territory",
+						"default_currency",
+					],
+				)
+				rows_by_name = {row.name: row for row in rows}
+			customer_names = [rows_by_name[name] for name in ranked_names if name in rows_by_name]
 		else:
 			# Original logic for when no search term - keep capped limit for performance
 			filters = {}
-			if business_type == "B2B":
-				filters["customer_type"] = "Company"
-			elif business_type == "B2C":
-				filters["customer_type"] = "Individual"
+			if customer_type:
+				filters["customer_type"] = customer_type
 
 			# Add customer group filtering if configured
 			if customer_group_names:
@@ -180,51 +111,30 @@ def get_customers(limit: int = 100, start: int = 0, search: str = ""):
 
 			total_count = frappe.db.count("Customer", filters=filters)
 
-		# Process each customer to get detailed information
-		for cust in customer_names:
-			doc = frappe.get_doc("Customer", cust.name)
-
-			contact = (
-				frappe.db.get_value(
-					"Contact",
-					{"name": doc.customer_primary_contact},
-					["first_name", "last_name", "email_id", "phone", "mobile_no"],
-					as_dict=True,
-				)
-				if doc.customer_primary_contact
-				else None
-			)
-
-			address = (
-				frappe.db.get_value(
-					"Address",
-					{"name": doc.customer_primary_address},
-					["address_line1", "city", "state", "country", "pincode"],
-					as_dict=True,
-				)
-				if doc.customer_primary_address
-				else None
-			)
+		# Enrich the page with a constant number of set-based queries
+		page_names = [cust.name for cust in customer_names]
+		contacts_map = fetch_primary_contacts("Customer", page_names)
+		addresses_map = fetch_primary_addresses("Customer", page_names)
+		stats_map = get_customer_stats_map(page_names)
 
-			# Get customer statistics
-			stats = get_customer_statistics(doc.name)
-			customer_stats = stats.get("data", {}) if stats.get("success") else {}
+		for cust in customer_names:
+			customer_stats = stats_map.get(cust.name, {})
 
 			result.append(
 				{
-					"name": doc.name,
-					"customer_name": doc.customer_name,
-					"customer_type": doc.customer_type,
-					"customer_group": doc.customer_group,
-					"territory": doc.territory,
-					"contact": contact,
-					"address": address,
-					"default_currency": doc.default_currency,
+					"name": cust.name,
+					"customer_name": cust.customer_name,
+					"customer_type": cust.customer_type,
+					"customer_group": cust.customer_group,
+					"territory": cust.territory,
+					"contact": contacts_map.get(cust.name),
+					"address": addresses_map.get(cust.name),
+					"default_currency": cust.default_currency,
 					"company_currency": company_currency,
 					"custom_total_orders": customer_stats.get("total_orders", 0),
 					"custom_total_spent": customer_stats.get("total_spent", 0),
 					"custom_last_visit": customer_stats.get("last_visit"),
-					# "exchange_rate": get_currency_exchange_rate(company_currency, doc.default_currency)
+					# "exchange_rate": get_currency_exchange_rate(company_currency, cust.default_currency)
 				}
 			)
 
@@ -484,9 +394,17 @@ def get_or_create_customer(name, email, phone, country, name_arabic="", data=Non
 		customer_group = data.get("customer_group", "All Customer Groups") if data else "All Customer Groups"
 		territory = data.get("territory", country) if data else country
 
-		existing = frappe.get_all("Customer", filters={"customer_name": name}, fields=["name"])
-		if existing:
-			doc = frappe.get_doc("Customer", existing[0]["name"])
+		# Store the number in E.164 so the phone index and messaging read it the same way
+		phone_e164 = to_e164(phone, get_region_code(country))
+		phone = phone_e164 or phone
+
+		existing_name = get_customer_by_phone(phone_e164) if phone_e164 else None
+		if not existing_name:
+			existing = frappe.get_all("Customer", filters={"customer_name": name}, fields=["name"], limit=1)
+			existing_name = existing[0]["name"] if existing else None
+
+		if existing_name:
+			doc = frappe.get_doc("Customer", existing_name)
 			doc.email_id = email
 			doc.mobile_no = phone
 			doc.custom_country = country
@@ -528,7 +446,14 @@ def get_or_create_customer(name, email, phone, country, name_arabic="", data=Non
 					),
 				}
 			)
+			frappe.db.savepoint("klik_pos_new_customer")
 			doc.insert()
+
+			# Another till may have just created a customer with the same number: use theirs
+			owner = claim_phone(phone_e164, doc.name) if phone_e164 else doc.name
+			if owner != doc.name:
+				frappe.db.rollback(save_point="klik_pos_new_customer")
+				doc = frappe.get_doc("Customer", owner)
 		return doc
 	except Exception as e:
 		frappe.log_error(frappe.get_traceback(), "Error in get_or_create_customer")
@@ -592,10 +517,11 @@ def get_territories():
 
 
 def create_or_update_contact(customer, customer_name, email, phone):
-	existing_contact = frappe.get_all("Contact", filters={"email_id": email, "link_name": customer}, limit=1)
+	phone = to_e164(phone, get_region_code()) or phone
+	existing_contact = _find_customer_contact(customer, email, phone)
 
 	if existing_contact:
-		doc = frappe.get_doc("Contact", existing_contact[0].name)
+		doc = frappe.get_doc("Contact", existing_contact)
 		doc.first_name = customer_name
 		doc.phone = phone
 		doc.email_id = email
@@ -615,6 +541,30 @@ def create_or_update_contact(customer, customer_name, email, phone):
 	return doc
 
 
+def _find_customer_contact(customer, email, phone):
+	"""Return the customer's contact with the same email or the same normalized phone number."""
+	contacts = frappe.db.sql(
+		"""
+		SELECT ct.name, ct.email_id, ct.phone, ct.mobile_no
+		FROM `tabDynamic Link` dl
+		JOIN `tabContact` ct ON ct.name = dl.parent
+		WHERE dl.parenttype = 'Contact' AND dl.link_doctype = 'Customer' AND dl.link_name = %s
+		ORDER BY ct.is_primary_contact DESC, ct.creation ASC
+		""",
+		(customer,),
+		as_dict=True,
+	)
+
+	region = get_region_code()
+	email = (email or "").strip().lower()
+	for contact in contacts:
+		if email and (contact.email_id or "").strip().lower() == email:
+			return contact.name
+		if phone and phone in {to_e164(contact.phone, region), to_e164(contact.mobile_no, region)}:
+			return contact.name
+	return None
+
+
 def create_or_update_address(customer_id, customer_name, address_data, country):
 	"""Create or update primary Address for the customer."""
 	if not address_data:
@@ -748,78 +698,16 @@ def update_customer(customer_id, customer_data):
 def get_customer_statistics(customer_id):
 	"""Get customer statistics including total orders, total spent, and outstanding amount"""
 	try:
-		# Get total invoices (orders) for the customer
-		total_orders = frappe.db.count(
-			"Sales Invoice",
-			filters={
-				"customer": customer_id,
-				"docstatus": 1,
-				"is_return": 0,
-				"status": ["!=", "Cancelled"],
-				"custom_pos_opening_entry": ["!=", ""],  # Only POS-created invoices
-			},
-		)
-
-		# Get total amount spent by the customer
-		total_spent_result = frappe.db.sql(
-			"""
-            SELECT COALESCE(SUM(grand_total), 0) as total_spent
-            FROM `tabSales Invoice`
-            WHERE customer = %s
-            AND docstatus = 1
-            AND is_return = 0
-            AND status != 'Cancelled'
-            AND custom_pos_opening_entry IS NOT NULL
-            AND custom_pos_opening_entry != ''
-        """,
-			(customer_id,),
-			as_dict=True,
-		)
-
-		total_spent = total_spent_result[0].total_spent if total_spent_result else 0
-
-		# Get last visit date (most recent invoice date)
-		last_visit_result = frappe.db.sql(
-			"""
-            SELECT MAX(posting_date) as last_visit
-            FROM `tabSales Invoice`
-            WHERE customer = %s
-            AND docstatus = 1
-            AND is_return = 0
-            AND status != 'Cancelled'
-            AND custom_pos_opening_entry IS NOT NULL
-            AND custom_pos_opening_entry != ''
-        """,
-			(customer_id,),
-			as_dict=True,
-		)
-
-		last_visit = last_visit_result[0].last_visit if last_visit_result else None
-
-		# Get total outstanding amount (overdue + unpaid + partially paid)
-		# Include both regular invoices and returns to get the NET outstanding
-		# Returns have negative outstanding_amount which offsets the original invoice
-		outstanding_result = frappe.db.sql(
-			"""
-            SELECT COALESCE(SUM(outstanding_amount), 0) as total_outstanding
-            FROM `tabSales Invoice`
-            WHERE customer = %s
-            AND docstatus = 1
-        """,
-			(customer_id,),
-			as_dict=True,
-		)
-
-		# Only show positive outstanding (if returns exceed sales, don't show negative due)
-		total_outstanding = max(0, outstanding_result[0].total_outstanding if outstanding_result else 0)
+		# Read the rollup maintained on Sales Invoice / Payment Entry submit and cancel
+		stats = get_customer_stats(customer_id)
 
 		return {
 			"success": True,
 			"data": {
-				"total_orders": total_orders,
-				"total_spent": total_spent,
-				"last_visit": last_visit,
-				"total_outstanding": total_outstanding,
+				"total_orders": stats["total_orders"],
+				"total_spent": stats["total_spent"],
+				"last_visit": stats["last_visit"],
+				"total_outstanding": stats["total_outstanding"],
 			},
 		}
 
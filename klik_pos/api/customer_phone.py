@@ -0,0 +1,203 @@
+import re
+
+import frappe
+import phonenumbers
+from frappe.utils import now_datetime
+
+CUSTOMER_PHONE_DOCTYPE = "Klik Customer Phone"
+
+
+def get_region_code(country=None):
+	"""Return the ISO region code (e.g. 'KE') of a Country, falling back to the system country."""
+	country = country or frappe.db.get_single_value("System Settings", "country")
+	if not country:
+		return None
+
+	code = frappe.get_cached_value("Country", country, "code")
+	return code.upper() if code else None
+
+
+def to_e164(phone, region=None):
+	"""
+	Normalize a phone number to E.164, e.g. '0712 345 678' with region 'KE' -> '+254712345678'.
+
+	Numbers written with a leading + or 00 are parsed as international; others are parsed
+	in the given region. Returns None when the input cannot be read as a phone number.
+	"""
+	phone = (phone or "").strip()
+	if phone.startswith("00"):
+		phone = f"+{phone[2:]}"
+	if not re.search(r"\d", phone):
+		return None
+
+	try:
+		parsed = phonenumbers.parse(phone, None if phone.startswith("+") else region)
+	except phonenumbers.NumberParseException:
+		parsed = None
+
+	if parsed and phonenumbers.is_possible_number(parsed):
+		return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+
+	# Without a usable region keep an explicit international number as its digits
+	digits = re.sub(r"\D", "", phone)
+	if phone.startswith("+") and 8 <= len(digits) <= 15:
+		return f"+{digits}"
+	return None
+
+
+def format_for_messaging(phone, country=None):
+	"""Return the number as international digits without '+', as WhatsApp and SMS gateways expect."""
+	e164 = to_e164(phone, get_region_code(country))
+	if e164:
+		return e164[1:]
+	return re.sub(r"\D", "", phone or "")
+
+
+def get_customer_by_phone(phone, country=None):
+	"""Return the customer owning the phone number, using one primary-key lookup."""
+	e164 = to_e164(phone, get_region_code(country))
+	if not e164:
+		return None
+	return frappe.db.get_value(CUSTOMER_PHONE_DOCTYPE, e164, "customer")
+
+
+@frappe.whitelist()
+def find_customer_by_phone(phone, country=None):
+	"""Find the customer for a phone number entered at checkout."""
+	try:
+		customer = get_customer_by_phone(phone, country)
+		if not customer:
+			return {"success": True, "data": None}
+
+		data = frappe.db.get_value(
+			"Customer",
+			customer,
+			["name", "customer_name", "customer_type", "customer_group", "email_id", "mobile_no"],
+			as_dict=True,
+		)
+		return {"success": True, "data": data}
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Error finding customer by phone")
+		return {"success": False, "error": str(e)}
+
+
+def claim_phone(e164, customer):
+	"""
+	Register an E.164 number for the customer unless another customer already owns it.
+
+	The phone is the primary key of the index, so two tills creating a customer for the same
+	number serialize on it: the second waits for the first to commit and then sees its owner.
+
+	Returns:
+		the customer that owns the number afterwards
+	"""
+	_insert_phones({(customer, e164)})
+	# A locking read sees the latest committed owner, not this transaction's snapshot
+	owner = frappe.db.sql(
+		"SELECT customer FROM `tabKlik Customer Phone` WHERE name = %s FOR UPDATE",
+		(e164,),
+	)
+	return owner[0][0] if owner else None
+
+
+def index_customer_on_update(doc, method=None):
+	"""Customer doc_event: refresh the phone numbers of the saved customer."""
+	index_customer_phones([doc.name])
+
+
+def remove_customer_phones(doc, method=None):
+	"""Customer doc_event: release the phone numbers of a deleted customer."""
+	frappe.db.delete(CUSTOMER_PHONE_DOCTYPE, {"customer": doc.name})
+
+
+def index_contact_customers(doc, method=None):
+	"""Contact doc_event: refresh the phone numbers of every customer the contact is linked to."""
+	customers = [link.link_name for link in doc.get("links", []) if link.link_doctype == "Customer"]
+	if customers:
+		index_customer_phones(customers)
+
+
+def index_customer_phones(customer_names):
+	"""
+	Bring the phone index of the given customers in line with their Customer and Contact numbers.
+
+	Numbers already owned by a different customer are left with their first owner.
+	"""
+	customer_names = list({name for name in customer_names if name})
+	if not customer_names:
+		return
+
+	wanted = _collect_phones(customer_names)
+	existing = frappe.db.sql(
+		"SELECT customer, name FROM `tabKlik Customer Phone` WHERE customer IN %(names)s",
+		{"names": tuple(customer_names)},
+	)
+	stale = [phone for customer, phone in existing if (customer, phone) not in wanted]
+	if stale:
+		frappe.db.delete(CUSTOMER_PHONE_DOCTYPE, {"name": ["in", stale]})
+
+	_insert_phones(wanted - set(existing))
+
+
+def rebuild_customer_phone_index(chunk_size=2000):
+	"""
+	Rebuild the whole phone index in chunks.
+
+	Run with `bench --site <site> execute klik_pos.api.customer_phone.rebuild_customer_phone_index`.
+	"""
+	frappe.db.sql("DELETE FROM `tabKlik Customer Phone`")
+	customer_names = frappe.get_all("Customer", pluck="name", order_by="creation asc")
+
+	for start in range(0, len(customer_names), chunk_size):
+		_insert_phones(_collect_phones(customer_names[start : start + chunk_size]))
+		frappe.db.commit()
+
+	print(f"✅ Customer phone index rebuilt for {len(customer_names)} customers")
+	return len(customer_names)
+
+
+def _collect_phones(customer_names):
+	"""Collect (customer, E.164 phone) pairs from customers and their linked contacts."""
+	rows = frappe.db.sql(
+		"""
+		SELECT name as customer, mobile_no as phone
+		FROM `tabCustomer`
+		WHERE name IN %(names)s
+		UNION ALL
+		SELECT dl.link_name, ct.mobile_no
+		FROM `tabDynamic Link` dl
+		JOIN `tabContact` ct ON ct.name = dl.parent
+		WHERE dl.parenttype = 'Contact' AND dl.link_doctype = 'Customer' AND dl.link_name IN %(names)s
+		UNION ALL
+		SELECT dl.link_name, cp.phone
+		FROM `tabDynamic Link` dl
+		JOIN `tabContact Phone` cp ON cp.parent = dl.parent
+		WHERE dl.parenttype = 'Contact' AND dl.link_doctype = 'Customer' AND dl.link_name IN %(names)s
+		""",
+		{"names": tuple(customer_names)},
+		as_dict=True,
+	)
+
+	# Stored numbers without a country code are read in the system country
+	region = get_region_code()
+	phones = set()
+	for row in rows:
+		e164 = to_e164(row.phone, region)
+		if e164:
+			phones.add((row.customer, e164))
+	return phones
+
+
+def _insert_phones(phones):
+	"""Insert (customer, phone) pairs, skipping numbers that already have an owner."""
+	if not phones:
+		return
+
+	now = now_datetime()
+	user = frappe.session.user
+	frappe.db.bulk_insert(
+		CUSTOMER_PHONE_DOCTYPE,
+		["name", "phone", "customer", "owner", "modified_by", "creation", "modified"],
+		[(phone, phone, customer, user, user, now, now) for customer, phone in phones],
+		ignore_duplicates=True,
+	)
@@ -0,0 +1,67 @@
+from klik_pos.api.party_search import PartySearchIndex
+
+SEARCH_TERM_DOCTYPE = "Klik Customer Search Term"
+
+CUSTOMER_SEARCH_INDEX = PartySearchIndex("Customer", SEARCH_TERM_DOCTYPE)
+
+
+def reindex_customer_on_update(doc, method=None):
+	"""Customer doc_event: rebuild the search terms of the saved customer."""
+	CUSTOMER_SEARCH_INDEX.reindex([doc.name])
+
+
+def reindex_customer_on_rename(doc, method=None, old=None, new=None, merge=False):
+	"""Customer doc_event: index the new name; renaming already moved the terms' customer links."""
+	CUSTOMER_SEARCH_INDEX.reindex([new or doc.name])
+
+
+def remove_customer_from_index(doc, method=None):
+	"""Customer doc_event: drop the search terms of a deleted customer."""
+	CUSTOMER_SEARCH_INDEX.remove(doc.name)
+
+
+def reindex_contact_customers(doc, method=None):
+	"""Contact doc_event: rebuild the search terms of every customer the contact is linked to."""
+	CUSTOMER_SEARCH_INDEX.reindex_contact(doc)
+
+
+def reindex_customers(customer_names):
+	"""Replace the search terms of the given customers with freshly collected ones."""
+	CUSTOMER_SEARCH_INDEX.reindex(customer_names)
+
+
+def rebuild_customer_search_index(chunk_size=2000):
+	"""
+	Rebuild the whole customer search index in chunks.
+
+	Run with `bench --site <site> execute klik_pos.api.customer_search.rebuild_customer_search_index`.
+	"""
+	count = CUSTOMER_SEARCH_INDEX.rebuild(chunk_size)
+	print(f"✅ Customer search index rebuilt for {count} customers")
+	return count
+
+
+def search_customers(
+	search, customer_type=None, customer_groups=None, permitted_customers=None, limit=20, start=0
+):
+	"""
+	Rank customers matching the search text on name tokens, phone digits and emails.
+
+	Returns:
+		(list of customer names in rank order, total number of matches)
+	"""
+	conditions = []
+	values = {}
+	if customer_type:
+		conditions.append("p.customer_type = %(customer_type)s")
+		values["customer_type"] = customer_type
+	if customer_groups:
+		conditions.append("p.customer_group IN %(customer_groups)s")
+		values["customer_groups"] = tuple(customer_groups)
+	if permitted_customers:
+		conditions.append("p.name IN %(permitted_customers)s")
+		values["permitted_customers"] = tuple(permitted_customers)
+
+	return CUSTOMER_SEARCH_INDEX.search(
+		search, conditions=conditions, values=values, limit=limit, start=start
+	)
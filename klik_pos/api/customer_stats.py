@@ -0,0 +1,85 @@
+import frappe
+
+from klik_pos.api.party_stats import PartyStats
+
+CUSTOMER_STATS_DOCTYPE = "Klik Customer Stats"
+
+# Only POS-created, non-return invoices count towards orders, spend and last visit
+POS_SALE_CONDITIONS = """
+	docstatus = 1
+	AND is_return = 0
+	AND status != 'Cancelled'
+	AND custom_pos_opening_entry IS NOT NULL
+	AND custom_pos_opening_entry != ''
+"""
+
+CUSTOMER_STATS = PartyStats(
+	"Customer",
+	invoice_doctype="Sales Invoice",
+	stats_doctype=CUSTOMER_STATS_DOCTYPE,
+	amount_field="total_spent",
+	date_field="last_visit",
+	conditions=POS_SALE_CONDITIONS,
+	pos_only=True,
+	clamp_outstanding=True,
+)
+
+
+def update_customer_stats_on_submit(doc, method=None):
+	"""Add a submitted Sales Invoice to its customer's rollup."""
+	CUSTOMER_STATS.apply_invoice(doc, 1)
+
+
+def update_customer_stats_on_cancel(doc, method=None):
+	"""Remove a cancelled Sales Invoice from its customer's rollup."""
+	CUSTOMER_STATS.apply_invoice(doc, -1)
+
+
+def update_customer_stats_on_payment(doc, method=None):
+	"""Refresh outstanding for every customer a Payment Entry touches."""
+	CUSTOMER_STATS.apply_payment(doc)
+
+
+def compute_customer_stats(customer):
+	"""Compute a customer's rollup directly from Sales Invoices."""
+	return CUSTOMER_STATS.compute(customer)
+
+
+def get_customer_stats_map(customer_names):
+	"""
+	Batch-read rollups for the given customers with one indexed query.
+
+	Returns:
+		dict of customer -> {total_orders, total_spent, last_visit, total_outstanding}
+	"""
+	return CUSTOMER_STATS.get_map(customer_names)
+
+
+def get_customer_stats(customer):
+	"""Read one customer's rollup, computing and storing it the first time it is needed."""
+	return CUSTOMER_STATS.get(customer)
+
+
+def backfill_customer_stats(chunk_size=1000):
+	"""
+	Rebuild every customer's rollup from Sales Invoices with two grouped scans.
+
+	Run with `bench --site <site> execute klik_pos.api.customer_stats.backfill_customer_stats`.
+	"""
+	count = CUSTOMER_STATS.backfill(chunk_size)
+	print(f"✅ Customer statistics rebuilt for {count} customers")
+	return count
+
+
+@frappe.whitelist()
+def enqueue_customer_stats_backfill():
+	"""Queue a full rebuild of customer statistics (System Manager only)."""
+	frappe.only_for("System Manager")
+	frappe.enqueue(
+		"klik_pos.api.customer_stats.backfill_customer_stats",
+		queue="long",
+		timeout=3600,
+		job_id="klik_pos_customer_stats_backfill",
+		deduplicate=True,
+	)
+	return {"success": True}
@@ -3,13 +3,14 @@ import json
 import frappe
 from frappe.utils import fmt_money, now
 
-from klik_pos.klik_pos.utils import get_current_pos_profile
+from klik_pos.api.outbound import enqueue_message
+from klik_pos.api.receipt import get_receipt_file_url, get_receipt_print_format, queue_invoice_delivery
 
 
 @frappe.whitelist()
 def send_invoice_email(**kwargs):
 	"""
-	Accepts frontend payload and sends invoice email with PDF attachment.
+	Accepts frontend payload and queues the invoice email with its receipt PDF attached.
 	"""
 	data = kwargs
 
@@ -20,46 +21,51 @@ def send_invoice_email(**kwargs):
 	if not (email and invoice_no):
 		frappe.throw("Email and invoice number are required.")
 
-	try:
-		doc = frappe.get_doc("Sales Invoice", invoice_no)
-
-		pos_profile = get_current_pos_profile()
-		print_format = pos_profile.custom_pos_printformat or "Standard"
-
-		pdf_data = frappe.get_print("Sales Invoice", doc.name, print_format=print_format, as_pdf=True)
-
-		invoice_amount = fmt_money(doc.rounded_total or doc.grand_total, currency=doc.currency)
-
-		subject = f"Invoice {doc.name} from {frappe.defaults.get_user_default('Company')}"
-		message = f"""
-			<p>Dear {customer_name},</p>
-			<p>Please find attached your invoice <b>{doc.name}</b>.</p>
-			<p>The total amount due is <b>{invoice_amount}</b>.</p>
-			<p>Thank you for your business.</p>
-		"""
-
-		attachments = [{"fname": f"{doc.name}.pdf", "fcontent": pdf_data}]
-
-		frappe.sendmail(
-			recipients=[email],
-			subject=subject,
-			message=message,
-			attachments=attachments,
-			delayed=False,
-		)
+	if not frappe.db.exists("Sales Invoice", invoice_no):
+		frappe.throw(f"Sales Invoice {invoice_no} not found.")
+
+	job_id = queue_invoice_delivery(
+		"email",
+		"klik_pos.api.email.deliver_invoice_email",
+		invoice_no,
+		email=email,
+		customer_name=customer_name,
+		invoice_no=invoice_no,
+	)
+
+	return {
+		"status": "queued",
+		"job_id": job_id,
+		"recipients": [email],
+		"invoice": invoice_no,
+		"timestamp": now(),
+	}
+
+
+def deliver_invoice_email(email, customer_name, invoice_no):
+	"""Delivery job: queue the invoice email with the stored receipt PDF attached."""
+	doc = frappe.get_doc("Sales Invoice", invoice_no)
+	receipt_url = get_receipt_file_url(doc.name, get_receipt_print_format(doc.pos_profile))
+
+	invoice_amount = fmt_money(doc.rounded_total or doc.grand_total, currency=doc.currency)
+
+	subject = f"Invoice {doc.name} from {frappe.defaults.get_user_default('Company')}"
+	message = f"""
+		<p>Dear {customer_name},</p>
+		<p>Please find attached your invoice <b>{doc.name}</b>.</p>
+		<p>The total amount due is <b>{invoice_amount}</b>.</p>
+		<p>Thank you for your business.</p>
+	"""
 
-		return {
-			"status": "success",
+	return enqueue_message(
+		"email",
+		{
 			"recipients": [email],
-			"invoice": invoice_no,
-			"amount": invoice_amount,
-			"print_format": print_format,
-			"timestamp": now(),
-		}
-
-	except Exception as e:
-		frappe.log_error(frappe.get_traceback(), "Send Invoice Email Failed")
-		frappe.throw(f"Failed to send invoice email: {e!s}")
+			"subject": subject,
+			"message": message,
+			"attachments": [{"fname": f"{doc.name}.pdf", "file_url": receipt_url}],
+		},
+	)
 
 
 @frappe.whitelist()
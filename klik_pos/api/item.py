@@ -1,81 +1,20 @@
 import frappe
 from erpnext.accounts.doctype.pricing_rule.pricing_rule import apply_pricing_rule
-from erpnext.stock.doctype.batch.batch import get_batch_qty
 from erpnext.stock.utils import get_stock_balance
 from frappe import _
 
+from klik_pos.api.barcode import allocate_barcode
+from klik_pos.api.item_uom import (
+	derive_uom_prices,
+	fetch_selling_prices,
+	get_conversion_factor,
+	get_uom_matrix,
+)
 from klik_pos.api.sales_invoice import get_current_pos_opening_entry
+from klik_pos.api.serial_index import check_serials, get_available_serials, lookup_serial
 from klik_pos.klik_pos.utils import get_current_pos_profile
 
 
-def _calculate_ean13_check_digit(barcode_12: str) -> str:
-	"""
-	Calculate EAN-13 check digit using the standard algorithm.
-	
-	Args:
-		barcode_12: 12-digit barcode without check digit
-		
-	Returns:
-		Check digit (single digit as string)
-	"""
-	if len(barcode_12) != 12 or not barcode_12.isdigit():
-		raise ValueError("barcode_12 must be exactly 12 digits")
-	
-	# EAN-13 check digit calculation
-	sum_even = sum(int(barcode_12[i]) for i in range(1, 12, 2))  # Even positions (1-indexed)
-	sum_odd = sum(int(barcode_12[i]) for i in range(0, 12, 2))    # Odd positions (1-indexed)
-	total = sum_odd + (sum_even * 3)
-	check_digit = (10 - (total % 10)) % 10
-	
-	return str(check_digit)
-
-
-def _generate_unique_barcode() -> str:
-	"""
-	Generate a unique EAN-13 standard barcode.
-	
-	Uses a combination of timestamp and random number to ensure uniqueness.
-	Format: 2 (internal use prefix) + 6 digits (timestamp) + 5 digits (random) + 1 check digit = 13 digits
-	
-	Returns:
-		13-digit EAN-13 barcode string
-	"""
-	import time
-	import random
-	
-	max_attempts = 100
-	for attempt in range(max_attempts):
-		# Use prefix 2 for internal use (not assigned to any country)
-		prefix = "2"
-		
-		# Get timestamp (last 6 digits of Unix timestamp)
-		timestamp_part = str(int(time.time()))[-6:]
-		
-		# Add random 5 digits for uniqueness (total: 1 prefix + 6 timestamp + 5 random = 12 digits)
-		random_part = str(random.randint(10000, 99999))
-		
-		# Combine to make 12 digits (prefix + timestamp + random)
-		barcode_12 = prefix + timestamp_part + random_part
-		
-		# Calculate check digit
-		check_digit = _calculate_ean13_check_digit(barcode_12)
-		
-		# Full 13-digit barcode
-		barcode = barcode_12 + check_digit
-		
-		# Check if barcode already exists
-		if not frappe.db.exists("Item Barcode", {"barcode": barcode}):
-			return barcode
-	
-	# If we couldn't generate a unique barcode after max attempts, use a more random approach
-	import secrets
-	prefix = "2"
-	random_10 = str(secrets.randbelow(10000000000)).zfill(10)
-	barcode_12 = prefix + random_10
-	check_digit = _calculate_ean13_check_digit(barcode_12)
-	return barcode_12 + check_digit
-
-
 def _detect_barcode_type(barcode: str) -> str | None:
 	"""
 	Auto-detect barcode type based on format.
@@ -154,37 +93,20 @@ def fetch_item_balance(item_code: str, warehouse: str) -> float:
 		return 0
 
 
-def _get_uom_conversion_factor(item_code: str, uom: str) -> float | None:
-	"""Get conversion factor for a specific UOM from Item UOM table."""
-	try:
-		conversion_factor = frappe.db.get_value(
-			"UOM",
-			{"parent": item_code, "uom": uom},
-			"conversion_factor",
-		)
-		return float(conversion_factor) if conversion_factor else None
-	except Exception:
-		return None
-
-
 def _calculate_price_from_default_uom(
 	item_code: str, requested_uom: str, price_list: str | None, customer: str | None
 ) -> dict | None:
 	"""
 	Calculate price for requested UOM from default UOM (stock_uom) using conversion factor.
 	Returns None if calculation is not possible.
-	This function directly queries for default UOM price to avoid recursion.
 	"""
 	try:
-		item_doc = frappe.get_doc("Item", item_code)
-		default_uom = item_doc.stock_uom
-
+		entry = get_uom_matrix([item_code]).get(item_code)
 		# If requested UOM is already the default UOM, no conversion needed
-		if requested_uom == default_uom:
+		if not entry or requested_uom == entry["stock_uom"]:
 			return None
 
-		# Get conversion factor for requested UOM
-		conversion_factor = _get_uom_conversion_factor(item_code, requested_uom)
+		conversion_factor = entry["factors"].get(requested_uom)
 		if not conversion_factor:
 			return None
 
@@ -192,44 +114,15 @@ def _calculate_price_from_default_uom(
 		if not price_list:
 			price_list = get_price_list_with_customer_priority(customer)
 
-		# Directly query for default UOM price to avoid recursion
-		default_uom_filters = {
-			"item_code": item_code,
-			"uom": default_uom,
-			"selling": 1,
-		}
-
-		if price_list and price_list.strip():
-			default_uom_filters["price_list"] = price_list
-
-		default_price_doc = frappe.get_value(
-			"Item Price",
-			default_uom_filters,
-			["price_list_rate", "currency"],
-			as_dict=True,
-		)
-
-		# If no price found with price_list, try without price_list filter
-		if not default_price_doc and price_list:
-			default_uom_filters.pop("price_list", None)
-			default_price_doc = frappe.get_value(
-				"Item Price",
-				default_uom_filters,
-				["price_list_rate", "currency"],
-				as_dict=True,
-				order_by="modified desc",
-			)
-
-		if default_price_doc and default_price_doc.price_list_rate:
-			# Calculate price: default_uom_price * conversion_factor
-			calculated_price = float(default_price_doc.price_list_rate) * conversion_factor
+		default_price = fetch_selling_prices([item_code], price_list).get((item_code, entry["stock_uom"]))
+		if default_price:
 			symbol = (
-				frappe.db.get_value("Currency", default_price_doc.currency, "symbol")
-				or default_price_doc.currency
+				frappe.get_cached_value("Currency", default_price["currency"], "symbol")
+				or default_price["currency"]
 			)
 			return {
-				"price": calculated_price,
-				"currency": default_price_doc.currency,
+				"price": default_price["price"] * conversion_factor,
+				"currency": default_price["currency"],
 				"currency_symbol": symbol,
 			}
 
@@ -308,7 +201,7 @@ def fetch_item_price(
 				# If UOM is specified and different from stock_uom, apply conversion factor
 				valuation_price = item_doc.valuation_rate or 0
 				if uom and uom != item_doc.stock_uom:
-					conversion_factor = _get_uom_conversion_factor(item_code, uom)
+					conversion_factor = get_conversion_factor(item_code, uom)
 					if conversion_factor:
 						valuation_price = float(valuation_price) * conversion_factor
 
@@ -358,7 +251,7 @@ def fetch_item_price(
 			# If UOM is specified and different from stock_uom, apply conversion factor
 			valuation_price = item_doc.valuation_rate or 0
 			if uom and uom != item_doc.stock_uom:
-				conversion_factor = _get_uom_conversion_factor(item_code, uom)
+				conversion_factor = get_conversion_factor(item_code, uom)
 				if conversion_factor:
 					valuation_price = float(valuation_price) * conversion_factor
 
@@ -508,19 +401,11 @@ def get_item_by_identifier(code: str):
 				matched_type = "batch"
 				matched_value = code
 
-		# 3) Try Serial No
+		# 3) Try Serial No through the serial index (primary-key lookup)
 		if not item_row:
-			# In ERPNext, the Serial No doctype has field name=serial_no; item_code links to Item
-			item_row = frappe.db.sql(
-				"""
-                SELECT s.item_code as item_code
-                FROM `tabSerial No` s
-                WHERE s.name = %s OR s.serial_no = %s
-                """,
-				(code, code),
-				as_dict=True,
-			)
-			if item_row:
+			serial = lookup_serial(code)
+			if serial:
+				item_row = [serial]
 				matched_type = "serial"
 				matched_value = code
 
@@ -583,6 +468,21 @@ def _get_pos_context():
 	return pos_doc, warehouse, price_list, hide_unavailable
 
 
+def get_default_price_lists():
+	"""Return {"selling": (price list, currency), "buying": (price list, currency)} for the defaults."""
+	price_lists = {}
+	for key, settings, fieldname in (
+		("selling", "Selling Settings", "selling_price_list"),
+		("buying", "Buying Settings", "buying_price_list"),
+	):
+		price_list = frappe.db.get_single_value(settings, fieldname) or frappe.db.get_value(
+			"Price List", {key: 1, "enabled": 1}, "name"
+		)
+		if price_list:
+			price_lists[key] = (price_list, frappe.get_cached_value("Price List", price_list, "currency"))
+	return price_lists
+
+
 def _fetch_batch_stock(item_codes: list, warehouse: str) -> dict:
 	"""Fetch stock balances for multiple items in optimized batch queries."""
 	if not item_codes or not warehouse:
@@ -681,7 +581,7 @@ def _fetch_batch_prices(item_codes: list, price_list: str | None, uom_map: dict)
 				if not new_uom_match or existing_uom_match:
 					continue
 
-			symbol = frappe.db.get_value("Currency", row["currency"], "symbol") or row["currency"]
+			symbol = frappe.get_cached_value("Currency", row["currency"], "symbol") or row["currency"]
 			price_map[item_code] = {
 				"price": row["price_list_rate"] or 0,
 				"currency": row["currency"] or default_currency,
@@ -846,16 +746,16 @@ def get_items_with_balance_and_price(
 		if getattr(pos_doc, "item_groups", None):
 			item_group_names = [d.item_group for d in pos_doc.item_groups if d.item_group]
 			if item_group_names:
-				placeholders = ", ".join(["%s"] * len(item_group_names))
-				base_query.append(f"AND i.item_group IN ({placeholders})")
-				count_query.append(f"AND i.item_group IN ({placeholders})")
+				group_condition = _item_group_subtree_condition(len(item_group_names))
+				base_query.append(f"AND {group_condition}")
+				count_query.append(f"AND {group_condition}")
 				params_list.extend(item_group_names)
 				count_params.extend(item_group_names)
 
-		# Category filter (overrides POS profile groups if specified)
+		# Category filter (overrides POS profile groups if specified), including its sub-groups
 		if category and category != "all":
-			base_query.append("AND i.item_group = %s")
-			count_query.append("AND i.item_group = %s")
+			base_query.append(f"AND {_item_group_subtree_condition(1)}")
+			count_query.append(f"AND {_item_group_subtree_condition(1)}")
 			params_list.append(category)
 			count_params.append(category)
 
@@ -901,13 +801,12 @@ def get_items_with_balance_and_price(
 			if getattr(pos_doc, "item_groups", None):
 				item_group_names = [d.item_group for d in pos_doc.item_groups if d.item_group]
 				if item_group_names:
-					placeholders = ", ".join(["%s"] * len(item_group_names))
-					unfiltered_count_query.append(f"AND i.item_group IN ({placeholders})")
+					unfiltered_count_query.append(f"AND {_item_group_subtree_condition(len(item_group_names))}")
 					unfiltered_count_params.extend(item_group_names)
 
 			# Apply category filter if specified
 			if category and category != "all":
-				unfiltered_count_query.append("AND i.item_group = %s")
+				unfiltered_count_query.append(f"AND {_item_group_subtree_condition(1)}")
 				unfiltered_count_params.append(category)
 
 			# Apply search filter if specified
@@ -978,6 +877,7 @@ def get_items_with_balance_and_price(
 		# Fetch stock and prices in batch (optimized)
 		stock_map = _fetch_batch_stock(item_codes, warehouse)
 		price_map = _fetch_batch_prices(item_codes, price_list, uom_map)
+		uom_price_map = derive_uom_prices(item_codes, price_list)
 
 		# Build enriched items
 		enriched_items = []
@@ -1008,6 +908,7 @@ def get_items_with_balance_and_price(
 					"sold": 0,
 					"preparationTime": 10,
 					"uom": default_uom,
+					"uoms": uom_price_map.get(item_code, {}).get("uoms", []),
 					"barcode": primary_barcode,
 				}
 			)
@@ -1139,69 +1040,164 @@ def get_items_stock_batch(item_codes: str):
 		return {}
 
 
-@frappe.whitelist(allow_guest=True)
-def get_item_groups_for_pos():
-	try:
-		pos_profile = get_current_pos_profile()
+ITEM_GROUP_COUNTS_CACHE_KEY = "klik_pos_item_group_counts"
 
-		formatted_groups = []
-		# Determine allowed item groups from POS Profile (if configured)
-		item_group_names = []
-		if pos_profile.item_groups:
-			item_group_names = [d.item_group for d in pos_profile.item_groups if d.item_group]
 
-			item_groups = frappe.get_all(
-				"Item Group",
-				filters={"name": ["in", item_group_names], "is_group": 0},
-				fields=["name", "item_group_name", "parent_item_group"],
-			)
-		else:
-			# Fallback: fetch all leaf item groups
-			item_groups = frappe.get_all(
-				"Item Group",
-				filters={"is_group": 0},
-				fields=["name", "item_group_name"],
-				limit=100,
-				order_by="modified desc",
-			)
+def _item_group_subtree_condition(group_count: int) -> str:
+	"""SQL condition matching items (alias i) in the nested-set subtree of any of the given groups."""
+	placeholders = ", ".join(["%s"] * group_count)
+	return f"""i.item_group IN (
+		SELECT sub.name FROM `tabItem Group` sub
+		JOIN `tabItem Group` root ON sub.lft >= root.lft AND sub.rgt <= root.rgt
+		WHERE root.name IN ({placeholders})
+	)"""
 
-		# Compute total items constrained to POS Profile's allowed groups (if any)
-		if item_group_names:
-			total_item_count = frappe.db.count(
-				"Item",
-				filters={
-					"disabled": 0,
-					"is_stock_item": 1,
-					"item_group": ["in", item_group_names],
-				},
-			)
-		else:
-			total_item_count = frappe.db.count("Item", filters={"disabled": 0, "is_stock_item": 1})
 
-		for group in item_groups:
-			item_count = frappe.db.count("Item", filters={"item_group": group["name"]})
+def clear_item_group_counts_cache(doc=None, method=None):
+	"""Item / Item Group / POS Profile doc_event: drop the cached category counts of every profile."""
+	frappe.cache().delete_value(ITEM_GROUP_COUNTS_CACHE_KEY)
 
-			formatted_groups.append(
-				{
-					"id": group["name"],
-					"name": group.get("item_group_name") or group["name"],
-					"parent": group.get("parent_item_group") or None,
-					"icon": "📦",
-					"count": item_count,
-				}
+
+def _compute_item_groups_for_pos(pos_profile) -> dict:
+	"""Build the category bar with one grouped count query and one total query."""
+	item_group_names = [d.item_group for d in pos_profile.item_groups if d.item_group]
+
+	if item_group_names:
+		# Configured groups may be parents; each counts the items of its whole subtree
+		item_groups = frappe.get_all(
+			"Item Group",
+			filters={"name": ["in", item_group_names]},
+			fields=["name", "item_group_name", "parent_item_group"],
+		)
+	else:
+		# Fallback: fetch all leaf item groups
+		item_groups = frappe.get_all(
+			"Item Group",
+			filters={"is_group": 0},
+			fields=["name", "item_group_name"],
+			limit=100,
+			order_by="modified desc",
+		)
+
+	counts = {}
+	if item_groups:
+		counts = dict(
+			frappe.db.sql(
+				"""
+				SELECT root.name, COUNT(i.name)
+				FROM `tabItem Group` root
+				JOIN `tabItem Group` sub ON sub.lft >= root.lft AND sub.rgt <= root.rgt
+				JOIN `tabItem` i ON i.item_group = sub.name AND i.disabled = 0 AND i.is_stock_item = 1
+				WHERE root.name IN %(groups)s
+				GROUP BY root.name
+				""",
+				{"groups": tuple(group["name"] for group in item_groups)},
 			)
-		return {"groups": formatted_groups, "total_items": total_item_count}
+		)
+
+	# Compute total items constrained to POS Profile's allowed groups (if any)
+	if item_group_names:
+		total_item_count = frappe.db.sql(
+			f"""
+			SELECT COUNT(*) FROM `tabItem` i
+			WHERE i.disabled = 0 AND i.is_stock_item = 1
+			AND {_item_group_subtree_condition(len(item_group_names))}
+			""",
+			tuple(item_group_names),
+		)[0][0]
+	else:
+		total_item_count = frappe.db.count("Item", filters={"disabled": 0, "is_stock_item": 1})
+
+	formatted_groups = [
+		{
+			"id": group["name"],
+			"name": group.get("item_group_name") or group["name"],
+			"parent": group.get("parent_item_group") or None,
+			"icon": "📦",
+			"count": counts.get(group["name"], 0),
+		}
+		for group in item_groups
+	]
+	return {"groups": formatted_groups, "total_items": total_item_count}
+
+
+@frappe.whitelist(allow_guest=True)
+def get_item_groups_for_pos():
+	try:
+		pos_profile = get_current_pos_profile()
+
+		# Cached per POS profile until an Item, Item Group or POS Profile changes
+		cached = frappe.cache().hget(ITEM_GROUP_COUNTS_CACHE_KEY, pos_profile.name)
+		if cached is not None:
+			return cached
+
+		result = _compute_item_groups_for_pos(pos_profile)
+		frappe.cache().hset(ITEM_GROUP_COUNTS_CACHE_KEY, pos_profile.name, result)
+		return result
 
 	except Exception as e:
 		frappe.log_error(frappe.get_traceback(), f"Get Item Groups for POS Error {e!s}")
 		frappe.throw(_("Something went wrong while fetching item group data."))
 
 
+def _fetch_batch_balances(item_codes: list, warehouse: str) -> dict:
+	"""
+	Sum batch quantities for many items in a warehouse with one ledger aggregate.
+
+	Bundle-based movements come from Serial and Batch Entry and older ones from the batch_no
+	column of Stock Ledger Entry. Only unexpired batches with positive quantity are returned,
+	ordered first-expiry-first-out, with batches without expiry last.
+
+	Returns:
+		dict of item_code -> list of {batch_id, qty, expiry_date}
+	"""
+	if not item_codes or not warehouse:
+		return {}
+
+	rows = frappe.db.sql(
+		"""
+		SELECT b.item, b.batch_id, b.expiry_date, SUM(ledger.qty) as qty
+		FROM (
+			SELECT sbe.batch_no, sbe.qty
+			FROM `tabSerial and Batch Entry` sbe
+			JOIN `tabSerial and Batch Bundle` sbb ON sbb.name = sbe.parent
+			WHERE sbb.item_code IN %(item_codes)s
+				AND sbe.warehouse = %(warehouse)s
+				AND sbb.docstatus = 1
+				AND sbb.is_cancelled = 0
+				AND IFNULL(sbe.batch_no, '') != ''
+			UNION ALL
+			SELECT sle.batch_no, sle.actual_qty
+			FROM `tabStock Ledger Entry` sle
+			WHERE sle.item_code IN %(item_codes)s
+				AND sle.warehouse = %(warehouse)s
+				AND sle.is_cancelled = 0
+				AND IFNULL(sle.batch_no, '') != ''
+				AND IFNULL(sle.serial_and_batch_bundle, '') = ''
+		) ledger
+		JOIN `tabBatch` b ON b.name = ledger.batch_no
+		WHERE b.disabled = 0 AND (b.expiry_date IS NULL OR b.expiry_date >= CURDATE())
+		GROUP BY b.name, b.item, b.batch_id, b.expiry_date
+		HAVING qty > 0
+		ORDER BY b.item, b.expiry_date IS NULL, b.expiry_date, b.creation
+		""",
+		{"item_codes": tuple(item_codes), "warehouse": warehouse},
+		as_dict=True,
+	)
+
+	balances = {}
+	for row in rows:
+		balances.setdefault(row.item, []).append(
+			{"batch_id": row.batch_id, "qty": row.qty, "expiry_date": row.expiry_date}
+		)
+	return balances
+
+
 @frappe.whitelist()
 def get_batch_nos_with_qty(item_code):
 	"""
 	Returns a list of dicts with batch numbers and their actual quantities
-	for a given item code and warehouse.
+	for a given item code and warehouse, earliest expiry first.
 	"""
 	pos_doc = get_current_pos_profile()
 	warehouse = pos_doc.warehouse
@@ -1209,16 +1205,29 @@ def get_batch_nos_with_qty(item_code):
 	if not item_code or not warehouse:
 		return []
 
-	# Get all batches for the item
-	batches = frappe.get_all("Batch", filters={"item": item_code}, fields=["name", "batch_id", "expiry_date"])
+	return _fetch_batch_balances([item_code], warehouse).get(item_code, [])
 
-	batch_qty_data = []
-	for b in batches:
-		qty = get_batch_qty(batch_no=b.name, warehouse=warehouse)
-		if qty > 0:
-			batch_qty_data.append({"batch_id": b.batch_id, "qty": qty})
 
-	return batch_qty_data
+@frappe.whitelist()
+def get_batch_nos_with_qty_for_items(item_codes):
+	"""
+	Batch balances for several items at once, so the cart can validate all batch lines in one call.
+
+	Args:
+		item_codes: JSON list or comma-separated item codes
+
+	Returns:
+		dict of item_code -> list of {batch_id, qty, expiry_date}, earliest expiry first
+	"""
+	if isinstance(item_codes, str):
+		item_codes = (
+			frappe.parse_json(item_codes) if item_codes.strip().startswith("[") else item_codes.split(",")
+		)
+	item_codes = list({code.strip() for code in item_codes or [] if code and code.strip()})
+
+	warehouse = get_current_pos_profile().warehouse
+	balances = _fetch_batch_balances(item_codes, warehouse)
+	return {item_code: balances.get(item_code, []) for item_code in item_codes}
 
 
 @frappe.whitelist()
@@ -1234,83 +1243,11 @@ def get_item_uoms_and_prices(item_code, customer=None):
 	try:
 		# Get the price list with customer-first priority
 		price_list = get_price_list_with_customer_priority(customer)
-
-		item_doc = frappe.get_doc("Item", item_code)
-
-		uom_data = []
-
-		# Get all UOMs from child table
-		uom_names_in_table = set()
-		for uom_row in item_doc.get("uoms", []):
-			uom_names_in_table.add(uom_row.uom)
-			uom_data.append(
-				{
-					"uom": uom_row.uom,
-					"conversion_factor": uom_row.conversion_factor,
-					"price": 0.0,
-				}
-			)
-
-		# Add stock_uom if it's not already in the list (stock_uom has conversion_factor of 1.0)
-		stock_uom = item_doc.stock_uom
-		if stock_uom and stock_uom not in uom_names_in_table:
-			uom_data.insert(
-				0,
-				{
-					"uom": stock_uom,
-					"conversion_factor": 1.0,
-					"price": 0.0,
-				},
-			)
-
-		for uom_info in uom_data:
-			# First, check if there's a direct price entry for this UOM
-			direct_price_filters = {
-				"item_code": item_code,
-				"uom": uom_info["uom"],
-				"selling": 1,
-			}
-			if price_list and price_list.strip():
-				direct_price_filters["price_list"] = price_list
-
-			direct_price = frappe.db.get_value(
-				"Item Price",
-				direct_price_filters,
-				"price_list_rate",
-			)
-
-			# If no direct price with price_list, try without price_list
-			if not direct_price and price_list:
-				direct_price_filters.pop("price_list", None)
-				direct_price = frappe.db.get_value(
-					"Item Price",
-					direct_price_filters,
-					"price_list_rate",
-					order_by="modified desc",
-				)
-
-			if direct_price:
-				# Use direct price if found
-				uom_info["price"] = float(direct_price)
-			else:
-				# No direct price found - calculate from base UOM using conversion factor
-				# Get base UOM price with customer-first priority
-				base_price_info = fetch_item_price(
-					item_code, price_list=price_list, customer=customer, uom=item_doc.stock_uom
-				)
-
-				if base_price_info and base_price_info.get("price", 0) > 0:
-					converted_price = float(base_price_info["price"]) * uom_info["conversion_factor"]
-					uom_info["price"] = converted_price
-				else:
-					# Last resort: use valuation_rate with conversion factor
-					valuation_rate = frappe.db.get_value("Item", item_code, "valuation_rate") or 0
-					converted_price = float(valuation_rate) * uom_info["conversion_factor"]
-					uom_info["price"] = converted_price
+		uom_prices = derive_uom_prices([item_code], price_list)[item_code]
 
 		return {
-			"base_uom": item_doc.stock_uom,
-			"uoms": uom_data,
+			"base_uom": uom_prices["base_uom"],
+			"uoms": uom_prices["uoms"],
 			"price_list_used": price_list,
 		}
 	except Exception:
@@ -1321,6 +1258,32 @@ def get_item_uoms_and_prices(item_code, customer=None):
 		}
 
 
+@frappe.whitelist()
+def get_uom_prices_for_items(item_codes, customer=None):
+	"""
+	UOMs and prices of many items at once, so the cart can switch UOM without a server call.
+
+	Args:
+		item_codes: JSON list or comma-separated item codes
+		customer: optional customer whose default price list takes priority
+
+	Returns:
+		dict with price_list_used and items: item_code -> {base_uom, currency, uoms}
+	"""
+	if isinstance(item_codes, str):
+		item_codes = (
+			frappe.parse_json(item_codes) if item_codes.strip().startswith("[") else item_codes.split(",")
+		)
+	item_codes = [code.strip() for code in item_codes or [] if code and code.strip()]
+
+	try:
+		price_list = get_price_list_with_customer_priority(customer)
+		return {"items": derive_uom_prices(item_codes, price_list), "price_list_used": price_list}
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Get UOM Prices For Items Error")
+		return {"items": {}, "price_list_used": None}
+
+
 @frappe.whitelist(allow_guest=True)
 def get_serial_nos_for_item(item_code: str):
 	"""
@@ -1333,31 +1296,30 @@ def get_serial_nos_for_item(item_code: str):
 		pos_doc = get_current_pos_profile()
 		warehouse = getattr(pos_doc, "warehouse", None)
 
-		filters = {"item_code": item_code, "status": ["in", ["Active", "Available"]]}
-		if warehouse:
-			filters["warehouse"] = warehouse
-
-		serials = frappe.get_all(
-			"Serial No",
-			filters=filters,
-			fields=["name", "serial_no"],
-			limit=500,
-			order_by="modified desc",
-		)
-
-		# Normalize: prefer serial_no field if present; fallback to name
-		result = []
-		for s in serials:
-			serial_value = s.get("serial_no") or s.get("name")
-			if serial_value:
-				result.append({"serial_no": serial_value})
-
-		return result
+		return [{"serial_no": serial_no} for serial_no in get_available_serials(item_code, warehouse)]
 	except Exception:
 		frappe.log_error(frappe.get_traceback(), f"Get Serial Nos Error for {item_code}")
 		return []
 
 
+@frappe.whitelist()
+def check_serial_availability(serial_lines):
+	"""
+	Check every serial line of a cart in one call.
+
+	Args:
+		serial_lines: JSON list of {"serial_no", "item_code"} dicts
+
+	Returns:
+		dict of serial_no -> {available, item_code, warehouse, status, reason}
+	"""
+	if isinstance(serial_lines, str):
+		serial_lines = frappe.parse_json(serial_lines)
+
+	warehouse = getattr(get_current_pos_profile(), "warehouse", None)
+	return check_serials(serial_lines or [], warehouse)
+
+
 @frappe.whitelist(allow_guest=True)
 def apply_pricing_rules_to_cart(cart_items, customer=None):
 	"""
@@ -1492,7 +1454,7 @@ def _prepare_erpnext_items(cart_items, context):
 
 			# If UOM is different from stock_uom, apply conversion factor
 			if item_uom and item_uom != stock_uom:
-				conversion_factor = _get_uom_conversion_factor(item_code, item_uom)
+				conversion_factor = get_conversion_factor(item_code, item_uom)
 				if conversion_factor:
 					base_price = float(base_uom_price) * conversion_factor
 				else:
@@ -1511,7 +1473,7 @@ def _prepare_erpnext_items(cart_items, context):
 		stock_uom = item_doc_full.stock_uom
 		conversion_factor = 1.0
 		if item_uom and item_uom != stock_uom:
-			uom_conversion = _get_uom_conversion_factor(item_code, item_uom)
+			uom_conversion = get_conversion_factor(item_code, item_uom)
 			if uom_conversion:
 				conversion_factor = uom_conversion
 
@@ -1712,7 +1674,7 @@ def _handle_no_pricing_rule(erpnext_item, cart_items, context):
 
 					if base_uom_price > 0:
 						if item_uom != stock_uom:
-							conversion_factor = _get_uom_conversion_factor(cart_item_code, item_uom)
+							conversion_factor = get_conversion_factor(cart_item_code, item_uom)
 							if conversion_factor:
 								expected_price = float(base_uom_price) * conversion_factor
 								# If cart price is close to expected (within 5%), use cart price
@@ -1743,7 +1705,7 @@ def _handle_no_pricing_rule(erpnext_item, cart_items, context):
 					)
 
 					if item_uom and item_uom != stock_uom:
-						conversion_factor = _get_uom_conversion_factor(cart_item_code, item_uom)
+						conversion_factor = get_conversion_factor(cart_item_code, item_uom)
 						if conversion_factor and base_uom_price > 0:
 							original_price = float(base_uom_price) * conversion_factor
 						else:
@@ -1816,7 +1778,7 @@ def _calculate_discounted_price(cart_item, pricing_result, context):
 
 			if base_uom_price > 0:
 				if item_uom != stock_uom:
-					conversion_factor = _get_uom_conversion_factor(cart_item_code, item_uom)
+					conversion_factor = get_conversion_factor(cart_item_code, item_uom)
 					if conversion_factor:
 						expected_price = float(base_uom_price) * conversion_factor
 						# If cart price is close to expected (within 5%), use cart price
@@ -1845,7 +1807,7 @@ def _calculate_discounted_price(cart_item, pricing_result, context):
 			base_uom_price = base_price_info.get("price", 0) if base_price_info.get("price", 0) > 0 else 0
 
 			if item_uom and item_uom != stock_uom:
-				conversion_factor = _get_uom_conversion_factor(cart_item_code, item_uom)
+				conversion_factor = get_conversion_factor(cart_item_code, item_uom)
 				if conversion_factor and base_uom_price > 0:
 					original_price = float(base_uom_price) * conversion_factor
 				else:
@@ -2086,12 +2048,12 @@ def create_item_with_barcode(
 		
 		# Handle barcode - generate unique EAN-13 barcode if flag is set
 		if use_item_code_as_barcode:
-			barcode = _generate_unique_barcode()
+			barcode = allocate_barcode()
 		# Ignore placeholder if it was sent (shouldn't happen with frontend fix, but for safety)
 		elif barcode and barcode.strip() == '__USE_ITEM_CODE__':
 			barcode = None
 		
-		# Check if barcode already exists (generated barcodes are already checked for uniqueness)
+		# Check if barcode already exists (generated barcodes come from a sequence and are unique)
 		if barcode and barcode.strip() and not use_item_code_as_barcode:
 			existing = frappe.db.exists("Item Barcode", {"barcode": barcode})
 			if existing:
@@ -2884,264 +2846,62 @@ def update_opening_stock(
 ):
 	"""
 	Update opening stock quantity using Stock Reconciliation.
-	
-	This method safely updates stock quantities by:
-	- Updating Bin (warehouse stock)
-	- Creating Stock Ledger Entry (audit trail)
-	- Updating Batch quantity (if batch tracking enabled)
-	
-	Does NOT create Material Receipt/Issue entries.
-	
+
+	A one-row stock take: see klik_pos.api.stock_reconciliation.bulk_stock_take for counting
+	many items at once.
+
 	Args:
 		item_code: Item code to update
 		warehouse: Warehouse name
 		qty: New stock quantity (absolute value)
-		batch_no: Batch number if batch tracking enabled
-		valuation_rate: Valuation rate (default: 0)
+		batch_no: Batch number; for batch items it defaults to the batch moved last in the warehouse
+		valuation_rate: Valuation rate (default: current rate in the warehouse)
 		posting_date: Posting date (default: today)
 		remarks: Remarks for the reconciliation
-		
+
 	Returns:
 		dict: Result with reconciliation name and status
 	"""
-	from frappe.utils import nowdate, nowtime, flt
-	from erpnext.stock.utils import get_stock_balance
-	
+	from frappe.utils import flt
+
+	from klik_pos.api.stock_reconciliation import stock_take
+
 	try:
-		# Validate inputs
 		if not item_code:
 			frappe.throw(_("Item Code is required"))
-		
+
 		if not warehouse:
 			frappe.throw(_("Warehouse is required"))
-		
-		qty = flt(qty)
-		if qty < 0:
-			frappe.throw(_("Stock quantity cannot be negative"))
-		
-		# Validate item exists
-		if not frappe.db.exists("Item", item_code):
-			frappe.throw(_("Item '{0}' does not exist").format(item_code))
-		
-		# Validate warehouse exists
+
 		if not frappe.db.exists("Warehouse", warehouse):
 			frappe.throw(_("Warehouse '{0}' does not exist").format(warehouse))
-		
-		# Get item details
-		item = frappe.get_doc("Item", item_code)
-		
-		# Handle batch tracking - get or create batch if needed
-		if item.has_batch_no and not batch_no:
-			# Try to get existing batches for this item in the warehouse
-			# First, try to find a batch with stock
-			existing_batches = frappe.db.sql("""
-				SELECT DISTINCT sle.batch_no, b.batch_id
-				FROM `tabStock Ledger Entry` sle
-				INNER JOIN `tabBatch` b ON b.name = sle.batch_no
-				WHERE sle.item_code = %s
-				AND sle.warehouse = %s
-				AND sle.batch_no IS NOT NULL
-				ORDER BY sle.posting_date DESC
-				LIMIT 1
-			""", (item_code, warehouse), as_dict=True)
-			
-			if existing_batches and existing_batches[0].batch_no:
-				# Use existing batch
-				batch_no = existing_batches[0].batch_no
-			else:
-				# Try to get any batch for this item (not warehouse-specific)
-				any_batch = frappe.db.get_value("Batch", {"item": item_code}, "name", order_by="creation DESC")
-				if any_batch:
-					batch_no = any_batch
-				else:
-					# Create a default batch for opening stock correction
-					batch_id = f"OPENING-{item_code[:10]}-{frappe.generate_hash(length=6).upper()}"
-					batch_doc = frappe.get_doc({
-						"doctype": "Batch",
-						"batch_id": batch_id,
-						"item": item_code,
-						"expiry_date": None
-					})
-					batch_doc.insert(ignore_permissions=True)
-					batch_no = batch_doc.name
-					frappe.db.commit()
-		
-		# Get current stock
-		current_qty = get_stock_balance(item_code, warehouse, posting_date or nowdate())
-		
-		# Set defaults
-		posting_date = posting_date or nowdate()
-		posting_time = nowtime()
-		valuation_rate = flt(valuation_rate)
-		
-		# Get company from warehouse
-		company = frappe.db.get_value("Warehouse", warehouse, "company")
-		if not company:
-			frappe.throw(_("Company not found for warehouse '{0}'").format(warehouse))
-		
-		# Get expense account for Opening Stock - must be Asset/Liability type (not P&L)
-		# Use ERPNext's built-in functions to get warehouse account or stock accounts
-		expense_account = None
-		
-		# First, try to get account from warehouse
-		try:
-			from erpnext.stock import get_warehouse_account
-			warehouse_doc = frappe.get_doc("Warehouse", warehouse)
-			warehouse_account = get_warehouse_account(warehouse_doc)
-			if warehouse_account:
-				# Verify it's an Asset account (not P&L)
-				account_type = frappe.db.get_value("Account", warehouse_account, "account_type")
-				report_type = frappe.db.get_value("Account", warehouse_account, "report_type")
-				if account_type == "Asset" and report_type != "Profit and Loss":
-					expense_account = warehouse_account
-		except Exception:
-			pass
-		
-		# If not found, try to get from company default inventory account
-		if not expense_account:
-			default_stock_account = frappe.db.get_value("Company", company, "default_inventory_account")
-			if default_stock_account:
-				account_type = frappe.db.get_value("Account", default_stock_account, "account_type")
-				report_type = frappe.db.get_value("Account", default_stock_account, "report_type")
-				if account_type == "Asset" and report_type != "Profit and Loss":
-					expense_account = default_stock_account
-		
-		# If not found, try to get stock accounts using ERPNext utility
-		if not expense_account:
-			try:
-				from erpnext.accounts.utils import get_stock_accounts
-				stock_accounts = get_stock_accounts(company)
-				if stock_accounts:
-					# Get first stock account and verify it's Asset type
-					for acc in stock_accounts:
-						account_type = frappe.db.get_value("Account", acc, "account_type")
-						report_type = frappe.db.get_value("Account", acc, "report_type")
-						if account_type == "Asset" and report_type != "Profit and Loss":
-							expense_account = acc
-							break
-			except Exception:
-				pass
-		
-		# If still not found, try to find any Stock type account
-		if not expense_account:
-			stock_account = frappe.db.get_value(
-				"Account",
-				{"company": company, "account_type": "Stock", "is_group": 0},
-				"name",
-				order_by="creation DESC"
-			)
-			if stock_account:
-				expense_account = stock_account
-		
-		# If still not found, try Temporary account (used by ERPNext for Opening Stock)
-		if not expense_account:
-			temp_account = frappe.db.get_value(
-				"Account",
-				{"company": company, "account_type": "Temporary", "is_group": 0},
-				"name",
-				order_by="creation DESC"
-			)
-			if temp_account:
-				# Verify it's not P&L type
-				report_type = frappe.db.get_value("Account", temp_account, "report_type")
-				if report_type != "Profit and Loss":
-					expense_account = temp_account
-		
-		# If still not found, try to find any Asset account (not P&L, not group)
-		if not expense_account:
-			asset_account = frappe.db.sql("""
-				SELECT name FROM `tabAccount`
-				WHERE company = %s
-				AND account_type = 'Asset'
-				AND report_type != 'Profit and Loss'
-				AND is_group = 0
-				ORDER BY creation DESC
-				LIMIT 1
-			""", (company,), as_dict=True)
-			if asset_account:
-				expense_account = asset_account[0].name
-		
-		# Last resort: try any account that's not P&L and not a group
-		if not expense_account:
-			any_account = frappe.db.sql("""
-				SELECT name FROM `tabAccount`
-				WHERE company = %s
-				AND report_type != 'Profit and Loss'
-				AND is_group = 0
-				ORDER BY creation DESC
-				LIMIT 1
-			""", (company,), as_dict=True)
-			if any_account:
-				expense_account = any_account[0].name
-		
-		# If still not found, throw error with helpful message
-		if not expense_account:
-			frappe.throw(
-				_("No suitable Asset account found for Opening Stock. "
-				  "Please configure a Stock Asset account in Warehouse '{0}' or set Default Inventory Account in Company '{1}'").format(
-					warehouse, company
-				)
-			)
-		
-		# Get current valuation rate from Bin
-		bin_name = frappe.db.get_value("Bin", {
-			"item_code": item_code,
-			"warehouse": warehouse
-		})
-		
-		current_valuation_rate = 0
-		if bin_name:
-			bin_doc = frappe.get_doc("Bin", bin_name)
-			if bin_doc.actual_qty > 0 and bin_doc.valuation_rate:
-				current_valuation_rate = flt(bin_doc.valuation_rate)
-		
-		# Use current valuation rate if not provided
-		if valuation_rate == 0:
-			valuation_rate = current_valuation_rate
-		
-		# Create Stock Reconciliation
-		# For batch tracking, we need to use use_serial_batch_fields to use old batch_no field
-		# or create a Serial and Batch Bundle. Using use_serial_batch_fields is simpler.
-		item_row = {
-			"item_code": item_code,
-			"warehouse": warehouse,
-			"qty": qty,
-			"valuation_rate": valuation_rate,
-			"current_qty": current_qty,
-			"current_valuation_rate": current_valuation_rate
-		}
-		
-		# If batch tracking is enabled, use the old batch fields
-		if item.has_batch_no and batch_no:
-			item_row["use_serial_batch_fields"] = 1
-			item_row["batch_no"] = batch_no
-		
-		# If serial tracking is enabled (future support)
-		if item.has_serial_no:
-			item_row["use_serial_batch_fields"] = 1
-			item_row["serial_no"] = None
-		
-		reconciliation = frappe.get_doc({
-			"doctype": "Stock Reconciliation",
-			"purpose": "Opening Stock",
-			"posting_date": posting_date,
-			"posting_time": posting_time,
-			"company": company,
-			"expense_account": expense_account,  # Required for Opening Stock - must be Asset/Liability
-			"items": [item_row],
-			"remarks": remarks or "Opening Stock Correction"
-		})
-		
-		# Insert and submit
-		reconciliation.insert()
-		reconciliation.submit()
-		
-		frappe.db.commit()
-		
-		# Return success response
+
+		if not batch_no and frappe.get_cached_value("Item", item_code, "has_batch_no"):
+			# bulk_stock_take asks for the batch when several are in stock; a single correction keeps
+			# adjusting the batch moved last, as it did before
+			batch_no = _get_last_moved_batch(item_code, warehouse)
+
+		qty = flt(qty)
+		result = stock_take(
+			[{"item_code": item_code, "qty": qty, "batch_no": batch_no, "valuation_rate": valuation_rate}],
+			warehouse,
+			purpose="Opening Stock",
+			posting_date=posting_date,
+			remarks=remarks or "Opening Stock Correction",
+		)
+		if result["errors"]:
+			frappe.throw(result["errors"][0]["error"])
+		if not result["reconciliations"]:
+			frappe.throw(_("None of the items have any change in quantity or value."))
+
+		reconciliation_name = result["reconciliations"][0]
+		current_qty = flt(
+			frappe.db.get_value("Stock Reconciliation Item", {"parent": reconciliation_name}, "current_qty")
+		)
+
 		return {
 			"status": "success",
-			"reconciliation_name": reconciliation.name,
+			"reconciliation_name": reconciliation_name,
 			"item_code": item_code,
 			"warehouse": warehouse,
 			"old_qty": current_qty,
@@ -3151,7 +2911,7 @@ def update_opening_stock(
 				current_qty, qty, item_code, warehouse
 			)
 		}
-		
+
 	except frappe.ValidationError as e:
 		frappe.log_error(frappe.get_traceback(), f"Validation error in stock reconciliation: {str(e)}")
 		frappe.throw(str(e))
@@ -3161,6 +2921,25 @@ def update_opening_stock(
 		frappe.throw(_("Failed to update stock: {0}").format(str(e)))
 
 
+def _get_last_moved_batch(item_code, warehouse):
+	"""Return the batch of the item's latest stock ledger entry in the warehouse, if any."""
+	batch = frappe.db.sql(
+		"""
+		SELECT IFNULL(NULLIF(sle.batch_no, ''), sbe.batch_no)
+		FROM `tabStock Ledger Entry` sle
+		LEFT JOIN `tabSerial and Batch Entry` sbe ON sbe.parent = sle.serial_and_batch_bundle
+		WHERE sle.item_code = %s
+			AND sle.warehouse = %s
+			AND sle.is_cancelled = 0
+			AND IFNULL(NULLIF(sle.batch_no, ''), sbe.batch_no) IS NOT NULL
+		ORDER BY sle.posting_date DESC, sle.posting_time DESC, sle.creation DESC
+		LIMIT 1
+		""",
+		(item_code, warehouse),
+	)
+	return batch[0][0] if batch else None
+
+
 @frappe.whitelist()
 def get_current_stock(item_code: str, warehouse: str, batch_no: str | None = None):
 	"""
@@ -3221,6 +3000,9 @@ def get_current_stock(item_code: str, warehouse: str, batch_no: str | None = Non
 def get_items_for_export():
 	"""
 	Get all items with complete details for CSV export.
+
+	Builds the whole catalog in one response; large catalogs should use
+	klik_pos.api.item_export.start_item_export, which streams to a File in the background.
 	
 	Returns all active stock items with:
 	- item_code
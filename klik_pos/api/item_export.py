@@ -0,0 +1,179 @@
+import csv
+import os
+
+import frappe
+from frappe import _
+from frappe.utils import now_datetime
+from openpyxl import Workbook
+
+from klik_pos.api.item import _fetch_batch_prices, _fetch_batch_stock, _get_pos_context
+from klik_pos.api.jobs import get_job_status, publish_job_progress, set_job_status
+
+EXPORT_COLUMNS = [
+	"item_code",
+	"item_name",
+	"barcode",
+	"selling_price",
+	"buying_price",
+	"stock_qty",
+	"uom",
+	"shelf_life_in_days",
+	"item_group",
+	"has_batch_no",
+	"has_expiry_date",
+]
+JOB_KIND = "item_export"
+EXPORT_CHUNK_SIZE = 1000
+
+
+@frappe.whitelist()
+def start_item_export(file_format="csv"):
+	"""
+	Queue a catalog export to a private CSV or XLSX File.
+
+	Returns:
+		dict with the job_id to poll with get_item_export_status; progress is also
+		published on the realtime event "klik_pos_item_export_progress".
+	"""
+	if file_format not in ("csv", "xlsx"):
+		frappe.throw(_("Unsupported export format: {0}").format(file_format))
+
+	_pos_doc, warehouse, price_list, _hide_unavailable = _get_pos_context()
+	job_id = f"klik_pos_item_export_{frappe.generate_hash(length=10)}"
+
+	set_job_status(JOB_KIND, job_id, {"status": "queued", "processed": 0, "total": None, "file_url": None})
+	frappe.enqueue(
+		"klik_pos.api.item_export.run_item_export",
+		queue="long",
+		timeout=3600,
+		job_id=job_id,
+		export_id=job_id,
+		file_format=file_format,
+		warehouse=warehouse,
+		price_list=price_list,
+		user=frappe.session.user,
+	)
+	return {"success": True, "job_id": job_id}
+
+
+@frappe.whitelist()
+def get_item_export_status(job_id):
+	"""Return {status, processed, total, file_url, error} of an export job."""
+	return get_job_status(JOB_KIND, job_id)
+
+
+def run_item_export(export_id, file_format, warehouse, price_list, user, chunk_size=EXPORT_CHUNK_SIZE):
+	"""Background job: stream export rows chunk by chunk into a file under private/files."""
+	total = frappe.db.count("Item", {"disabled": 0, "is_stock_item": 1})
+	progress = {"status": "running", "processed": 0, "total": total, "file_url": None, "user": user}
+	publish_job_progress(JOB_KIND, export_id, progress)
+
+	file_name = f"item-export-{now_datetime().strftime('%Y%m%d-%H%M%S')}-{export_id[-6:]}.{file_format}"
+	path = frappe.get_site_path("private", "files", file_name)
+
+	try:
+		rows = iter_export_rows(warehouse, price_list, chunk_size, progress, export_id)
+		if file_format == "xlsx":
+			_write_xlsx(path, rows)
+		else:
+			_write_csv(path, rows)
+
+		file_doc = frappe.get_doc(
+			{
+				"doctype": "File",
+				"file_name": file_name,
+				"file_url": f"/private/files/{file_name}",
+				"is_private": 1,
+				"file_size": os.path.getsize(path),
+			}
+		)
+		file_doc.owner = user
+		file_doc.insert(ignore_permissions=True)
+		frappe.db.commit()
+
+		progress.update(status="completed", file_url=file_doc.file_url)
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Error exporting items")
+		progress.update(status="failed", error=str(e))
+		if os.path.exists(path):
+			os.remove(path)
+
+	publish_job_progress(JOB_KIND, export_id, progress)
+
+
+def iter_export_rows(warehouse, price_list, chunk_size=EXPORT_CHUNK_SIZE, progress=None, export_id=None):
+	"""
+	Yield export rows for all active stock items, keyset-paged by item code.
+
+	Each chunk loads its barcodes, stock and prices with set-based queries, so memory is
+	bounded by the chunk size rather than the catalog size.
+	"""
+	last_item_code = ""
+	while True:
+		items = frappe.db.sql(
+			"""
+			SELECT name, item_name, item_group, stock_uom, shelf_life_in_days,
+			       has_batch_no, has_expiry_date, valuation_rate, standard_rate
+			FROM `tabItem`
+			WHERE disabled = 0 AND is_stock_item = 1 AND name > %s
+			ORDER BY name
+			LIMIT %s
+			""",
+			(last_item_code, chunk_size),
+			as_dict=True,
+		)
+		if not items:
+			return
+
+		item_codes = [item.name for item in items]
+		barcode_map = {}
+		for item_code, barcode in frappe.db.sql(
+			"""
+			SELECT parent, barcode FROM `tabItem Barcode`
+			WHERE parent IN %(item_codes)s
+			ORDER BY parent, idx
+			""",
+			{"item_codes": tuple(item_codes)},
+		):
+			barcode_map.setdefault(item_code, barcode)
+
+		stock_map = _fetch_batch_stock(item_codes, warehouse) if warehouse else {}
+		price_map = _fetch_batch_prices(item_codes, price_list, {item.name: item.stock_uom for item in items})
+
+		for item in items:
+			price_info = price_map.get(item.name, {})
+			yield [
+				item.name,
+				item.item_name or item.name,
+				barcode_map.get(item.name, ""),
+				price_info.get("price", 0) or item.standard_rate or 0,
+				price_info.get("buying_price", 0) or item.valuation_rate or 0,
+				stock_map.get(item.name, 0),
+				item.stock_uom or "Nos",
+				item.shelf_life_in_days,
+				item.item_group or "Products",
+				item.has_batch_no or 0,
+				item.has_expiry_date or 0,
+			]
+
+		last_item_code = items[-1].name
+		if progress is not None:
+			progress["processed"] += len(items)
+			publish_job_progress(JOB_KIND, export_id, progress)
+
+
+def _write_csv(path, rows):
+	with open(path, "w", newline="", encoding="utf-8") as f:
+		writer = csv.writer(f)
+		writer.writerow(EXPORT_COLUMNS)
+		writer.writerows(rows)
+
+
+def _write_xlsx(path, rows):
+	# Write-only workbooks stream rows to disk instead of keeping every cell in memory
+	workbook = Workbook(write_only=True)
+	sheet = workbook.create_sheet("Items")
+	sheet.append(EXPORT_COLUMNS)
+	for row in rows:
+		sheet.append(row)
+	workbook.save(path)
@@ -0,0 +1,441 @@
+import csv
+import io
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import cint, getdate, now_datetime
+from openpyxl import load_workbook
+
+from klik_pos.api.barcode import allocate_barcodes
+from klik_pos.api.item import _detect_barcode_type, _get_pos_context, get_default_price_lists
+from klik_pos.api.item_export import EXPORT_COLUMNS
+from klik_pos.api.jobs import get_job_status, publish_job_progress, set_job_status
+from klik_pos.api.stock_reconciliation import submit_stock_reconciliations
+
+# The export format round-trips; batch_no and expiry_date are optional extras for opening stock
+IMPORT_COLUMNS = [*EXPORT_COLUMNS, "batch_no", "expiry_date"]
+JOB_KIND = "item_import"
+IMPORT_BATCH_SIZE = 500
+LOOKUP_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+@frappe.whitelist()
+def start_item_import(file_url, generate_barcodes=0):
+	"""
+	Queue an import of items from an uploaded CSV or XLSX File.
+
+	The file uses the columns of the item export. Items, barcodes, prices and opening stock
+	are created by a background job. With generate_barcodes, rows without a barcode get a
+	new internal EAN-13 barcode.
+
+	Returns:
+		dict with the job_id to poll with get_item_import_status; progress is also
+		published on the realtime event "klik_pos_item_import_progress".
+	"""
+	frappe.has_permission("Item", "create", throw=True)
+	if not frappe.db.exists("File", {"file_url": file_url}):
+		frappe.throw(_("File {0} not found").format(file_url))
+
+	_pos_doc, warehouse, _price_list, _hide_unavailable = _get_pos_context()
+	job_id = f"klik_pos_item_import_{frappe.generate_hash(length=10)}"
+
+	set_job_status(JOB_KIND, job_id, {"status": "queued", "processed": 0, "total": None})
+	frappe.enqueue(
+		"klik_pos.api.item_import.run_item_import",
+		queue="long",
+		timeout=7200,
+		job_id=job_id,
+		import_id=job_id,
+		file_url=file_url,
+		warehouse=warehouse,
+		user=frappe.session.user,
+		generate_barcodes=cint(generate_barcodes),
+	)
+	return {"success": True, "job_id": job_id}
+
+
+@frappe.whitelist()
+def get_item_import_status(job_id):
+	"""Return {status, processed, total, created, failed, rows_per_second, errors, ...} of an import job."""
+	return get_job_status(JOB_KIND, job_id)
+
+
+def run_item_import(import_id, file_url, warehouse, user, generate_barcodes=0, batch_size=IMPORT_BATCH_SIZE):
+	"""
+	Background job: validate the whole file up front, then create items batch by batch.
+
+	Each batch inserts its Item documents, bulk-inserts their Item Prices and commits once.
+	Opening stock of all imported items is posted at the end as a few Stock Reconciliations
+	instead of one Stock Entry per item.
+	"""
+	started = time.monotonic()
+	progress = {
+		"status": "running",
+		"total": None,
+		"processed": 0,
+		"created": 0,
+		"failed": 0,
+		"stock_failed": 0,
+		"stock_reconciliations": [],
+		"errors": [],
+		"rows_per_second": 0,
+		"user": user,
+	}
+	publish_job_progress(JOB_KIND, import_id, progress)
+
+	try:
+		rows = read_import_rows(file_url)
+		progress["total"] = len(rows)
+
+		valid_rows, errors = validate_import_rows(rows)
+		for error in errors:
+			_add_error(progress, error)
+		progress["processed"] = len(errors)
+		publish_job_progress(JOB_KIND, import_id, progress)
+
+		if generate_barcodes:
+			without_barcode = [row for row in valid_rows if not row["barcode"]]
+			for row, barcode in zip(without_barcode, allocate_barcodes(len(without_barcode)), strict=True):
+				row["barcode"] = barcode
+
+		price_lists = get_default_price_lists()
+		stock_rows = []
+		for start in range(0, len(valid_rows), batch_size):
+			batch = valid_rows[start : start + batch_size]
+			created = _create_items(batch, progress)
+			_insert_item_prices(created, price_lists)
+			frappe.db.commit()
+
+			stock_rows.extend(row for row in created if row["stock_qty"] > 0)
+			progress["processed"] += len(batch)
+			progress["rows_per_second"] = round(progress["processed"] / (time.monotonic() - started), 1)
+			publish_job_progress(JOB_KIND, import_id, progress)
+
+		if stock_rows:
+			_post_opening_stock(stock_rows, warehouse, progress)
+
+		progress["status"] = "completed"
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(frappe.get_traceback(), "Error importing items")
+		progress.update(status="failed", error=str(e))
+
+	elapsed = time.monotonic() - started
+	progress["elapsed_seconds"] = round(elapsed, 1)
+	progress["rows_per_second"] = round(progress["processed"] / elapsed, 1) if elapsed else 0
+	publish_job_progress(JOB_KIND, import_id, progress)
+
+
+def read_import_rows(file_url):
+	"""Read a CSV or XLSX File into a list of (line number, {column: value}) tuples."""
+	file_doc = frappe.get_doc("File", {"file_url": file_url})
+
+	if file_doc.file_name.lower().endswith(".xlsx"):
+		workbook = load_workbook(file_doc.get_full_path(), read_only=True, data_only=True)
+		sheet_rows = workbook.active.iter_rows(values_only=True)
+		header = [str(cell or "").strip() for cell in next(sheet_rows, [])]
+		records = (dict(zip(header, values, strict=False)) for values in sheet_rows)
+	else:
+		content = file_doc.get_content()
+		if isinstance(content, bytes):
+			content = content.decode("utf-8-sig")
+		records = csv.DictReader(io.StringIO(content))
+
+	rows = []
+	for line, record in enumerate(records, start=2):
+		if any(value not in (None, "") for value in record.values()):
+			rows.append((line, record))
+	return rows
+
+
+def validate_import_rows(rows):
+	"""
+	Parse and validate all rows with a fixed number of lookups.
+
+	Item codes, barcodes, item groups, UOMs and batch ids are checked against the database
+	in chunked IN queries and against the other rows of the file.
+
+	Returns:
+		(valid rows, errors), where errors are {"row", "item_code", "error"} dicts
+	"""
+	parsed = []
+	errors = []
+	for line, record in rows:
+		try:
+			parsed.append(_parse_row(line, record))
+		except ValueError as e:
+			errors.append(_error(line, str(record.get("item_code") or "").strip(), str(e)))
+
+	existing_items = _existing_values(
+		"SELECT name FROM `tabItem` WHERE name IN %(values)s", [row["item_code"] for row in parsed]
+	)
+	existing_barcodes = _existing_values(
+		"SELECT barcode FROM `tabItem Barcode` WHERE barcode IN %(values)s",
+		[row["barcode"] for row in parsed if row["barcode"]],
+	)
+	item_groups = _existing_values(
+		"SELECT name FROM `tabItem Group` WHERE name IN %(values)s", [row["item_group"] for row in parsed]
+	)
+	uoms = _existing_values(
+		"SELECT name FROM `tabUOM` WHERE name IN %(values)s", [row["uom"] for row in parsed]
+	)
+	existing_batches = _existing_values(
+		"SELECT name FROM `tabBatch` WHERE name IN %(values)s",
+		[row["batch_no"] for row in parsed if row["batch_no"]],
+	)
+
+	valid = []
+	seen_codes = set()
+	seen_barcodes = set()
+	seen_batches = set()
+	for row in parsed:
+		error = None
+		if row["item_code"] in existing_items:
+			error = _("Item code '{0}' already exists").format(row["item_code"])
+		elif row["item_code"] in seen_codes:
+			error = _("Item code '{0}' appears more than once in the file").format(row["item_code"])
+		elif row["barcode"] in existing_barcodes:
+			error = _("Barcode '{0}' is already assigned to another item").format(row["barcode"])
+		elif row["barcode"] and row["barcode"] in seen_barcodes:
+			error = _("Barcode '{0}' appears more than once in the file").format(row["barcode"])
+		elif row["item_group"] not in item_groups:
+			error = _("Item Group '{0}' does not exist").format(row["item_group"])
+		elif row["uom"] not in uoms:
+			error = _("UOM '{0}' does not exist").format(row["uom"])
+		elif row["batch_no"] and (row["batch_no"] in existing_batches or row["batch_no"] in seen_batches):
+			error = _("Batch '{0}' already exists").format(row["batch_no"])
+
+		if error:
+			errors.append(_error(row["line"], row["item_code"], error))
+			continue
+
+		seen_codes.add(row["item_code"])
+		if row["barcode"]:
+			seen_barcodes.add(row["barcode"])
+		if row["batch_no"]:
+			seen_batches.add(row["batch_no"])
+		valid.append(row)
+
+	return valid, errors
+
+
+def _parse_row(line, record):
+	item_name = str(record.get("item_name") or "").strip()
+	item_code = str(record.get("item_code") or "").strip()
+	if not item_name and not item_code:
+		raise ValueError(_("Item name is required"))
+	item_name = item_name or item_code
+	if not item_code:
+		item_code = f"{item_name.upper().replace(' ', '-')[:20]}-{frappe.generate_hash(length=6).upper()}"
+
+	stock_qty = _to_number(record.get("stock_qty"), "stock_qty")
+	if stock_qty < 0:
+		raise ValueError(_("stock_qty cannot be negative"))
+
+	has_batch_no = _to_flag(record.get("has_batch_no"))
+	batch_no = str(record.get("batch_no") or "").strip() if has_batch_no else ""
+	if has_batch_no and stock_qty > 0 and not batch_no:
+		batch_no = f"BATCH-{item_code[:10]}-{frappe.generate_hash(length=6).upper()}"
+
+	expiry_date = record.get("expiry_date")
+	try:
+		expiry_date = getdate(expiry_date) if expiry_date not in (None, "") else None
+	except Exception:
+		raise ValueError(_("expiry_date '{0}' is not a valid date").format(expiry_date))
+
+	return {
+		"line": line,
+		"item_code": item_code,
+		"item_name": item_name,
+		"barcode": str(record.get("barcode") or "").strip(),
+		"selling_price": _to_number(record.get("selling_price"), "selling_price"),
+		"buying_price": _to_number(record.get("buying_price"), "buying_price"),
+		"stock_qty": stock_qty,
+		"uom": str(record.get("uom") or "").strip() or "Nos",
+		"shelf_life_in_days": cint(_to_number(record.get("shelf_life_in_days"), "shelf_life_in_days")),
+		"item_group": str(record.get("item_group") or "").strip() or "Products",
+		"has_batch_no": has_batch_no,
+		"has_expiry_date": _to_flag(record.get("has_expiry_date")),
+		"batch_no": batch_no,
+		"expiry_date": expiry_date,
+	}
+
+
+def _to_number(value, column):
+	if value in (None, ""):
+		return 0
+	try:
+		return float(str(value).replace(",", "").strip())
+	except ValueError:
+		raise ValueError(_("{0} must be a number, got '{1}'").format(column, value))
+
+
+def _to_flag(value):
+	return 1 if str(value or "").strip().lower() in ("1", "1.0", "yes", "true", "y") else 0
+
+
+def _existing_values(query, values):
+	"""Return which of the values exist, using one IN query per chunk."""
+	values = list({value for value in values if value})
+	found = set()
+	for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+		chunk = values[start : start + LOOKUP_CHUNK_SIZE]
+		found.update(row[0] for row in frappe.db.sql(query, {"values": tuple(chunk)}))
+	return found
+
+
+def _create_items(rows, progress):
+	"""Insert the Item of every row under its own savepoint and return the rows that succeeded."""
+	created = []
+	for row in rows:
+		item = {
+			"doctype": "Item",
+			"item_code": row["item_code"],
+			"item_name": row["item_name"],
+			"item_group": row["item_group"],
+			"stock_uom": row["uom"],
+			"is_stock_item": 1,
+			"has_batch_no": row["has_batch_no"],
+			"create_new_batch": row["has_batch_no"],
+			"has_expiry_date": row["has_expiry_date"],
+			"shelf_life_in_days": row["shelf_life_in_days"] or None,
+			# standard_rate is left empty: Item.after_insert would create one Item Price per item,
+			# prices are bulk-inserted per batch instead
+			"valuation_rate": row["buying_price"],
+		}
+		if row["barcode"]:
+			barcode_entry = {"barcode": row["barcode"]}
+			barcode_type = _detect_barcode_type(row["barcode"])
+			if barcode_type:
+				barcode_entry["barcode_type"] = barcode_type
+			item["barcodes"] = [barcode_entry]
+
+		frappe.db.savepoint("klik_pos_item_import_row")
+		try:
+			frappe.get_doc(item).insert(ignore_permissions=True)
+		except Exception as e:
+			frappe.db.rollback(save_point="klik_pos_item_import_row")
+			_add_error(progress, _error(row["line"], row["item_code"], str(e)))
+			continue
+
+		progress["created"] += 1
+		created.append(row)
+	return created
+
+
+def _insert_item_prices(rows, price_lists):
+	"""Bulk-insert the selling and buying Item Prices of newly created items."""
+	now = now_datetime()
+	user = frappe.session.user
+	values = []
+	for row in rows:
+		for key, price_field in (("selling", "selling_price"), ("buying", "buying_price")):
+			if row[price_field] <= 0 or key not in price_lists:
+				continue
+			price_list, currency = price_lists[key]
+			values.append(
+				(
+					frappe.generate_hash(length=10),
+					row["item_code"],
+					row["item_name"],
+					row["uom"],
+					price_list,
+					row[price_field],
+					currency,
+					1 if key == "selling" else 0,
+					1 if key == "buying" else 0,
+					user,
+					user,
+					now,
+					now,
+				)
+			)
+
+	if values:
+		frappe.db.bulk_insert(
+			"Item Price",
+			fields=[
+				"name",
+				"item_code",
+				"item_name",
+				"uom",
+				"price_list",
+				"price_list_rate",
+				"currency",
+				"selling",
+				"buying",
+				"owner",
+				"modified_by",
+				"creation",
+				"modified",
+			],
+			values=values,
+		)
+
+
+def _post_opening_stock(rows, warehouse, progress):
+	"""Create the batches of the imported stock and post it as a few Stock Reconciliations."""
+	if not warehouse:
+		for row in rows:
+			error = _error(row["line"], row["item_code"], _("No warehouse found for opening stock"))
+			_add_error(progress, error, "stock_failed")
+		return
+
+	stock_rows = []
+	for row in rows:
+		if row["batch_no"]:
+			frappe.db.savepoint("klik_pos_item_import_batch")
+			try:
+				frappe.get_doc(
+					{
+						"doctype": "Batch",
+						"batch_id": row["batch_no"],
+						"item": row["item_code"],
+						"expiry_date": row["expiry_date"],
+					}
+				).insert(ignore_permissions=True)
+			except Exception as e:
+				frappe.db.rollback(save_point="klik_pos_item_import_batch")
+				error = _error(row["line"], row["item_code"], _("Opening stock: {0}").format(e))
+				_add_error(progress, error, "stock_failed")
+				continue
+		stock_rows.append(row)
+	frappe.db.commit()
+
+	company = frappe.db.get_value("Warehouse", warehouse, "company")
+	results = submit_stock_reconciliations(
+		company,
+		[
+			{
+				"item_code": row["item_code"],
+				"warehouse": warehouse,
+				"qty": row["stock_qty"],
+				"valuation_rate": row["buying_price"],
+				"batch_no": row["batch_no"] or None,
+			}
+			for row in stock_rows
+		],
+		purpose="Opening Stock",
+		remarks=_("Opening stock from item import"),
+	)
+
+	for result in results:
+		if result["name"]:
+			progress["stock_reconciliations"].append(result["name"])
+			continue
+		for index in result["rows"]:
+			row = stock_rows[index]
+			error = _error(row["line"], row["item_code"], _("Opening stock: {0}").format(result["error"]))
+			_add_error(progress, error, "stock_failed")
+
+
+def _error(line, item_code, message):
+	return {"row": line, "item_code": item_code, "error": message}
+
+
+def _add_error(progress, error, counter="failed"):
+	progress[counter] += 1
+	if len(progress["errors"]) < MAX_REPORTED_ERRORS:
+		progress["errors"].append(error)
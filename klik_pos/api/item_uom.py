@@ -0,0 +1,152 @@
+import frappe
+from frappe.utils import flt, nowdate
+
+UOM_MATRIX_CACHE_KEY = "klik_pos_uom_matrix"
+
+
+def clear_uom_matrix_cache(doc, method=None):
+	"""Item doc_event: drop the cached UOM conversions of the saved or deleted item."""
+	frappe.cache().hdel(UOM_MATRIX_CACHE_KEY, doc.name)
+
+
+def get_uom_matrix(item_codes):
+	"""
+	Return the UOM conversions of many items, cached per item in a Redis hash.
+
+	Items missing from the cache are loaded together with one join on UOM Conversion Detail.
+
+	Returns:
+		dict of item_code -> {"stock_uom": str, "factors": {uom: conversion factor}}
+		The stock UOM is always present in factors with a factor of 1.
+	"""
+	item_codes = list(dict.fromkeys(code for code in item_codes if code))
+	cache = frappe.cache()
+
+	matrix = {}
+	missing = []
+	for item_code in item_codes:
+		cached = cache.hget(UOM_MATRIX_CACHE_KEY, item_code)
+		if cached is None:
+			missing.append(item_code)
+		else:
+			matrix[item_code] = cached
+
+	if missing:
+		rows = frappe.db.sql(
+			"""
+			SELECT i.name as item_code, i.stock_uom, ucd.uom, ucd.conversion_factor
+			FROM `tabItem` i
+			LEFT JOIN `tabUOM Conversion Detail` ucd
+				ON ucd.parent = i.name AND ucd.parenttype = 'Item'
+			WHERE i.name IN %(item_codes)s
+			ORDER BY i.name, ucd.idx
+			""",
+			{"item_codes": tuple(missing)},
+			as_dict=True,
+		)
+
+		loaded = {}
+		for row in rows:
+			entry = loaded.setdefault(
+				row.item_code, {"stock_uom": row.stock_uom, "factors": {row.stock_uom: 1.0}}
+			)
+			if row.uom and row.uom != row.stock_uom and flt(row.conversion_factor) > 0:
+				entry["factors"][row.uom] = flt(row.conversion_factor)
+
+		for item_code, entry in loaded.items():
+			cache.hset(UOM_MATRIX_CACHE_KEY, item_code, entry)
+		matrix.update(loaded)
+
+	return matrix
+
+
+def get_conversion_factor(item_code, uom):
+	"""Return the conversion factor of a UOM for an item, or None when the item has no such UOM."""
+	entry = get_uom_matrix([item_code]).get(item_code)
+	if not entry:
+		return None
+	return entry["factors"].get(uom)
+
+
+def fetch_selling_prices(item_codes, price_list=None):
+	"""
+	Fetch the currently valid selling Item Price of every (item, UOM) with one query.
+
+	Prices from the given price list win; otherwise the latest price from any price list is used.
+
+	Returns:
+		dict of (item_code, uom) -> {"price", "currency"}
+	"""
+	if not item_codes:
+		return {}
+
+	today = nowdate()
+	rows = frappe.db.sql(
+		"""
+		SELECT item_code, uom, price_list_rate, currency
+		FROM `tabItem Price`
+		WHERE item_code IN %(item_codes)s
+			AND selling = 1
+			AND (valid_from IS NULL OR valid_from <= %(today)s)
+			AND (valid_upto IS NULL OR valid_upto >= %(today)s)
+		ORDER BY price_list = %(price_list)s DESC, valid_from DESC, modified DESC
+		""",
+		{"item_codes": tuple(item_codes), "today": today, "price_list": price_list or ""},
+		as_dict=True,
+	)
+
+	prices = {}
+	for row in rows:
+		key = (row.item_code, row.uom)
+		if key not in prices and flt(row.price_list_rate):
+			prices[key] = {"price": flt(row.price_list_rate), "currency": row.currency}
+	return prices
+
+
+def derive_uom_prices(item_codes, price_list=None):
+	"""
+	Derive the selling price of every UOM of many items in one pass.
+
+	A direct Item Price for the UOM is used where present; otherwise the stock UOM price is
+	multiplied by the conversion factor, and as a last resort the item's valuation rate.
+	Runs a fixed number of queries regardless of how many items or UOMs are requested.
+
+	Returns:
+		dict of item_code -> {"base_uom", "currency", "uoms": [{"uom", "conversion_factor", "price"}]}
+	"""
+	matrix = get_uom_matrix(item_codes)
+	prices = fetch_selling_prices(list(matrix), price_list)
+
+	without_base_price = [
+		item_code for item_code, entry in matrix.items() if (item_code, entry["stock_uom"]) not in prices
+	]
+	valuation_rates = {}
+	if without_base_price:
+		valuation_rates = dict(
+			frappe.db.sql(
+				"SELECT name, valuation_rate FROM `tabItem` WHERE name IN %(item_codes)s",
+				{"item_codes": tuple(without_base_price)},
+			)
+		)
+
+	result = {}
+	for item_code, entry in matrix.items():
+		base = prices.get((item_code, entry["stock_uom"]))
+		base_rate = base["price"] if base else flt(valuation_rates.get(item_code))
+
+		uoms = []
+		currency = base["currency"] if base else None
+		for uom, factor in entry["factors"].items():
+			direct = prices.get((item_code, uom))
+			if direct:
+				currency = currency or direct["currency"]
+			uoms.append(
+				{
+					"uom": uom,
+					"conversion_factor": factor,
+					"price": direct["price"] if direct else base_rate * factor,
+				}
+			)
+
+		result[item_code] = {"base_uom": entry["stock_uom"], "currency": currency, "uoms": uoms}
+	return result
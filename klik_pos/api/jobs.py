@@ -0,0 +1,27 @@
+import frappe
+
+JOB_STATUS_TTL = 86400
+
+
+def set_job_status(kind, job_id, status):
+	"""Store the status dict of a background job in the cache for a day."""
+	status.setdefault("user", frappe.session.user)
+	frappe.cache().set_value(f"klik_pos_{kind}:{job_id}", status, expires_in_sec=JOB_STATUS_TTL)
+
+
+def get_job_status(kind, job_id):
+	"""Return the status of a job started by the current user, or {"status": "not_found"}."""
+	status = frappe.cache().get_value(f"klik_pos_{kind}:{job_id}")
+	if not status or status.get("user") != frappe.session.user:
+		return {"status": "not_found"}
+	return {key: value for key, value in status.items() if key != "user"}
+
+
+def publish_job_progress(kind, job_id, status):
+	"""Store the job status and push it to its user on the realtime event klik_pos_<kind>_progress."""
+	set_job_status(kind, job_id, status)
+	frappe.publish_realtime(
+		f"klik_pos_{kind}_progress",
+		{"job_id": job_id, **{key: value for key, value in status.items() if key != "user"}},
+		user=status["user"],
+	)
@@ -0,0 +1,281 @@
+"""
+Outbound message queue for WhatsApp, SMS and email.
+
+enqueue_message() appends a message to a per-channel Redis list once the current transaction
+commits and starts up to the channel's concurrency limit of drainer jobs. Drainers share a
+per-second rate limit per channel, retry transient provider errors with exponential backoff
+through a Redis sorted set, and move the message's WhatsApp Chat row from Queued to Success or
+Failed. Set `klik_pos_outbound_provider` to "stub" in site config to send through a local
+provider instead, for offline load tests.
+"""
+
+import json
+import random
+import smtplib
+import time
+
+import frappe
+import requests
+from frappe import _
+from frappe.core.doctype.sms_settings.sms_settings import send_sms
+from frappe.integrations.utils import make_post_request
+
+from klik_pos.api.jobs import get_job_status, publish_job_progress, set_job_status
+
+JOB_KIND = "outbound_message"
+# concurrency: drainer jobs per channel; rate: messages per second shared by those drainers.
+# Site config `klik_pos_outbound_limits` overrides these per channel.
+CHANNEL_LIMITS = {
+	"whatsapp": {"concurrency": 4, "rate": 20},
+	"sms": {"concurrency": 2, "rate": 5},
+	"email": {"concurrency": 2, "rate": 10},
+}
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 5
+DRAIN_TIME_LIMIT = 240
+STUB_LATENCY_MS = 200
+
+
+def enqueue_message(channel, payload, chat=None):
+	"""
+	Queue payload for the channel's provider and return the message id.
+
+	The id can be polled with get_outbound_message_status; progress is also published on the
+	realtime event "klik_pos_outbound_message_progress". A caller that already handed out a job
+	handle passes it in frappe.flags.klik_pos_outbound_id.
+	"""
+	if channel not in CHANNEL_LIMITS:
+		frappe.throw(_("Unsupported outbound channel: {0}").format(channel))
+
+	message = {
+		"id": frappe.flags.pop("klik_pos_outbound_id", None) or frappe.generate_hash(length=12),
+		"channel": channel,
+		"payload": payload,
+		"chat": chat,
+		"attempt": 0,
+		"user": frappe.session.user,
+	}
+	set_job_status(JOB_KIND, message["id"], {"status": "queued", "channel": channel})
+	# Drainers must see the WhatsApp Chat row and anything else written alongside the message
+	frappe.db.after_commit.add(lambda: _push_message(message))
+	return message["id"]
+
+
+@frappe.whitelist()
+def get_outbound_message_status(message_id):
+	"""Return {status, channel, attempt, message_id, error} of a queued message."""
+	return get_job_status(JOB_KIND, message_id)
+
+
+def drain_channel(channel):
+	"""Background job: send queued messages of one channel until the queue is empty or time is up."""
+	send = _get_sender(channel)
+	rate_window = RateWindow(channel)
+	deadline = time.monotonic() + DRAIN_TIME_LIMIT
+
+	while time.monotonic() < deadline:
+		_promote_due_retries(channel)
+		raw = frappe.cache().lpop(_queue_key(channel))
+		if not raw:
+			return
+
+		rate_window.acquire()
+		_deliver(send, json.loads(raw))
+		frappe.db.commit()
+
+
+def resume_outbound_queues():
+	"""Scheduler: move due retries back into their queues and restart drainers for pending messages."""
+	for channel in CHANNEL_LIMITS:
+		_promote_due_retries(channel)
+		_start_drainers(channel)
+
+
+def _push_message(message):
+	frappe.cache().rpush(_queue_key(message["channel"]), json.dumps(message, default=str))
+	_start_drainers(message["channel"])
+
+
+def _start_drainers(channel):
+	pending = frappe.cache().llen(_queue_key(channel))
+	for slot in range(min(pending, channel_limits(channel)["concurrency"])):
+		# A fixed job id per slot caps the channel's concurrency; running slots are not re-queued
+		frappe.enqueue(
+			"klik_pos.api.outbound.drain_channel",
+			queue="short",
+			timeout=DRAIN_TIME_LIMIT + 60,
+			job_id=f"klik_pos_outbound::{channel}::{slot}",
+			deduplicate=True,
+			channel=channel,
+		)
+
+
+def _deliver(send, message):
+	status = {"status": "sent", "channel": message["channel"], "user": message["user"]}
+	try:
+		result = send(message["payload"]) or {}
+	except Exception as e:
+		frappe.db.rollback()
+		message["attempt"] += 1
+		status.update(attempt=message["attempt"], error=error_message(e))
+
+		if is_transient(e) and message["attempt"] < MAX_ATTEMPTS:
+			delay = RETRY_BASE_DELAY * 2 ** (message["attempt"] - 1) * random.uniform(1, 1.5)
+			_schedule_retry(message, delay)
+			status["status"] = "retrying"
+		else:
+			frappe.log_error(frappe.get_traceback(), f"Outbound {message['channel']} message failed")
+			_update_chat(message["chat"], "Failed")
+			status["status"] = "failed"
+
+		publish_job_progress(JOB_KIND, message["id"], status)
+		return
+
+	status["message_id"] = result.get("message_id")
+	_update_chat(message["chat"], "Success", result.get("message_id"))
+	publish_job_progress(JOB_KIND, message["id"], status)
+
+
+def _update_chat(chat, status, message_id=None):
+	if not chat:
+		return
+	values = {"status": status}
+	if message_id:
+		values["message_id"] = message_id
+	frappe.db.set_value("WhatsApp Chat", chat, values)
+
+
+class RateWindow:
+	"""
+	A channel's per-second quota, counted in Redis and shared by every drainer and bulk campaign.
+
+	Create it where frappe is set up; acquire() only uses the Redis client, so the threads of a
+	pool can share one instance.
+	"""
+
+	def __init__(self, channel):
+		self.cache = frappe.cache()
+		self.key_prefix = self.cache.make_key(f"klik_pos_outbound_rate:{channel}")
+		self.rate = channel_limits(channel)["rate"]
+
+	def acquire(self):
+		"""Block until the current second has room for one more message."""
+		while True:
+			now = time.time()
+			key = self.key_prefix + f":{int(now)}".encode()
+			pipe = self.cache.pipeline()
+			pipe.incr(key)
+			pipe.expire(key, 2)
+			sent_this_second, _expiry = pipe.execute()
+			if sent_this_second <= self.rate:
+				return
+			time.sleep(int(now) + 1 - now)
+
+
+def _schedule_retry(message, delay):
+	cache = frappe.cache()
+	cache.zadd(cache.make_key(_retry_key(message["channel"])), {json.dumps(message): time.time() + delay})
+
+
+def _promote_due_retries(channel):
+	cache = frappe.cache()
+	retry_key = cache.make_key(_retry_key(channel))
+	for raw in cache.zrangebyscore(retry_key, 0, time.time()):
+		# zrem succeeds for exactly one drainer, so a retry is never queued twice
+		if cache.zrem(retry_key, raw):
+			cache.rpush(_queue_key(channel), raw)
+
+
+def is_transient(error):
+	"""Network errors, throttling and provider-side failures are retried; anything else is final."""
+	if isinstance(error, requests.HTTPError):
+		status_code = error.response.status_code if error.response is not None else 500
+		return status_code == 429 or status_code >= 500
+	return isinstance(
+		error,
+		(
+			requests.ConnectionError,
+			requests.Timeout,
+			smtplib.SMTPConnectError,
+			smtplib.SMTPServerDisconnected,
+		),
+	)
+
+
+def error_message(error):
+	response = getattr(error, "response", None)
+	if response is not None:
+		try:
+			return response.json()["error"]["message"]
+		except Exception:
+			pass
+	return str(error)
+
+
+def channel_limits(channel):
+	overrides = (frappe.conf.get("klik_pos_outbound_limits") or {}).get(channel) or {}
+	return {**CHANNEL_LIMITS[channel], **overrides}
+
+
+def _queue_key(channel):
+	return f"klik_pos_outbound:{channel}"
+
+
+def _retry_key(channel):
+	return f"klik_pos_outbound_retry:{channel}"
+
+
+def _get_sender(channel):
+	if frappe.conf.get("klik_pos_outbound_provider") == "stub":
+		return _send_stub
+	return {"whatsapp": _send_whatsapp, "sms": _send_sms, "email": _send_email}[channel]
+
+
+def _send_whatsapp(payload):
+	url, token = _get_whatsapp_endpoint()
+	response = make_post_request(
+		url,
+		headers={"authorization": f"Bearer {token}", "content-type": "application/json"},
+		data=json.dumps(payload),
+	)
+	return {"message_id": response.get("messages", [{}])[0].get("id")}
+
+
+def _get_whatsapp_endpoint():
+	"""(messages URL, token) of the WhatsApp Setup, read once per job."""
+	if not getattr(frappe.local, "klik_pos_whatsapp_endpoint", None):
+		settings = frappe.get_doc("WhatsApp Setup", "WhatsApp Setup")
+		frappe.local.klik_pos_whatsapp_endpoint = (
+			f"{settings.url}/{settings.version}/{settings.phone_id}/messages",
+			settings.get_password("token"),
+		)
+	return frappe.local.klik_pos_whatsapp_endpoint
+
+
+def _send_sms(payload):
+	send_sms(receiver_list=payload["receivers"], msg=payload["message"], success_msg=False)
+
+
+def _send_email(payload):
+	attachments = [
+		{
+			"fname": attachment["fname"],
+			"fcontent": frappe.get_doc("File", {"file_url": attachment["file_url"]}).get_content(),
+		}
+		for attachment in payload.get("attachments", [])
+	]
+	frappe.sendmail(
+		recipients=payload["recipients"],
+		subject=payload["subject"],
+		message=payload["message"],
+		attachments=attachments,
+		delayed=False,
+	)
+
+
+def _send_stub(payload):
+	"""Local provider for offline load tests: fixed latency and an optional transient failure rate."""
+	time.sleep(frappe.conf.get("klik_pos_outbound_stub_latency_ms", STUB_LATENCY_MS) / 1000)
+	if random.random() < frappe.conf.get("klik_pos_outbound_stub_failure_rate", 0):
+		raise requests.ConnectionError("Stub provider: simulated network failure")
+	return {"message_id": f"stub.{frappe.generate_hash(length=16)}"}
@@ -0,0 +1,37 @@
+import frappe
+
+
+def fetch_primary_contacts(party_type, party_names):
+	"""Fetch the primary Contact of each Customer or Supplier with one join on its primary contact field."""
+	if not party_names:
+		return {}
+
+	rows = frappe.db.sql(
+		f"""
+		SELECT p.name as party, ct.first_name, ct.last_name, ct.email_id, ct.phone, ct.mobile_no
+		FROM `tab{party_type}` p
+		JOIN `tabContact` ct ON ct.name = p.{frappe.scrub(party_type)}_primary_contact
+		WHERE p.name IN %(names)s
+		""",
+		{"names": tuple(party_names)},
+		as_dict=True,
+	)
+	return {row.pop("party"): row for row in rows}
+
+
+def fetch_primary_addresses(party_type, party_names):
+	"""Fetch the primary Address of each Customer or Supplier with one join on its primary address field."""
+	if not party_names:
+		return {}
+
+	rows = frappe.db.sql(
+		f"""
+		SELECT p.name as party, addr.address_line1, addr.city, addr.state, addr.country, addr.pincode
+		FROM `tab{party_type}` p
+		JOIN `tabAddress` addr ON addr.name = p.{frappe.scrub(party_type)}_primary_address
+		WHERE p.name IN %(names)s
+		""",
+		{"names": tuple(party_names)},
+		as_dict=True,
+	)
+	return {row.pop("party"): row for row in rows}
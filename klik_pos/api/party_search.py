@@ -0,0 +1,239 @@
+"""
+Search-term index shared by customer and supplier search.
+
+PartySearchIndex stores (party, term_type, term) rows: lower-cased name tokens, phone digits in
+the typed and international form, lower-cased emails and any extra terms the party type adds.
+Queries rank parties by prefix matches on those terms. customer_search and supplier_search
+configure one instance each.
+"""
+
+import re
+
+import frappe
+from frappe.utils import now_datetime
+
+from klik_pos.api.customer_phone import get_region_code, to_e164
+
+MAX_TERM_LENGTH = 140
+# Phone fragments shorter than this are too unselective to use as a prefix
+MIN_PHONE_PREFIX = 3
+
+
+def normalize_phone_digits(phone):
+	"""Reduce a phone number to its digits, dropping an international 00 prefix."""
+	digits = re.sub(r"\D", "", phone or "")
+	if digits.startswith("00"):
+		digits = digits[2:]
+	return digits
+
+
+def tokenize_name(text):
+	"""Lower-case word tokens of a name, e.g. 'Mary-Jane  O'Neil' -> ['mary', 'jane', 'o', 'neil']."""
+	return [token for token in re.split(r"[^\w]+", (text or "").lower()) if token]
+
+
+def escape_like(text):
+	return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class PartySearchIndex:
+	"""
+	Search terms of one party type.
+
+	Args:
+		party_type: "Customer" or "Supplier"; the term doctype links it through its scrubbed name
+		term_doctype: Doctype holding the party's search terms
+		extra_fields: Additional party fields passed to extra_terms
+		extra_terms: Optional function(row) -> iterable of (term_type, term) for a party row
+	"""
+
+	def __init__(self, party_type, term_doctype, extra_fields=(), extra_terms=None):
+		self.party_type = party_type
+		self.party_field = frappe.scrub(party_type)
+		self.term_doctype = term_doctype
+		self.extra_fields = tuple(extra_fields)
+		self.extra_terms = extra_terms
+
+	def reindex(self, party_names):
+		"""Replace the search terms of the given parties with freshly collected ones."""
+		party_names = list({name for name in party_names if name})
+		if not party_names:
+			return
+
+		terms = self.collect_terms(party_names)
+		frappe.db.delete(self.term_doctype, {self.party_field: ["in", party_names]})
+		self.insert_terms(terms)
+
+	def reindex_contact(self, contact):
+		"""Rebuild the search terms of every party of this type the Contact is linked to."""
+		self.reindex(
+			[link.link_name for link in contact.get("links", []) if link.link_doctype == self.party_type]
+		)
+
+	def remove(self, party):
+		frappe.db.delete(self.term_doctype, {self.party_field: party})
+
+	def rebuild(self, chunk_size=2000):
+		"""Rebuild the whole index in chunks and return the number of parties indexed."""
+		frappe.db.sql(f"DELETE FROM `tab{self.term_doctype}`")
+		party_names = frappe.get_all(self.party_type, pluck="name", order_by="name asc")
+
+		for start in range(0, len(party_names), chunk_size):
+			self.insert_terms(self.collect_terms(party_names[start : start + chunk_size]))
+			frappe.db.commit()
+
+		return len(party_names)
+
+	def collect_terms(self, party_names):
+		"""Collect (party, term_type, term) tuples for the given parties with set-based queries."""
+		terms = set()
+		region = get_region_code()
+
+		fields = ", ".join(("name", f"{self.party_field}_name", "mobile_no", "email_id", *self.extra_fields))
+		parties = frappe.db.sql(
+			f"""
+			SELECT {fields}
+			FROM `tab{self.party_type}`
+			WHERE name IN %(names)s
+			""",
+			{"names": tuple(party_names)},
+			as_dict=True,
+		)
+		for party in parties:
+			for token in {*tokenize_name(party[f"{self.party_field}_name"]), *tokenize_name(party.name)}:
+				terms.add((party.name, "Name", token))
+			self._add_phone_term(terms, party.name, party.mobile_no, region)
+			self._add_email_term(terms, party.name, party.email_id)
+			if self.extra_terms:
+				for term_type, term in self.extra_terms(party):
+					if term:
+						terms.add((party.name, term_type, term[:MAX_TERM_LENGTH]))
+
+		contact_values = frappe.db.sql(
+			"""
+			SELECT dl.link_name as party, cp.phone as phone, NULL as email_id
+			FROM `tabDynamic Link` dl
+			JOIN `tabContact Phone` cp ON cp.parent = dl.parent
+			WHERE dl.parenttype = 'Contact' AND dl.link_doctype = %(party_type)s AND dl.link_name IN %(names)s
+			UNION ALL
+			SELECT dl.link_name as party, NULL as phone, ce.email_id as email_id
+			FROM `tabDynamic Link` dl
+			JOIN `tabContact Email` ce ON ce.parent = dl.parent
+			WHERE dl.parenttype = 'Contact' AND dl.link_doctype = %(party_type)s AND dl.link_name IN %(names)s
+			""",
+			{"party_type": self.party_type, "names": tuple(party_names)},
+			as_dict=True,
+		)
+		for row in contact_values:
+			self._add_phone_term(terms, row.party, row.phone, region)
+			self._add_email_term(terms, row.party, row.email_id)
+
+		return terms
+
+	def insert_terms(self, terms):
+		if not terms:
+			return
+
+		now = now_datetime()
+		user = frappe.session.user
+		values = [
+			(frappe.generate_hash(length=12), party, term_type, term[:MAX_TERM_LENGTH], user, user, now, now)
+			for party, term_type, term in terms
+		]
+		frappe.db.bulk_insert(
+			self.term_doctype,
+			["name", self.party_field, "term_type", "term", "owner", "modified_by", "creation", "modified"],
+			values,
+		)
+
+	def search(self, search, extra_matches=(), conditions=(), values=None, limit=20, start=0):
+		"""
+		Rank parties matching the search text.
+
+		Every word of the query is matched as a prefix against name tokens, and the query is
+		also matched as a prefix against normalized phone digits, lower-cased emails and each
+		(term_type, term) of extra_matches. Parties matching more query words rank first, then
+		exact matches, then newest.
+
+		Args:
+			conditions: SQL conditions on the party table, aliased p, with their params in values
+
+		Returns:
+			(list of party names in rank order, total number of matches)
+		"""
+		values = dict(values or {})
+		matches = []
+
+		for idx, token in enumerate(tokenize_name(search)[:5]):
+			matches.append((idx, "Name", token, escape_like(token)))
+
+		digits = normalize_phone_digits(search)
+		if len(digits) >= MIN_PHONE_PREFIX and not re.search(r"[a-zA-Z@]", search):
+			matches.append((-1, "Phone", digits, digits))
+
+		email = search.strip().lower()
+		if "@" in email or "." in email:
+			matches.append((-2, "Email", email, escape_like(email)))
+
+		for idx, (term_type, term) in enumerate(extra_matches):
+			matches.append((-3 - idx, term_type, term, escape_like(term)))
+
+		if not matches:
+			return [], 0
+
+		branches = []
+		for idx, (query_token, term_type, term, prefix) in enumerate(matches):
+			values.update({f"term_type_{idx}": term_type, f"term_{idx}": term, f"prefix_{idx}": f"{prefix}%"})
+			branches.append(
+				f"""
+				SELECT {self.party_field} as party, {query_token} as query_token, term = %(term_{idx})s as exact
+				FROM `tab{self.term_doctype}`
+				WHERE term_type = %(term_type_{idx})s AND term LIKE %(prefix_{idx})s
+				"""
+			)
+
+		where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+		ranked_matches = f"""
+			SELECT m.party,
+			       COUNT(DISTINCT m.query_token) as matched_tokens,
+			       SUM(m.exact) as exact_matches
+			FROM ({" UNION ALL ".join(branches)}) m
+			GROUP BY m.party
+		"""
+
+		values["limit"] = int(limit)
+		values["start"] = int(start)
+		ranked = frappe.db.sql(
+			f"""
+			SELECT p.name
+			FROM ({ranked_matches}) ranked
+			JOIN `tab{self.party_type}` p ON p.name = ranked.party
+			{where}
+			ORDER BY ranked.matched_tokens DESC, ranked.exact_matches DESC, p.creation DESC
+			LIMIT %(limit)s OFFSET %(start)s
+			""",
+			values,
+		)
+
+		total = frappe.db.sql(
+			f"""
+			SELECT COUNT(*)
+			FROM ({ranked_matches}) ranked
+			JOIN `tab{self.party_type}` p ON p.name = ranked.party
+			{where}
+			""",
+			values,
+		)[0][0]
+
+		return [row[0] for row in ranked], total
+
+	def _add_phone_term(self, terms, party, phone, region=None):
+		# Index both the digits as typed and the international form, so '0712…' and '+254712…' both match
+		for digits in {normalize_phone_digits(phone), normalize_phone_digits(to_e164(phone, region))}:
+			if digits:
+				terms.add((party, "Phone", digits[:MAX_TERM_LENGTH]))
+
+	def _add_email_term(self, terms, party, email):
+		email = (email or "").strip().lower()
+		if email:
+			terms.add((party, "Email", email[:MAX_TERM_LENGTH]))
@@ -0,0 +1,311 @@
+"""
+Denormalized invoice rollups per party.
+
+PartyStats keeps one row per Customer or Supplier with order count, invoiced total, last invoice
+date and outstanding, maintained in place from invoice and payment doc_events and rebuilt by a
+grouped backfill. customer_stats and supplier_stats configure one instance each.
+"""
+
+import frappe
+from frappe.utils import flt, getdate, now_datetime
+
+
+class PartyStats:
+	"""
+	Rollup of one party type's invoices into a stats doctype.
+
+	Args:
+		party_type: "Customer" or "Supplier"; the invoices' link field is its scrubbed name
+		invoice_doctype: Invoice doctype the rollup is computed from
+		stats_doctype: Doctype named after the party holding total_orders, total_outstanding,
+			amount_field and date_field
+		amount_field: Stats field summing grand_total of counted invoices
+		date_field: Stats field holding the latest posting_date of counted invoices
+		conditions: SQL conditions selecting the invoices that count as orders
+		pos_only: Only invoices created from a POS shift count as orders
+		clamp_outstanding: Report negative outstanding (net advances) as zero
+	"""
+
+	def __init__(
+		self,
+		party_type,
+		invoice_doctype,
+		stats_doctype,
+		amount_field,
+		date_field,
+		conditions,
+		pos_only=False,
+		clamp_outstanding=False,
+	):
+		self.party_type = party_type
+		self.party_field = frappe.scrub(party_type)
+		self.invoice_doctype = invoice_doctype
+		self.stats_doctype = stats_doctype
+		self.amount_field = amount_field
+		self.date_field = date_field
+		self.conditions = conditions
+		self.pos_only = pos_only
+		self.clamp_outstanding = clamp_outstanding
+
+	def apply_invoice(self, doc, sign):
+		"""Add (sign 1) or remove (sign -1) a submitted invoice from its party's rollup."""
+		party = doc.get(self.party_field)
+		if not party:
+			return
+
+		if not self._lock(party):
+			# No rollup yet: compute it once; the invoice's new docstatus is already in the table
+			self.upsert([(party, self.compute(party))])
+			return
+
+		counts_as_order = not doc.get("is_return") and (
+			not self.pos_only or doc.get("custom_pos_opening_entry")
+		)
+		if counts_as_order:
+			if sign > 0:
+				frappe.db.sql(
+					f"""
+					UPDATE `tab{self.stats_doctype}`
+					SET total_orders = total_orders + 1,
+					    {self.amount_field} = {self.amount_field} + %(grand_total)s,
+					    {self.date_field} = GREATEST(
+							COALESCE({self.date_field}, %(posting_date)s), %(posting_date)s
+					    ),
+					    modified = %(modified)s
+					WHERE name = %(party)s
+					""",
+					{
+						"grand_total": flt(doc.grand_total),
+						"posting_date": getdate(doc.posting_date),
+						"modified": now_datetime(),
+						"party": party,
+					},
+				)
+			else:
+				# Cancelling may remove the latest invoice, so re-read its date with one indexed MAX()
+				frappe.db.sql(
+					f"""
+					UPDATE `tab{self.stats_doctype}`
+					SET total_orders = total_orders - 1,
+					    {self.amount_field} = {self.amount_field} - %(grand_total)s,
+					    {self.date_field} = (
+							SELECT MAX(posting_date) FROM `tab{self.invoice_doctype}`
+							WHERE {self.party_field} = %(party)s AND {self.conditions}
+					    ),
+					    modified = %(modified)s
+					WHERE name = %(party)s
+					""",
+					{
+						"grand_total": flt(doc.grand_total),
+						"modified": now_datetime(),
+						"party": party,
+					},
+				)
+
+		# Returns, debit/credit notes and write-offs move outstanding on other invoices of the party
+		self.refresh_outstanding(party)
+
+	def apply_payment(self, doc):
+		"""Refresh outstanding for every party of this type a Payment Entry touches."""
+		parties = set()
+		if doc.get("party_type") == self.party_type and doc.get("party"):
+			parties.add(doc.party)
+
+		invoice_names = [
+			ref.reference_name
+			for ref in doc.get("references", [])
+			if ref.reference_doctype == self.invoice_doctype
+		]
+		if invoice_names:
+			parties.update(
+				frappe.get_all(
+					self.invoice_doctype, filters={"name": ["in", invoice_names]}, pluck=self.party_field
+				)
+			)
+
+		for party in parties:
+			self.refresh_outstanding(party)
+
+	def refresh_outstanding(self, party):
+		frappe.db.sql(
+			f"""
+			UPDATE `tab{self.stats_doctype}`
+			SET total_outstanding = (
+					SELECT COALESCE(SUM(outstanding_amount), 0) FROM `tab{self.invoice_doctype}`
+					WHERE {self.party_field} = %(party)s AND docstatus = 1
+			    ),
+			    modified = %(modified)s
+			WHERE name = %(party)s
+			""",
+			{"party": party, "modified": now_datetime()},
+		)
+
+	def compute(self, party):
+		"""Compute a party's rollup directly from its invoices."""
+		orders = frappe.db.sql(
+			f"""
+			SELECT COUNT(*) as total_orders,
+			       COALESCE(SUM(grand_total), 0) as amount,
+			       MAX(posting_date) as last_date
+			FROM `tab{self.invoice_doctype}`
+			WHERE {self.party_field} = %s AND {self.conditions}
+			""",
+			(party,),
+			as_dict=True,
+		)[0]
+
+		total_outstanding = frappe.db.sql(
+			f"""
+			SELECT COALESCE(SUM(outstanding_amount), 0)
+			FROM `tab{self.invoice_doctype}`
+			WHERE {self.party_field} = %s AND docstatus = 1
+			""",
+			(party,),
+		)[0][0]
+
+		return {
+			"total_orders": int(orders.total_orders or 0),
+			self.amount_field: flt(orders.amount),
+			self.date_field: orders.last_date,
+			"total_outstanding": flt(total_outstanding),
+		}
+
+	def upsert(self, rows):
+		"""Insert or overwrite rollup rows; rows is a list of (party, stats dict)."""
+		if not rows:
+			return
+
+		now = now_datetime()
+		user = frappe.session.user
+		placeholders = []
+		values = []
+		for party, stats in rows:
+			placeholders.append("(%s, %s, %s, %s, %s, %s, 0, 0, %s, %s, %s, %s)")
+			values.extend(
+				[
+					party,
+					party,
+					stats["total_orders"],
+					stats[self.amount_field],
+					stats[self.date_field],
+					stats["total_outstanding"],
+					user,
+					user,
+					now,
+					now,
+				]
+			)
+
+		frappe.db.sql(
+			f"""
+			INSERT INTO `tab{self.stats_doctype}`
+				(name, {self.party_field}, total_orders, {self.amount_field}, {self.date_field},
+				 total_outstanding, docstatus, idx, owner, modified_by, creation, modified)
+			VALUES {", ".join(placeholders)}
+			ON DUPLICATE KEY UPDATE
+				total_orders = VALUES(total_orders),
+				{self.amount_field} = VALUES({self.amount_field}),
+				{self.date_field} = VALUES({self.date_field}),
+				total_outstanding = VALUES(total_outstanding),
+				modified = VALUES(modified)
+			""",
+			tuple(values),
+		)
+
+	def get_map(self, party_names):
+		"""
+		Batch-read rollups for the given parties with one indexed query.
+
+		Returns:
+			dict of party -> {total_orders, amount_field, date_field, total_outstanding}
+		"""
+		if not party_names:
+			return {}
+
+		rows = frappe.db.sql(
+			f"""
+			SELECT name, total_orders, {self.amount_field}, {self.date_field}, total_outstanding
+			FROM `tab{self.stats_doctype}`
+			WHERE name IN %(names)s
+			""",
+			{"names": tuple(party_names)},
+			as_dict=True,
+		)
+		return {
+			row.name: {
+				"total_orders": int(row.total_orders or 0),
+				self.amount_field: flt(row[self.amount_field]),
+				self.date_field: row[self.date_field],
+				"total_outstanding": self._outstanding(row.total_outstanding),
+			}
+			for row in rows
+		}
+
+	def get(self, party):
+		"""Read one party's rollup, computing and storing it the first time it is needed."""
+		stats = self.get_map([party]).get(party)
+		if stats is None:
+			stats = self.compute(party)
+			self.upsert([(party, stats)])
+			stats["total_outstanding"] = self._outstanding(stats["total_outstanding"])
+		return stats
+
+	def backfill(self, chunk_size=1000):
+		"""Rebuild every party's rollup from its invoices with two grouped scans."""
+		orders = frappe.db.sql(
+			f"""
+			SELECT {self.party_field} as party, COUNT(*) as total_orders,
+			       COALESCE(SUM(grand_total), 0) as amount,
+			       MAX(posting_date) as last_date
+			FROM `tab{self.invoice_doctype}`
+			WHERE {self.conditions}
+			GROUP BY {self.party_field}
+			""",
+			as_dict=True,
+		)
+		outstanding = frappe.db.sql(
+			f"""
+			SELECT {self.party_field} as party, COALESCE(SUM(outstanding_amount), 0) as total_outstanding
+			FROM `tab{self.invoice_doctype}`
+			WHERE docstatus = 1
+			GROUP BY {self.party_field}
+			""",
+			as_dict=True,
+		)
+
+		stats_by_party = {}
+		for row in orders:
+			stats_by_party[row.party] = {
+				"total_orders": int(row.total_orders),
+				self.amount_field: flt(row.amount),
+				self.date_field: row.last_date,
+				"total_outstanding": 0.0,
+			}
+		for row in outstanding:
+			stats_by_party.setdefault(
+				row.party,
+				{"total_orders": 0, self.amount_field: 0.0, self.date_field: None, "total_outstanding": 0.0},
+			)["total_outstanding"] = flt(row.total_outstanding)
+
+		rows = [(party, stats) for party, stats in stats_by_party.items() if party]
+		for start in range(0, len(rows), chunk_size):
+			self.upsert(rows[start : start + chunk_size])
+			frappe.db.commit()
+
+		return len(rows)
+
+	def _lock(self, party):
+		"""
+		Lock the party and its rollup row and return whether the rollup exists.
+
+		The party row is locked first, so two first invoices of a new party cannot both compute
+		and store a rollup that misses the other: the second waits for the first to commit, and
+		its locking read then sees the stored rollup instead of its own transaction's snapshot.
+		"""
+		frappe.db.sql(f"SELECT name FROM `tab{self.party_type}` WHERE name = %s FOR UPDATE", (party,))
+		return bool(
+			frappe.db.sql(f"SELECT name FROM `tab{self.stats_doctype}` WHERE name = %s FOR UPDATE", (party,))
+		)
+
+	def _outstanding(self, value):
+		return max(0, flt(value)) if self.clamp_outstanding else flt(value)
@@ -2,6 +2,8 @@ import frappe
 from frappe import _
 
 from klik_pos.api.sales_invoice import get_current_pos_opening_entry
+from klik_pos.api.shift_aggregation import aggregate_shift
+from klik_pos.api.shift_totals import get_shift_totals
 from klik_pos.klik_pos.utils import get_current_pos_profile
 
 
@@ -124,43 +126,28 @@ def _fetch_sales_data(pos_profile, opening_entry_name, opening_date, is_admin):
 
 def _fetch_daily_sales_data(pos_profile, opening_date):
 	"""Fetch all sales data for the day (admin view)."""
-	return frappe.db.sql(
-		"""
-        SELECT
-            sip.mode_of_payment,
-            SUM(sip.amount) as total_amount,
-            COUNT(DISTINCT si.name) as transactions
-        FROM `tabSales Invoice` si
-        JOIN `tabSales Invoice Payment` sip ON si.name = sip.parent
-        WHERE si.pos_profile = %s
-          AND si.docstatus = 1
-          AND si.posting_date = %s
-          AND si.custom_pos_opening_entry IS NOT NULL
-          AND si.custom_pos_opening_entry != ''
-        GROUP BY sip.mode_of_payment
-        """,
-		(pos_profile, opening_date),
-		as_dict=True,
-	)
+	daily_totals = aggregate_shift(pos_profile=pos_profile, posting_date=opening_date)
+	return _payment_rows(daily_totals)
 
 
 def _fetch_opening_sales_data(opening_entry_name):
-	"""Fetch sales data for specific opening entry (regular user view)."""
-	return frappe.db.sql(
-		"""
-        SELECT
-            sip.mode_of_payment,
-            SUM(sip.amount) as total_amount,
-            COUNT(DISTINCT si.name) as transactions
-        FROM `tabSales Invoice` si
-        JOIN `tabSales Invoice Payment` sip ON si.name = sip.parent
-        WHERE si.custom_pos_opening_entry = %s
-          AND si.docstatus = 1
-        GROUP BY sip.mode_of_payment
-        """,
-		(opening_entry_name,),
-		as_dict=True,
-	)
+	"""Fetch sales data for specific opening entry (regular user view) from the shift's running totals."""
+	shift_totals = get_shift_totals(opening_entry_name) or {}
+	return _payment_rows(shift_totals)
+
+
+def _payment_rows(totals):
+	"""Flatten shift totals' payments into rows shaped like the per-mode aggregate query."""
+	return [
+		frappe._dict(
+			{
+				"mode_of_payment": mode_of_payment,
+				"total_amount": row["amount"],
+				"transactions": row["transactions"],
+			}
+		)
+		for mode_of_payment, row in totals.get("payments", {}).items()
+	]
 
 
 def _build_payment_summary(opening_modes, sales_data):
@@ -7,6 +7,7 @@ from frappe.utils import now_datetime, today
 
 # Import for clearing cache
 from klik_pos.api.cache import clear_backend_cache
+from klik_pos.api.shift_totals import get_shift_totals
 from klik_pos.klik_pos.utils import clear_pos_profile_cache, get_current_pos_profile
 
 
@@ -199,9 +200,6 @@ def _calculate_payment_reconciliation(opening_entry, data):
 	sales amounts, and expected vs closing amounts.
 	"""
 	opening_entry_name = opening_entry.name
-	opening_start = opening_entry.period_start_date
-	opening_date = opening_start.date()
-	opening_time = opening_start.time().strftime("%H:%M:%S")
 
 	# Fetch opening balances
 	opening_modes = frappe.get_all(
@@ -211,26 +209,9 @@ def _calculate_payment_reconciliation(opening_entry, data):
 	)
 	opening_balance_map = {row.mode_of_payment: row.opening_amount for row in opening_modes}
 
-	# Aggregate sales by payment mode
-	sales_data = frappe.db.sql(
-		"""
-		SELECT sip.mode_of_payment,
-		       SUM(sip.amount) as total_amount,
-		       COUNT(DISTINCT si.name) as transactions
-		FROM `tabSales Invoice` si
-		JOIN `tabSales Invoice Payment` sip ON si.name = sip.parent
-		WHERE si.pos_profile = %s
-		  AND si.docstatus = 1
-		  AND si.posting_date = %s
-		  AND si.posting_time >= %s
-		  AND si.custom_pos_opening_entry IS NOT NULL
-		  AND si.custom_pos_opening_entry != ''
-		GROUP BY sip.mode_of_payment
-		""",
-		(opening_entry.pos_profile, opening_date, opening_time),
-		as_dict=True,
-	)
-	sales_map = {row.mode_of_payment: row.total_amount for row in sales_data}
+	# Sales by payment mode come from the shift's running totals
+	shift_totals = get_shift_totals(opening_entry_name) or {}
+	sales_map = {mode: row["amount"] for mode, row in shift_totals.get("payments", {}).items()}
 
 	# Build reconciliation entries
 	closing_balance = data.get("closing_balance", {})
@@ -275,39 +256,18 @@ def _calculate_payment_reconciliation(opening_entry, data):
 
 def _calculate_closing_entry_totals(opening_entry_name):
 	"""
-	Calculate total_quantity, net_total, and grand_total from all Sales Invoices
-	linked to the opening entry. This matches standard Frappe POS behavior.
+	Read total_quantity, net_total, and grand_total for the shift from its running totals,
+	which are maintained on Sales Invoice submit/cancel.
 	"""
 	from frappe.utils import flt
 
 	try:
-		# Aggregate all totals in a single efficient SQL query
-		aggregated = frappe.db.sql(
-			"""
-			SELECT
-				COALESCE(SUM(si.net_total), 0) as net_total,
-				COALESCE(SUM(si.grand_total), 0) as grand_total,
-				COALESCE(SUM(sii.qty), 0) as total_quantity
-			FROM `tabSales Invoice` si
-			LEFT JOIN `tabSales Invoice Item` sii ON si.name = sii.parent
-			WHERE si.custom_pos_opening_entry = %s
-			  AND si.docstatus = 1
-			""",
-			(opening_entry_name,),
-			as_dict=True,
-		)
-
-		if aggregated and len(aggregated) > 0:
-			net_total = flt(aggregated[0].net_total or 0)
-			grand_total = flt(aggregated[0].grand_total or 0)
-			total_quantity = flt(aggregated[0].total_quantity or 0)
-		else:
-			net_total = grand_total = total_quantity = 0.0
+		totals = get_shift_totals(opening_entry_name) or {}
 
 		return {
-			"total_quantity": total_quantity,
-			"net_total": net_total,
-			"grand_total": grand_total,
+			"total_quantity": flt(totals.get("total_quantity")),
+			"net_total": flt(totals.get("net_total")),
+			"grand_total": flt(totals.get("grand_total")),
 		}
 	except Exception as e:
 		frappe.logger().error(f"Error calculating closing entry totals: {frappe.get_traceback()}")
@@ -321,37 +281,67 @@ def _calculate_closing_entry_totals(opening_entry_name):
 
 def _populate_sales_invoices_to_closing_entry(closing_doc, opening_entry_name):
 	"""
-	Populate the custom_sales_invoice child table with all Sales Invoices
-	linked to the opening entry.
+	Bulk insert the custom_sales_invoice child rows for all Sales Invoices linked
+	to the opening entry. Must run after the closing entry has been submitted so the
+	rows are written with one multi-row INSERT instead of being validated one by one.
 	"""
 	try:
-		# Fetch all submitted Sales Invoices linked to this opening entry
-		invoices = frappe.get_all(
-			"Sales Invoice",
-			filters={
-				"custom_pos_opening_entry": opening_entry_name,
-				"docstatus": 1,  # Only submitted invoices
-			},
-			fields=["name", "customer", "posting_date", "grand_total"],
-			order_by="posting_date, posting_time",
+		invoices = frappe.db.sql(
+			"""
+			SELECT name, customer, posting_date, grand_total
+			FROM `tabSales Invoice`
+			WHERE custom_pos_opening_entry = %s
+			  AND docstatus = 1
+			ORDER BY posting_date, posting_time
+			""",
+			(opening_entry_name,),
+			as_dict=True,
 		)
+		if not invoices:
+			return
 
-		# Append each invoice to the child table
-		for invoice in invoices:
-			closing_doc.append(
+		now = now_datetime()
+		user = frappe.session.user
+		fields = [
+			"name",
+			"parent",
+			"parenttype",
+			"parentfield",
+			"idx",
+			"docstatus",
+			"owner",
+			"modified_by",
+			"creation",
+			"modified",
+			"sales_invoice",
+			"customer",
+			"posting_date",
+			"amount",
+		]
+		values = [
+			(
+				frappe.generate_hash(length=10),
+				closing_doc.name,
+				closing_doc.doctype,
 				"custom_sales_invoice",
-				{
-					"sales_invoice": invoice.name,
-					"customer": invoice.customer,
-					"posting_date": invoice.posting_date,
-					"amount": invoice.grand_total,
-				},
+				idx,
+				closing_doc.docstatus,
+				user,
+				user,
+				now,
+				now,
+				invoice.name,
+				invoice.customer,
+				invoice.posting_date,
+				invoice.grand_total,
 			)
+			for idx, invoice in enumerate(invoices, start=1)
+		]
+		frappe.db.bulk_insert("Klik Sales Invoice Reference", fields, values)
 
-		if invoices:
-			frappe.logger().info(
-				f"✅ Populated {len(invoices)} sales invoices to closing entry {closing_doc.name}"
-			)
+		frappe.logger().info(
+			f"✅ Populated {len(invoices)} sales invoices to closing entry {closing_doc.name}"
+		)
 	except Exception as e:
 		# Log error but don't block closing entry creation
 		frappe.logger().error(f"Failed to populate sales invoices to closing entry: {frappe.get_traceback()}")
@@ -361,6 +351,11 @@ def _populate_sales_invoices_to_closing_entry(closing_doc, opening_entry_name):
 		)
 
 
+def _should_summarize_closing_invoices(pos_profile):
+	"""Whether the POS Profile keeps only a summarized invoice reference on closing."""
+	return bool(frappe.db.get_value("POS Profile", pos_profile, "custom_summarize_closing_invoices"))
+
+
 def _create_and_submit_closing_doc(opening_entry, data, payment_data, user):
 	"""Create, populate, and submit the POS Closing Entry document."""
 	doc = frappe.new_doc("POS Closing Entry")
@@ -397,11 +392,14 @@ def _create_and_submit_closing_doc(opening_entry, data, payment_data, user):
 			},
 		)
 
-	# Populate sales invoices linked to this opening entry
-	_populate_sales_invoices_to_closing_entry(doc, opening_entry.name)
-
 	# Submit and link back to opening entry
 	doc.submit()
+
+	# Reference the shift's sales invoices on the submitted entry, unless the profile only keeps
+	# the summary (invoices stay reachable through the opening entry and its shift totals)
+	if not _should_summarize_closing_invoices(opening_entry.pos_profile):
+		_populate_sales_invoices_to_closing_entry(doc, opening_entry.name)
+
 	frappe.db.set_value("POS Opening Entry", opening_entry.name, "pos_closing_entry", doc.name)
 
 	# Clear POS profile cache for the current user to ensure fresh data on next session
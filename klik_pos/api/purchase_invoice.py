@@ -3,10 +3,20 @@ Purchase Invoice API for klik_pos.
 Handles fetching, viewing, paying, and returning purchase invoices.
 """
 
+import hashlib
+import json
+from datetime import timedelta
+
 import frappe
 from frappe import _
 from frappe.model.mapper import get_mapped_doc
-from frappe.utils import flt
+from frappe.utils import flt, getdate, now_datetime, nowdate
+
+from klik_pos.api.item import get_default_price_lists
+from klik_pos.api.item_uom import get_uom_matrix
+from klik_pos.api.party_search import escape_like
+
+PURCHASE_INVOICE_COUNT_CACHE_KEY = "klik_pos_purchase_invoice_counts"
 
 
 def get_current_pos_opening_entry():
@@ -32,145 +42,120 @@ def get_current_pos_opening_entry():
 		return None
 
 
-@frappe.whitelist(allow_guest=True)
-def get_purchase_invoices(limit=100, start=0, search="", user_name=None):
+@frappe.whitelist()
+def get_purchase_invoices(limit=100, start=0, search="", user_name=None, supplier=None, cursor=None):
 	"""
-	Get purchase invoices with proper filtering.
+	Get purchase invoices, newest posting date first.
 
 	Args:
 		limit: Number of invoices to fetch
-		start: Starting offset for pagination
-		search: Search term for filtering
+		start: Starting offset for pagination, ignored when cursor is given
+		search: Search term matched against invoice number, supplier and supplier name
 		user_name: Filter by user name (full name). If provided, only returns invoices for that user.
-	"""
-	try:
-		# Get user IDs for user filter if user_name is provided
-		user_ids = None
-		if user_name and user_name != "all":
-			user_ids = _get_user_ids_by_full_name(user_name)
-			if not user_ids:
-				# No users found with this name, return empty result
-				return {"success": True, "data": [], "total_count": 0}
+		supplier: Only return invoices of this supplier
+		cursor: next_cursor of the previous page, for keyset pagination that stays fast on deep pages
 
-		filters, fields = _build_filters_and_fields(user_ids=user_ids)
-
-		# Build search filters
-		or_filters = _build_search_filters(search)
+	Returns:
+		dict with data, total_count (cached per filter) and next_cursor (None on the last page)
+	"""
+	# The list is read with raw SQL, which bypasses Frappe's permission checks
+	frappe.has_permission("Purchase Invoice", "read", throw=True)
 
-		invoices = frappe.get_all(
-			"Purchase Invoice",
-			filters=filters,
-			or_filters=or_filters,
-			fields=fields,
-			order_by="modified desc",
-			limit=limit,
-			start=start,
+	try:
+		limit = int(limit)
+		conditions, params = _build_list_conditions(search=search, user_name=user_name, supplier=supplier)
+		total_count = _get_cached_invoice_count(conditions, params)
+
+		page_conditions = list(conditions)
+		page_params = dict(params, limit=limit, start=int(start or 0))
+		if cursor:
+			cursor_date, cursor_name = cursor.split("|", 1)
+			page_conditions.append(
+				"(pi.posting_date < %(cursor_date)s"
+				" OR (pi.posting_date = %(cursor_date)s AND pi.name < %(cursor_name)s))"
+			)
+			page_params.update(cursor_date=cursor_date, cursor_name=cursor_name, start=0)
+
+		where = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
+		invoices = frappe.db.sql(
+			f"""
+			SELECT pi.name, pi.posting_date, pi.posting_time, pi.owner, pi.supplier, pi.supplier_name,
+			       pi.base_grand_total, pi.base_rounded_total, pi.status, pi.discount_amount,
+			       pi.total_taxes_and_charges, pi.currency, pi.company, pi.outstanding_amount,
+			       pi.paid_amount, pi.is_return, pi.return_against, pi.is_paid, pi.mode_of_payment,
+			       u.full_name as user_full_name
+			FROM `tabPurchase Invoice` pi
+			LEFT JOIN `tabUser` u ON u.name = pi.owner
+			{where}
+			ORDER BY pi.posting_date DESC, pi.name DESC
+			LIMIT %(limit)s OFFSET %(start)s
+			""",
+			page_params,
+			as_dict=True,
 		)
 
-		count_rows = frappe.get_all(
-			"Purchase Invoice", filters=filters, or_filters=or_filters, fields=["count(name) as total"]
-		)
-		total_count = count_rows[0].total if count_rows else 0
+		next_cursor = None
+		if len(invoices) == limit:
+			next_cursor = f"{invoices[-1].posting_date}|{invoices[-1].name}"
 
 		# Batch fetch related data
 		invoice_names = [inv.name for inv in invoices]
-		user_ids_list = list(set([inv.owner for inv in invoices]))
-
-		user_names_map = _batch_fetch_user_names(user_ids_list)
+		user_names_map = {inv.owner: inv.pop("user_full_name") or inv.owner for inv in invoices}
 		payment_methods_map = _batch_fetch_payment_methods(invoice_names)
 		items_map = _batch_fetch_items(invoice_names)
 
 		# Process and enrich invoices
 		_process_invoices(invoices, user_names_map, payment_methods_map, items_map)
 
-		return {"success": True, "data": invoices, "total_count": total_count}
+		return {"success": True, "data": invoices, "total_count": total_count, "next_cursor": next_cursor}
 
 	except Exception as e:
 		frappe.log_error(frappe.get_traceback(), "Error fetching purchase invoices")
 		return {"success": False, "error": str(e)}
 
 
-def _get_user_ids_by_full_name(full_name):
-	"""Get user IDs (emails) that match the given full name."""
-	try:
-		users = frappe.get_all(
-			"User",
-			filters={"full_name": full_name, "enabled": 1},
-			fields=["name"],
-		)
-		return [user.name for user in users] if users else []
-	except Exception as e:
-		frappe.logger().error(f"Error getting user IDs by full name '{full_name}': {e}")
-		return []
+def _build_list_conditions(search=None, user_name=None, supplier=None):
+	"""Build parameterized WHERE conditions on `tabPurchase Invoice` pi for the invoice list."""
+	conditions = []
+	params = {}
 
+	if user_name and user_name != "all":
+		conditions.append(
+			"pi.owner IN (SELECT name FROM `tabUser` WHERE full_name = %(user_name)s AND enabled = 1)"
+		)
+		params["user_name"] = user_name
 
-def _build_filters_and_fields(user_ids=None):
-	"""Build filters and fields list for purchase invoice query.
+	if supplier:
+		conditions.append("pi.supplier = %(supplier)s")
+		params["supplier"] = supplier
 
-	Args:
-		user_ids: List of user IDs to filter by. If provided, only returns invoices for these users.
-	"""
-	filters = {}
-
-	# Build fields list
-	fields = [
-		"name",
-		"posting_date",
-		"posting_time",
-		"owner",
-		"supplier",
-		"supplier_name",
-		"base_grand_total",
-		"base_rounded_total",
-		"status",
-		"discount_amount",
-		"total_taxes_and_charges",
-		"currency",
-		"company",
-		"outstanding_amount",
-		"paid_amount",
-		"is_return",
-		"return_against",
-		"is_paid",
-		"mode_of_payment",  # For invoices paid directly at creation (is_paid=1)
-	]
-
-	# Add user filter if provided
-	if user_ids:
-		if len(user_ids) == 1:
-			filters["owner"] = user_ids[0]
-		else:
-			filters["owner"] = ["in", user_ids]
-		frappe.logger().info(f"Filtering by user IDs: {user_ids}")
+	if search and search.strip():
+		conditions.append(
+			"(pi.name LIKE %(search)s OR pi.supplier_name LIKE %(search)s OR pi.supplier LIKE %(search)s)"
+		)
+		params["search"] = f"%{escape_like(search.strip())}%"
 
-	return filters, fields
+	return conditions, params
 
 
-def _build_search_filters(search):
-	"""Build OR filters for search functionality."""
-	if not search or not search.strip():
-		return None
+def _get_cached_invoice_count(conditions, params):
+	"""Count invoices matching the conditions, cached per filter until an invoice is added or deleted."""
+	cache_field = hashlib.md5(
+		json.dumps([conditions, params], sort_keys=True).encode(), usedforsecurity=False
+	).hexdigest()
+	cache = frappe.cache()
 
-	search_term = search.strip()
-	return [
-		["name", "like", f"%{search_term}%"],
-		["supplier_name", "like", f"%{search_term}%"],
-		["supplier", "like", f"%{search_term}%"],
-	]
+	total_count = cache.hget(PURCHASE_INVOICE_COUNT_CACHE_KEY, cache_field)
+	if total_count is None:
+		where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+		total_count = frappe.db.sql(f"SELECT COUNT(*) FROM `tabPurchase Invoice` pi {where}", params)[0][0]
+		cache.hset(PURCHASE_INVOICE_COUNT_CACHE_KEY, cache_field, total_count)
+	return total_count
 
 
-def _batch_fetch_user_names(user_ids):
-	"""Batch fetch user names for given user IDs."""
-	if not user_ids:
-		return {}
-
-	user_query = """
-		SELECT name, full_name
-		FROM `tabUser`
-		WHERE name IN ({})
-	""".format(",".join([f"'{uid}'" for uid in user_ids]))
-	user_results = frappe.db.sql(user_query, as_dict=True)
-	return {user.name: user.full_name or user.name for user in user_results}
+def clear_purchase_invoice_count_cache(doc=None, method=None):
+	"""Purchase Invoice doc_event: drop the cached list counts when an invoice is added or deleted."""
+	frappe.cache().delete_value(PURCHASE_INVOICE_COUNT_CACHE_KEY)
 
 
 def _batch_fetch_payment_methods(invoice_names):
@@ -179,15 +164,18 @@ def _batch_fetch_payment_methods(invoice_names):
 		return {}
 
 	# For Purchase Invoices, payments are tracked via Payment Entry references
-	payment_query = """
+	payment_results = frappe.db.sql(
+		"""
 		SELECT per.reference_name as parent, pe.mode_of_payment, per.allocated_amount as amount
 		FROM `tabPayment Entry Reference` per
 		JOIN `tabPayment Entry` pe ON pe.name = per.parent
 		WHERE per.reference_doctype = 'Purchase Invoice'
-		AND per.reference_name IN ({})
+		AND per.reference_name IN %(invoice_names)s
 		AND pe.docstatus = 1
-	""".format(",".join([f"'{name}'" for name in invoice_names]))
-	payment_results = frappe.db.sql(payment_query, as_dict=True)
+		""",
+		{"invoice_names": tuple(invoice_names)},
+		as_dict=True,
+	)
 
 	# Group by parent invoice
 	payment_methods_map = {}
@@ -206,12 +194,16 @@ def _batch_fetch_items(invoice_names):
 	if not invoice_names:
 		return {}
 
-	items_query = """
+	items_results = frappe.db.sql(
+		"""
 		SELECT parent, item_code, item_name, qty, rate, amount, description
 		FROM `tabPurchase Invoice Item`
-		WHERE parent IN ({})
-	""".format(",".join([f"'{name}'" for name in invoice_names]))
-	items_results = frappe.db.sql(items_query, as_dict=True)
+		WHERE parent IN %(invoice_names)s
+		ORDER BY parent, idx
+		""",
+		{"invoice_names": tuple(invoice_names)},
+		as_dict=True,
+	)
 
 	# Group by parent invoice
 	items_map = {}
@@ -736,8 +728,6 @@ def create_purchase_invoice(data):
 			- taxTemplate: str (optional)
 			- attachment: {file_url} (optional)
 	"""
-	import json
-	from datetime import datetime, timedelta
 	from frappe.utils import nowdate, nowtime
 	from klik_pos.klik_pos.utils import get_current_pos_profile
 	
@@ -769,6 +759,9 @@ def create_purchase_invoice(data):
 		# Get POS profile for warehouse and company
 		pos_profile = get_current_pos_profile()
 
+		# Resolve item masters, UOM factors and accounts up front so the line loop stays in memory
+		context = _resolve_purchase_context(pos_profile.company, items, payment_methods)
+
 		# Build purchase invoice document
 		doc = frappe.new_doc("Purchase Invoice")
 		doc.supplier = supplier
@@ -776,7 +769,7 @@ def create_purchase_invoice(data):
 		doc.posting_date = nowdate()
 		doc.posting_time = nowtime()
 		doc.set_posting_time = 1
-		doc.currency = frappe.db.get_value("Company", pos_profile.company, "default_currency")
+		doc.currency = context.currency
 		doc.conversion_rate = 1.0
 
 		# CRITICAL: Always update stock for purchase invoices in POS
@@ -787,64 +780,11 @@ def create_purchase_invoice(data):
 		if tax_template:
 			doc.taxes_and_charges = tax_template
 
-		# Get default expense account
-		company_doc = frappe.get_doc("Company", pos_profile.company)
-		default_expense_account = company_doc.default_expense_account
-
 		# Add items
-		items_with_price_changes = []
-		for item in items:
-			item_code = item.get("id") or item.get("item_code")
-			quantity = item.get("quantity") or item.get("qty", 1)
-			purchase_price = item.get("purchase_price") or item.get("rate", 0)
-			selling_price = item.get("selling_price", 0)
-			original_purchase_price = item.get("original_purchase_price", purchase_price)
-			original_selling_price = item.get("original_selling_price", selling_price)
-			uom = item.get("uom")
-			batch = item.get("batch")
-			serial = item.get("serial")
-
-			# Validate item exists
-			if not frappe.db.exists("Item", item_code):
-				frappe.throw(_("Item '{0}' does not exist").format(item_code))
-
-			item_doc = frappe.get_doc("Item", item_code)
-
-			item_data = {
-				"item_code": item_code,
-				"qty": quantity,
-				"rate": purchase_price,
-				"warehouse": pos_profile.warehouse,
-				"expense_account": default_expense_account,
-			}
-
-			# Add UOM if provided
-			if uom:
-				item_data["uom"] = uom
-			else:
-				item_data["uom"] = item_doc.stock_uom
-
-			# Add batch if item has batch tracking
-			if batch and item_doc.has_batch_no:
-				item_data["batch_no"] = batch
-
-			# Add serial numbers if item has serial tracking
-			if serial and item_doc.has_serial_no:
-				item_data["serial_no"] = serial
-
+		item_rows, items_with_price_changes = _build_purchase_items(items, context, pos_profile.warehouse)
+		for item_data in item_rows:
 			doc.append("items", item_data)
 
-			# Track ALL items for price update check
-			# The update function will determine if records need to be created/updated
-			items_with_price_changes.append({
-				"item_code": item_code,
-				"purchase_price": purchase_price,
-				"selling_price": selling_price,
-				"original_purchase_price": original_purchase_price,
-				"original_selling_price": original_selling_price,
-				"uom": item_data["uom"],
-			})
-
 		# Handle payment
 		if is_credit_purchase:
 			# Credit purchase - no payment, full outstanding
@@ -854,27 +794,14 @@ def create_purchase_invoice(data):
 			total_payment = sum(flt(pm.get("amount", 0)) for pm in payment_methods)
 			if total_payment > 0:
 				doc.is_paid = 1
-				
+
 				# Set mode_of_payment and cash_bank_account - required when is_paid = 1
 				primary_mode = payment_methods[0].get("mode_of_payment", "Cash")
 				doc.mode_of_payment = primary_mode  # Store payment method on invoice for display
-				
-				try:
-					mode_of_payment_doc = frappe.get_doc("Mode of Payment", primary_mode)
-					cash_bank_account = None
-					
-					for account in mode_of_payment_doc.accounts:
-						if account.company == pos_profile.company:
-							cash_bank_account = account.default_account
-							break
-					
-					if not cash_bank_account:
-						cash_bank_account = company_doc.default_cash_account
-					
-					if cash_bank_account:
-						doc.cash_bank_account = cash_bank_account
-				except Exception as e:
-					frappe.log_error(f"Error getting cash/bank account: {e!s}")
+
+				cash_bank_account = context.mop_accounts.get(primary_mode) or context.cash_account
+				if cash_bank_account:
+					doc.cash_bank_account = cash_bank_account
 
 		# Save and submit the invoice
 		try:
@@ -897,26 +824,29 @@ def create_purchase_invoice(data):
 				# Use the first payment method for the payment entry
 				primary_mode = payment_methods[0].get("mode_of_payment", "Cash")
 				try:
-					payment_entry = _create_purchase_payment_entry(doc, primary_mode, total_payment)
+					payment_entry = _create_purchase_payment_entry(
+						doc,
+						primary_mode,
+						total_payment,
+						paid_from_account=context.mop_accounts.get(primary_mode) or context.cash_account,
+					)
 				except Exception as e:
 					frappe.log_error(frappe.get_traceback(), f"Payment Entry Error for {doc.name}")
 
-		# Update Item Prices if any changed
+		# Update Item Prices in one batch, or after commit when the caller does not wait for them
 		price_update_results = []
+		price_updates_queued = False
 		if items_with_price_changes:
-			for item_change in items_with_price_changes:
-				try:
-					result = _update_item_prices_with_validity(
-						item_change["item_code"],
-						item_change["purchase_price"],
-						item_change["selling_price"],
-						item_change["original_purchase_price"],
-						item_change["original_selling_price"],
-						item_change["uom"],
-					)
-					price_update_results.append(result)
-				except Exception as e:
-					frappe.log_error(frappe.get_traceback(), f"Error updating prices for {item_change['item_code']}")
+			if data.get("updatePricesInBackground"):
+				frappe.enqueue(
+					"klik_pos.api.purchase_invoice.update_item_prices_in_bulk",
+					queue="short",
+					price_changes=items_with_price_changes,
+					enqueue_after_commit=True,
+				)
+				price_updates_queued = True
+			else:
+				price_update_results = update_item_prices_in_bulk(items_with_price_changes)
 
 		# Attach bill if provided
 		attachment_result = None
@@ -947,6 +877,7 @@ def create_purchase_invoice(data):
 			},
 			"payment_entry": payment_entry.name if payment_entry else None,
 			"price_updates": price_update_results,
+			"price_updates_queued": price_updates_queued,
 			"attachment": attachment_result,
 			"processing_time": round(processing_time, 2),
 		}
@@ -957,25 +888,139 @@ def create_purchase_invoice(data):
 		return {"success": False, "message": str(e), "error": str(e)}
 
 
-def _create_purchase_payment_entry(purchase_invoice, mode_of_payment, amount):
-	"""Create a payment entry for the purchase invoice."""
+def _resolve_purchase_context(company, items, payment_methods):
+	"""
+	Fetch everything the invoice lines and payment need with a few set-based queries.
+
+	Returns:
+		frappe._dict with items (item_code -> master row), uom_matrix, currency,
+		expense_account, cash_account and mop_accounts (mode of payment -> account)
+	"""
+	item_codes = list({_get_line_item_code(line) for line in items if _get_line_item_code(line)})
+	item_masters = {}
+	if item_codes:
+		item_masters = {
+			row.name: row
+			for row in frappe.db.sql(
+				"""
+				SELECT name, stock_uom, has_batch_no, has_serial_no
+				FROM `tabItem`
+				WHERE name IN %(item_codes)s
+				""",
+				{"item_codes": tuple(item_codes)},
+				as_dict=True,
+			)
+		}
+
+	missing = [item_code for item_code in item_codes if item_code not in item_masters]
+	if missing:
+		frappe.throw(_("Item '{0}' does not exist").format(", ".join(missing)))
+
+	company_defaults = frappe.get_cached_value(
+		"Company",
+		company,
+		["default_currency", "default_expense_account", "default_cash_account"],
+		as_dict=True,
+	)
+	modes = {pm.get("mode_of_payment", "Cash") for pm in payment_methods}
+
+	return frappe._dict(
+		items=item_masters,
+		uom_matrix=get_uom_matrix(list(item_masters)),
+		currency=company_defaults.default_currency,
+		expense_account=company_defaults.default_expense_account,
+		cash_account=company_defaults.default_cash_account,
+		mop_accounts=_get_mode_of_payment_accounts(modes, company),
+	)
+
+
+def _get_mode_of_payment_accounts(modes_of_payment, company):
+	"""Return {mode of payment: default account} for one company with one query."""
+	modes_of_payment = [mode for mode in modes_of_payment if mode]
+	if not modes_of_payment:
+		return {}
+	return dict(
+		frappe.db.sql(
+			"""
+			SELECT parent, default_account
+			FROM `tabMode of Payment Account`
+			WHERE parent IN %(modes)s AND company = %(company)s AND IFNULL(default_account, '') != ''
+			""",
+			{"modes": tuple(modes_of_payment), "company": company},
+		)
+	)
+
+
+def _get_line_item_code(line):
+	return line.get("id") or line.get("item_code")
+
+
+def _build_purchase_items(items, context, warehouse):
+	"""
+	Turn cart lines into Purchase Invoice Item rows using only the pre-resolved context.
+
+	Returns:
+		(item rows, price changes for update_item_prices_in_bulk)
+	"""
+	item_rows = []
+	price_changes = []
+	for item in items:
+		item_code = _get_line_item_code(item)
+		item_master = context.items[item_code]
+		quantity = item.get("quantity") or item.get("qty", 1)
+		purchase_price = item.get("purchase_price") or item.get("rate", 0)
+		selling_price = item.get("selling_price", 0)
+		uom = item.get("uom") or item_master.stock_uom
+
+		item_data = {
+			"item_code": item_code,
+			"qty": quantity,
+			"rate": purchase_price,
+			"uom": uom,
+			"warehouse": warehouse,
+			"expense_account": context.expense_account,
+		}
+
+		conversion_factor = context.uom_matrix.get(item_code, {}).get("factors", {}).get(uom)
+		if conversion_factor:
+			item_data["conversion_factor"] = conversion_factor
+
+		# Add batch if item has batch tracking
+		if item.get("batch") and item_master.has_batch_no:
+			item_data["batch_no"] = item["batch"]
+
+		# Add serial numbers if item has serial tracking
+		if item.get("serial") and item_master.has_serial_no:
+			item_data["serial_no"] = item["serial"]
+
+		item_rows.append(item_data)
+
+		# Track ALL items for price update check
+		# The update function will determine if records need to be created/updated
+		price_changes.append(
+			{
+				"item_code": item_code,
+				"purchase_price": purchase_price,
+				"selling_price": selling_price,
+				"original_purchase_price": item.get("original_purchase_price", purchase_price),
+				"original_selling_price": item.get("original_selling_price", selling_price),
+				"uom": uom,
+			}
+		)
+
+	return item_rows, price_changes
+
+
+def _create_purchase_payment_entry(purchase_invoice, mode_of_payment, amount, paid_from_account=None):
+	"""Create a payment entry for the purchase invoice, paid from the given or the mode's account."""
 	try:
 		company = purchase_invoice.company
 		supplier = purchase_invoice.supplier
-		company_doc = frappe.get_doc("Company", company)
-		
-		# Get mode of payment account
-		mode_of_payment_doc = frappe.get_doc("Mode of Payment", mode_of_payment)
-		paid_from_account = None
-
-		for account in mode_of_payment_doc.accounts:
-			if account.company == company:
-				paid_from_account = account.default_account
-				break
 
 		if not paid_from_account:
-			# Get default cash account from company
-			paid_from_account = company_doc.default_cash_account
+			paid_from_account = _get_mode_of_payment_accounts([mode_of_payment], company).get(
+				mode_of_payment
+			) or frappe.get_cached_value("Company", company, "default_cash_account")
 
 		if not paid_from_account:
 			frappe.log_error(f"No payment account found for {mode_of_payment}")
@@ -1011,158 +1056,202 @@ def _create_purchase_payment_entry(purchase_invoice, mode_of_payment, amount):
 		return None
 
 
-def _update_item_prices_with_validity(
-	item_code,
-	new_purchase_price,
-	new_selling_price,
-	original_purchase_price=None,
-	original_selling_price=None,
-	uom=None,
-):
+def update_item_prices_in_bulk(price_changes):
 	"""
-	Update Item Prices with valid_from/valid_upto dates.
-	
-	Logic:
-	1. If Item Price record exists and price changed: set valid_upto on old, create new with valid_from
-	2. If Item Price record exists and price NOT changed: do nothing
-	3. If NO Item Price record exists: create new record (even if price wasn't changed in cart)
-	
-	This ensures Item Price records always exist for both buying and selling.
+	Record the buying and selling prices of many purchased items with validity dates.
+
+	Logic per item, price list and UOM:
+	1. If an active Item Price exists and the price changed: set valid_upto on it and create a new
+	   record with valid_from today
+	2. If an active Item Price exists and the price did not change: do nothing
+	3. If no active Item Price exists: create one without validity dates
+
+	Only general prices (no customer, supplier or batch) are maintained. A price that already
+	started today is repriced in place instead of being closed, so an inserted row never shares
+	item, price list, UOM and validity with an existing one (ERPNext's duplicate check, which
+	bulk_insert skips).
+
+	Default price lists are resolved once, active prices are read with one query per price list,
+	superseded rows are closed with one UPDATE per price list and new rows are bulk-inserted. The
+	writes run under a savepoint: a failure undoes only the price changes, never the caller's
+	invoice or payment.
+
+	Args:
+		price_changes: list of {item_code, purchase_price, selling_price, uom}
+
+	Returns:
+		list of {item_code, buying_updated, selling_updated, buying_created, selling_created}
 	"""
-	from datetime import datetime, timedelta
-	
+	frappe.db.savepoint("klik_pos_item_prices")
 	try:
-		results = {"item_code": item_code, "buying_updated": False, "selling_updated": False, "buying_created": False, "selling_created": False}
-		now = datetime.now()
-
-		# Get default price lists
-		buying_price_list = frappe.db.get_single_value("Buying Settings", "buying_price_list")
-		if not buying_price_list:
-			buying_price_list = frappe.db.get_value("Price List", {"buying": 1, "enabled": 1}, "name")
-
-		selling_price_list = frappe.db.get_single_value("Selling Settings", "selling_price_list")
-		if not selling_price_list:
-			selling_price_list = frappe.db.get_value("Price List", {"selling": 1, "enabled": 1}, "name")
-
-		# Get item's stock UOM if not provided
-		if not uom:
-			uom = frappe.db.get_value("Item", item_code, "stock_uom") or "Nos"
-
-		# Handle buying price
-		if new_purchase_price is not None and buying_price_list:
-			price_changed = original_purchase_price is None or flt(new_purchase_price) != flt(original_purchase_price)
-			result = _update_or_create_price_with_validity(
-				item_code=item_code,
-				price_list=buying_price_list,
-				new_price=new_purchase_price,
-				is_buying=True,
-				uom=uom,
-				now=now,
-				price_changed=price_changed,
+		price_lists = get_default_price_lists()
+		item_codes = list({change["item_code"] for change in price_changes})
+		item_details = {
+			row.name: row
+			for row in frappe.db.sql(
+				"SELECT name, item_name, stock_uom FROM `tabItem` WHERE name IN %(item_codes)s",
+				{"item_codes": tuple(item_codes)},
+				as_dict=True,
 			)
-			if result == "updated":
-				results["buying_updated"] = True
-			elif result == "created":
-				results["buying_created"] = True
-
-		# Handle selling price
-		if new_selling_price is not None and selling_price_list:
-			price_changed = original_selling_price is None or flt(new_selling_price) != flt(original_selling_price)
-			result = _update_or_create_price_with_validity(
-				item_code=item_code,
-				price_list=selling_price_list,
-				new_price=new_selling_price,
-				is_buying=False,
-				uom=uom,
-				now=now,
-				price_changed=price_changed,
+		}
+
+		# The last line of an item and UOM decides its price
+		wanted = {"buying": {}, "selling": {}}
+		for change in price_changes:
+			item = item_details.get(change["item_code"])
+			if not item:
+				continue
+			uom = change.get("uom") or item.stock_uom or "Nos"
+			for key, price_field in (("buying", "purchase_price"), ("selling", "selling_price")):
+				if change.get(price_field) is not None and key in price_lists:
+					wanted[key][(change["item_code"], uom)] = flt(change[price_field])
+
+		today = nowdate()
+		now = now_datetime()
+		user = frappe.session.user
+		results = {
+			item_code: {
+				"item_code": item_code,
+				"buying_updated": False,
+				"selling_updated": False,
+				"buying_created": False,
+				"selling_created": False,
+			}
+			for item_code in item_codes
+		}
+		new_rows = []
+
+		for key, prices in wanted.items():
+			if not prices:
+				continue
+			price_list, currency = price_lists[key]
+			active = _get_active_item_prices(
+				price_list, key == "buying", {item_code for item_code, _uom in prices}, today
+			)
+
+			superseded = []
+			repriced = {}
+			for (item_code, uom), new_price in prices.items():
+				existing = active.get((item_code, uom)) or active.get((item_code, ""))
+				if existing and flt(existing.price_list_rate) == new_price:
+					continue
+
+				if existing and existing.uom == uom and existing.valid_from == getdate(today):
+					# Closing it would leave valid_upto before valid_from and duplicate its start date
+					repriced[existing.name] = new_price
+					results[item_code][f"{key}_updated"] = True
+					continue
+
+				if existing:
+					superseded.append(existing.name)
+					results[item_code][f"{key}_updated"] = True
+				else:
+					results[item_code][f"{key}_created"] = True
+
+				new_rows.append(
+					(
+						frappe.generate_hash(length=10),
+						item_code,
+						item_details[item_code].item_name,
+						uom,
+						price_list,
+						new_price,
+						currency,
+						1 if key == "buying" else 0,
+						0 if key == "buying" else 1,
+						today if existing else None,
+						user,
+						user,
+						now,
+						now,
+					)
+				)
+
+			if superseded:
+				frappe.db.sql(
+					"UPDATE `tabItem Price` SET valid_upto = %(valid_upto)s WHERE name IN %(names)s",
+					{"valid_upto": (now - timedelta(seconds=1)).date(), "names": tuple(superseded)},
+				)
+			if repriced:
+				values = {"names": tuple(repriced), "modified": now, "user": user}
+				cases = []
+				for i, (name, new_price) in enumerate(repriced.items()):
+					cases.append(f"WHEN %(name_{i})s THEN %(rate_{i})s")
+					values.update({f"name_{i}": name, f"rate_{i}": new_price})
+				frappe.db.sql(
+					f"""
+					UPDATE `tabItem Price`
+					SET price_list_rate = CASE name {" ".join(cases)} END,
+					    modified = %(modified)s, modified_by = %(user)s
+					WHERE name IN %(names)s
+					""",
+					values,
+				)
+
+		if new_rows:
+			frappe.db.bulk_insert(
+				"Item Price",
+				fields=[
+					"name",
+					"item_code",
+					"item_name",
+					"uom",
+					"price_list",
+					"price_list_rate",
+					"currency",
+					"buying",
+					"selling",
+					"valid_from",
+					"owner",
+					"modified_by",
+					"creation",
+					"modified",
+				],
+				values=new_rows,
 			)
-			if result == "updated":
-				results["selling_updated"] = True
-			elif result == "created":
-				results["selling_created"] = True
 
-		frappe.db.commit()
-		return results
+		return list(results.values())
 
 	except Exception as e:
-		frappe.log_error(frappe.get_traceback(), f"Error updating prices for {item_code}")
-		return {"item_code": item_code, "error": str(e)}
+		frappe.db.rollback(save_point="klik_pos_item_prices")
+		frappe.log_error(frappe.get_traceback(), "Error updating purchase item prices")
+		return [{"item_code": change["item_code"], "error": str(e)} for change in price_changes]
 
 
-def _update_or_create_price_with_validity(item_code, price_list, new_price, is_buying, uom, now, price_changed):
+def _get_active_item_prices(price_list, is_buying, item_codes, today):
 	"""
-	Update or create an Item Price with validity dates.
-	
+	Return the current general (no customer, supplier or batch) Item Price of many items in one price list.
+
 	Returns:
-		"updated" - if existing price was ended and new one created
-		"created" - if no existing price and new one was created
-		None - if no action needed (price exists and unchanged)
+		dict of (item_code, uom) -> row, where rows without a UOM are keyed by an empty uom
 	"""
-	from datetime import timedelta
-	
-	# Find existing active price entry (not expired)
-	today = now.date()
-	
-	# Query for existing prices, filtering out expired ones
-	existing_prices = frappe.db.sql("""
-		SELECT name, price_list_rate, valid_from, valid_upto
+	rows = frappe.db.sql(
+		"""
+		SELECT name, item_code, IFNULL(uom, '') as uom, price_list_rate, valid_from
 		FROM `tabItem Price`
-		WHERE item_code = %s
-		AND price_list = %s
-		AND buying = %s
-		AND selling = %s
-		AND (uom = %s OR uom IS NULL OR uom = '')
-		AND (valid_upto IS NULL OR valid_upto >= %s)
+		WHERE item_code IN %(item_codes)s
+		AND price_list = %(price_list)s
+		AND buying = %(buying)s
+		AND selling = %(selling)s
+		AND IFNULL(customer, '') = '' AND IFNULL(supplier, '') = '' AND IFNULL(batch_no, '') = ''
+		AND (valid_from IS NULL OR valid_from <= %(today)s)
+		AND (valid_upto IS NULL OR valid_upto >= %(today)s)
 		ORDER BY valid_from DESC, creation DESC
-		LIMIT 1
-	""", (item_code, price_list, 1 if is_buying else 0, 0 if is_buying else 1, uom, today), as_dict=True)
-
-	if existing_prices:
-		existing = existing_prices[0]
-		
-		# Check if price actually changed
-		if flt(existing.price_list_rate) == flt(new_price):
-			# Price unchanged and record exists - no action needed
-			return None
-		
-		# Price changed - end the existing price validity and create new
-		valid_upto = now - timedelta(seconds=1)
-		frappe.db.set_value(
-			"Item Price",
-			existing.name,
-			"valid_upto",
-			valid_upto,
-			update_modified=False,
-		)
-		
-		# Create new price entry with valid_from = now
-		new_price_doc = frappe.get_doc({
-			"doctype": "Item Price",
-			"item_code": item_code,
+		""",
+		{
+			"item_codes": tuple(item_codes),
 			"price_list": price_list,
-			"price_list_rate": new_price,
 			"buying": 1 if is_buying else 0,
 			"selling": 0 if is_buying else 1,
-			"uom": uom,
-			"valid_from": today,
-		})
-		new_price_doc.insert(ignore_permissions=True)
-		return "updated"
-	else:
-		# No existing price record - create new one (without valid_from since it's the first)
-		new_price_doc = frappe.get_doc({
-			"doctype": "Item Price",
-			"item_code": item_code,
-			"price_list": price_list,
-			"price_list_rate": new_price,
-			"buying": 1 if is_buying else 0,
-			"selling": 0 if is_buying else 1,
-			"uom": uom,
-			# No valid_from or valid_upto for the first entry
-		})
-		new_price_doc.insert(ignore_permissions=True)
-		return "created"
+			"today": today,
+		},
+		as_dict=True,
+	)
+
+	active = {}
+	for row in rows:
+		active.setdefault((row.item_code, row.uom), row)
+	return active
 
 
 def _attach_file_to_invoice(invoice_name, file_url):
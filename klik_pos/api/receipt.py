@@ -0,0 +1,175 @@
+"""
+Receipt PDFs rendered once per invoice and print format, shared by every delivery channel.
+
+A receipt is addressed by its inputs: the File name carries a digest of the print format, language
+and the invoice's `modified`, so repeated sends and reprints resolve to the File already on disk
+while any change to the invoice yields a new address. POS invoices are rendered by a background
+job queued on submit, and email/SMS/WhatsApp sends are composed in delivery jobs that reuse the
+stored PDF before handing the message to the outbound queue.
+"""
+
+import hashlib
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import get_url
+
+from klik_pos.api.jobs import publish_job_progress, set_job_status
+from klik_pos.api.outbound import JOB_KIND
+
+RECEIPT_CACHE_KEY = "klik_pos_receipt"
+RECEIPT_CACHE_TTL = 86400
+RENDER_LOCK_TIMEOUT = 120
+RENDER_WAIT_SECONDS = 30
+
+
+def enqueue_receipt_render(doc, method=None):
+	"""Sales Invoice on_submit: render the POS receipt in the background once the submit commits."""
+	if not doc.get("pos_profile"):
+		return
+
+	print_format = get_receipt_print_format(doc.pos_profile)
+	frappe.enqueue(
+		"klik_pos.api.receipt.render_receipt",
+		queue="short",
+		job_id=f"klik_pos_receipt::{doc.name}::{print_format}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		invoice=doc.name,
+		print_format=print_format,
+	)
+
+
+def render_receipt(invoice, print_format=None):
+	"""Background job: make sure the invoice's receipt is stored."""
+	get_receipt_file_url(invoice, print_format)
+
+
+def get_receipt_print_format(pos_profile=None):
+	"""The receipt print format of a POS Profile, falling back to "Standard"."""
+	if not pos_profile:
+		return "Standard"
+	return frappe.get_cached_value("POS Profile", pos_profile, "custom_pos_printformat") or "Standard"
+
+
+def get_receipt_file_url(invoice, print_format=None):
+	"""Return the file_url of the invoice's receipt PDF, rendering it only if it is not stored yet."""
+	invoice_doc = frappe.db.get_value("Sales Invoice", invoice, ["pos_profile", "modified"], as_dict=True)
+	if not invoice_doc:
+		frappe.throw(_("Sales Invoice {0} not found").format(invoice), frappe.DoesNotExistError)
+
+	print_format = print_format or get_receipt_print_format(invoice_doc.pos_profile)
+	file_name = _receipt_file_name(invoice, print_format, invoice_doc.modified)
+	return _find_receipt(invoice, file_name) or _render_receipt(invoice, print_format, file_name)
+
+
+def get_receipt_content(invoice, print_format=None):
+	"""Return the bytes of the invoice's receipt PDF."""
+	file_url = get_receipt_file_url(invoice, print_format)
+	return frappe.get_doc("File", {"file_url": file_url}).get_content()
+
+
+@frappe.whitelist()
+def get_receipt_url(invoice_name, print_format=None):
+	"""Full URL of the stored receipt PDF, for reprints and share links."""
+	frappe.has_permission("Sales Invoice", "read", invoice_name, throw=True)
+	return get_url(get_receipt_file_url(invoice_name, print_format))
+
+
+def clear_receipt_cache(doc, method=None):
+	"""File on_trash: forget a deleted receipt so it is rendered again on the next request."""
+	if doc.attached_to_doctype == "Sales Invoice" and doc.file_name:
+		frappe.cache().delete_value(f"{RECEIPT_CACHE_KEY}:{doc.file_name}")
+
+
+def _receipt_file_name(invoice, print_format, modified):
+	digest = hashlib.sha1(f"{print_format}|{frappe.local.lang}|{modified}".encode()).hexdigest()[:12]
+	return f"{invoice}-{digest}.pdf"
+
+
+def _find_receipt(invoice, file_name):
+	cache_key = f"{RECEIPT_CACHE_KEY}:{file_name}"
+	file_url = frappe.cache().get_value(cache_key)
+	if file_url:
+		return file_url
+
+	file_url = frappe.db.get_value(
+		"File",
+		{"attached_to_doctype": "Sales Invoice", "attached_to_name": invoice, "file_name": file_name},
+		"file_url",
+	)
+	if file_url:
+		frappe.cache().set_value(cache_key, file_url, expires_in_sec=RECEIPT_CACHE_TTL)
+	return file_url
+
+
+def _render_receipt(invoice, print_format, file_name):
+	"""Render and store the receipt; concurrent callers for the same receipt wait for one render."""
+	cache = frappe.cache()
+	cache_key = f"{RECEIPT_CACHE_KEY}:{file_name}"
+	lock_key = cache.make_key(f"{RECEIPT_CACHE_KEY}_lock:{file_name}")
+
+	if not cache.set(lock_key, 1, nx=True, ex=RENDER_LOCK_TIMEOUT):
+		# The cache entry is only written once the rendering transaction commits
+		deadline = time.monotonic() + RENDER_WAIT_SECONDS
+		while time.monotonic() < deadline:
+			time.sleep(0.5)
+			file_url = cache.get_value(cache_key)
+			if file_url:
+				return file_url
+
+	try:
+		pdf = frappe.get_print("Sales Invoice", invoice, print_format, as_pdf=True)
+		file_doc = frappe.get_doc(
+			{
+				"doctype": "File",
+				"file_name": file_name,
+				"attached_to_doctype": "Sales Invoice",
+				"attached_to_name": invoice,
+				"content": pdf,
+				"is_private": 0,
+			}
+		).insert(ignore_permissions=True)
+	except Exception:
+		cache.delete(lock_key)
+		raise
+
+	def publish_receipt():
+		cache.set_value(cache_key, file_doc.file_url, expires_in_sec=RECEIPT_CACHE_TTL)
+		cache.delete(lock_key)
+
+	frappe.db.after_commit.add(publish_receipt)
+	return file_doc.file_url
+
+
+def queue_invoice_delivery(channel, method, invoice=None, **send_kwargs):
+	"""
+	Queue method(**send_kwargs) to compose a message off the request and return its job handle.
+
+	The method hands its message to the outbound queue under the same id, so the handle can be
+	polled with klik_pos.api.outbound.get_outbound_message_status from composition to delivery.
+	"""
+	job_id = f"klik_pos_{channel}_{frappe.generate_hash(length=10)}"
+	set_job_status(JOB_KIND, job_id, {"status": "preparing", "channel": channel, "invoice": invoice})
+	frappe.enqueue(
+		"klik_pos.api.receipt.run_invoice_delivery",
+		queue="short",
+		job_id=job_id,
+		delivery_id=job_id,
+		channel=channel,
+		method=method,
+		send_kwargs=send_kwargs,
+	)
+	return job_id
+
+
+def run_invoice_delivery(delivery_id, channel, method, send_kwargs):
+	"""Background job: run a channel's compose method, which queues the message under delivery_id."""
+	frappe.flags.klik_pos_outbound_id = delivery_id
+	try:
+		frappe.get_attr(method)(**send_kwargs)
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(frappe.get_traceback(), f"Invoice {channel} delivery failed")
+		publish_job_progress(JOB_KIND, delivery_id, {"status": "failed", "channel": channel, "error": str(e)})
@@ -0,0 +1,195 @@
+import frappe
+from frappe.utils import now_datetime
+
+SERIAL_INDEX_DOCTYPE = "Klik Serial No Index"
+AVAILABLE_STATUSES = ("Active", "Available")
+
+
+def refresh_serial_on_update(doc, method=None):
+	"""Serial No doc_event: copy the saved serial's item, warehouse and status into the index."""
+	refresh_serial_index([doc.name])
+
+
+def remove_serial_from_index(doc, method=None):
+	"""Serial No doc_event: drop a deleted serial from the index."""
+	frappe.db.delete(SERIAL_INDEX_DOCTYPE, {"name": doc.name})
+
+
+def refresh_bundle_serials(doc, method=None):
+	"""
+	Serial and Batch Bundle doc_event: refresh the serials a bundle moves.
+
+	ERPNext updates Serial No warehouse and status after the bundle itself is submitted,
+	while the stock ledger is posted, so the refresh runs once the transaction commits.
+	"""
+	serial_nos = list({entry.serial_no for entry in doc.get("entries", []) if entry.serial_no})
+	if serial_nos:
+		frappe.enqueue(
+			"klik_pos.api.serial_index.refresh_serial_index",
+			queue="short",
+			serial_nos=serial_nos,
+			enqueue_after_commit=True,
+		)
+
+
+def refresh_serial_index(serial_nos, chunk_size=1000):
+	"""Upsert index rows for the given serials from Serial No and drop serials that no longer exist."""
+	serial_nos = list({serial_no for serial_no in serial_nos if serial_no})
+
+	for start in range(0, len(serial_nos), chunk_size):
+		chunk = serial_nos[start : start + chunk_size]
+		rows = frappe.db.sql(
+			"""
+			SELECT name, item_code, warehouse, status
+			FROM `tabSerial No`
+			WHERE name IN %(names)s
+			""",
+			{"names": tuple(chunk)},
+			as_dict=True,
+		)
+		_upsert_serials(rows)
+
+		missing = set(chunk) - {row.name for row in rows}
+		if missing:
+			frappe.db.delete(SERIAL_INDEX_DOCTYPE, {"name": ["in", list(missing)]})
+
+
+def rebuild_serial_index(chunk_size=5000):
+	"""
+	Rebuild the whole serial index in chunks.
+
+	Run with `bench --site <site> execute klik_pos.api.serial_index.rebuild_serial_index`.
+	"""
+	frappe.db.sql("DELETE FROM `tabKlik Serial No Index`")
+
+	total = 0
+	last_name = ""
+	while True:
+		rows = frappe.db.sql(
+			"""
+			SELECT name, item_code, warehouse, status
+			FROM `tabSerial No`
+			WHERE name > %s
+			ORDER BY name
+			LIMIT %s
+			""",
+			(last_name, chunk_size),
+			as_dict=True,
+		)
+		if not rows:
+			break
+
+		_upsert_serials(rows)
+		frappe.db.commit()
+		total += len(rows)
+		last_name = rows[-1].name
+
+	print(f"✅ Serial No index rebuilt for {total} serials")
+	return total
+
+
+def _upsert_serials(rows):
+	if not rows:
+		return
+
+	now = now_datetime()
+	user = frappe.session.user
+	placeholders = []
+	values = []
+	for row in rows:
+		placeholders.append("(%s, %s, %s, %s, %s, 0, 0, %s, %s, %s, %s)")
+		values.extend([row.name, row.name, row.item_code, row.warehouse, row.status, user, user, now, now])
+
+	frappe.db.sql(
+		f"""
+		INSERT INTO `tabKlik Serial No Index`
+			(name, serial_no, item_code, warehouse, status,
+			 docstatus, idx, owner, modified_by, creation, modified)
+		VALUES {", ".join(placeholders)}
+		ON DUPLICATE KEY UPDATE
+			item_code = VALUES(item_code),
+			warehouse = VALUES(warehouse),
+			status = VALUES(status),
+			modified = VALUES(modified)
+		""",
+		tuple(values),
+	)
+
+
+def lookup_serial(serial_no):
+	"""Return {item_code, warehouse, status} of a serial with one primary-key lookup, or None."""
+	if not serial_no:
+		return None
+	return frappe.db.get_value(
+		SERIAL_INDEX_DOCTYPE, serial_no, ["item_code", "warehouse", "status"], as_dict=True
+	)
+
+
+def get_available_serials(item_code, warehouse=None, limit=500):
+	"""List available serials of an item, optionally in one warehouse, from the index."""
+	filters = {"item_code": item_code, "status": ["in", AVAILABLE_STATUSES]}
+	if warehouse:
+		filters["warehouse"] = warehouse
+
+	return frappe.get_all(
+		SERIAL_INDEX_DOCTYPE, filters=filters, pluck="name", limit=limit, order_by="name asc"
+	)
+
+
+def check_serials(serial_lines, warehouse=None):
+	"""
+	Check many serial lines against the index with one query.
+
+	Args:
+		serial_lines: list of {"serial_no", "item_code"} dicts (item_code optional)
+		warehouse: warehouse the serials must be in, if any
+
+	Returns:
+		dict of serial_no -> {available, item_code, warehouse, status, reason}
+	"""
+	serial_nos = list({line.get("serial_no") for line in serial_lines if line.get("serial_no")})
+	if not serial_nos:
+		return {}
+
+	indexed = {
+		row.name: row
+		for row in frappe.db.sql(
+			"""
+			SELECT name, item_code, warehouse, status
+			FROM `tabKlik Serial No Index`
+			WHERE name IN %(names)s
+			""",
+			{"names": tuple(serial_nos)},
+			as_dict=True,
+		)
+	}
+
+	seen = set()
+	result = {}
+	for line in serial_lines:
+		serial_no = line.get("serial_no")
+		if not serial_no:
+			continue
+
+		row = indexed.get(serial_no)
+		reason = None
+		if not row:
+			reason = "not_found"
+		elif line.get("item_code") and row.item_code != line["item_code"]:
+			reason = "wrong_item"
+		elif row.status not in AVAILABLE_STATUSES:
+			reason = "not_available"
+		elif warehouse and row.warehouse != warehouse:
+			reason = "wrong_warehouse"
+		elif serial_no in seen:
+			reason = "duplicate"
+		seen.add(serial_no)
+
+		result[serial_no] = {
+			"available": reason is None,
+			"item_code": row.item_code if row else None,
+			"warehouse": row.warehouse if row else None,
+			"status": row.status if row else None,
+			"reason": reason,
+		}
+	return result
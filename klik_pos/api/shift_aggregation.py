@@ -0,0 +1,100 @@
+import frappe
+from frappe.utils import flt
+
+
+def aggregate_shift(opening_entry=None, pos_profile=None, posting_date=None):
+	"""
+	Aggregate submitted POS Sales Invoices for a shift (opening entry) or a profile's day.
+
+	Item quantities and payments are pre-aggregated per invoice in derived tables before they
+	are joined to the invoice header, so invoice-level totals are never multiplied by line count.
+
+	Returns:
+		dict with invoice_count, return_count, total_quantity, net_total,
+		total_taxes_and_charges, grand_total and payments keyed by mode of payment.
+	"""
+	conditions, values = _build_invoice_conditions("si", opening_entry, pos_profile, posting_date)
+	inner_conditions, _inner_values = _build_invoice_conditions("s", opening_entry, pos_profile, posting_date)
+
+	totals = frappe.db.sql(
+		f"""
+		SELECT
+			COUNT(si.name) as invoice_count,
+			COALESCE(SUM(si.is_return), 0) as return_count,
+			COALESCE(SUM(items.qty), 0) as total_quantity,
+			COALESCE(SUM(si.net_total), 0) as net_total,
+			COALESCE(SUM(si.total_taxes_and_charges), 0) as total_taxes_and_charges,
+			COALESCE(SUM(si.grand_total), 0) as grand_total
+		FROM `tabSales Invoice` si
+		LEFT JOIN (
+			SELECT sii.parent, SUM(sii.qty) as qty
+			FROM `tabSales Invoice Item` sii
+			JOIN `tabSales Invoice` s ON s.name = sii.parent
+			WHERE {inner_conditions}
+			GROUP BY sii.parent
+		) items ON items.parent = si.name
+		WHERE {conditions}
+		""",
+		values,
+		as_dict=True,
+	)[0]
+
+	payments = frappe.db.sql(
+		f"""
+		SELECT
+			pay.mode_of_payment,
+			SUM(pay.amount) as total_amount,
+			COUNT(pay.parent) as transactions
+		FROM `tabSales Invoice` si
+		JOIN (
+			SELECT sip.parent, sip.mode_of_payment, SUM(sip.amount) as amount
+			FROM `tabSales Invoice Payment` sip
+			JOIN `tabSales Invoice` s ON s.name = sip.parent
+			WHERE {inner_conditions}
+			GROUP BY sip.parent, sip.mode_of_payment
+		) pay ON pay.parent = si.name
+		WHERE {conditions}
+		GROUP BY pay.mode_of_payment
+		""",
+		values,
+		as_dict=True,
+	)
+
+	return {
+		"invoice_count": int(totals.invoice_count or 0),
+		"return_count": int(totals.return_count or 0),
+		"total_quantity": flt(totals.total_quantity),
+		"net_total": flt(totals.net_total),
+		"total_taxes_and_charges": flt(totals.total_taxes_and_charges),
+		"grand_total": flt(totals.grand_total),
+		"payments": {
+			row.mode_of_payment: {"amount": flt(row.total_amount), "transactions": int(row.transactions)}
+			for row in payments
+		},
+	}
+
+
+def _build_invoice_conditions(alias, opening_entry=None, pos_profile=None, posting_date=None):
+	"""Build the WHERE clause selecting the shift's submitted invoices for the given table alias."""
+	if not opening_entry and not (pos_profile and posting_date):
+		frappe.throw("Either an opening entry or a POS profile and posting date is required")
+
+	conditions = [f"{alias}.docstatus = 1"]
+	values = {}
+
+	if opening_entry:
+		conditions.append(f"{alias}.custom_pos_opening_entry = %(opening_entry)s")
+		values["opening_entry"] = opening_entry
+	else:
+		conditions.append(f"{alias}.custom_pos_opening_entry IS NOT NULL")
+		conditions.append(f"{alias}.custom_pos_opening_entry != ''")
+
+	if pos_profile:
+		conditions.append(f"{alias}.pos_profile = %(pos_profile)s")
+		values["pos_profile"] = pos_profile
+
+	if posting_date:
+		conditions.append(f"{alias}.posting_date = %(posting_date)s")
+		values["posting_date"] = posting_date
+
+	return " AND ".join(conditions), values
@@ -0,0 +1,241 @@
+import hashlib
+
+import frappe
+from frappe import _
+from frappe.utils import flt, now_datetime
+
+from klik_pos.api.shift_aggregation import aggregate_shift
+
+SHIFT_TOTALS_DOCTYPE = "Klik Shift Totals"
+SHIFT_PAYMENT_DOCTYPE = "Klik Shift Payment Total"
+
+
+def create_shift_totals(doc, method=None):
+	"""Create an empty running-totals record when a POS Opening Entry is submitted."""
+	if frappe.db.exists(SHIFT_TOTALS_DOCTYPE, doc.name):
+		return
+
+	frappe.get_doc(
+		{
+			"doctype": SHIFT_TOTALS_DOCTYPE,
+			"pos_opening_entry": doc.name,
+			"pos_profile": doc.pos_profile,
+			"user": doc.user,
+		}
+	).insert(ignore_permissions=True, ignore_if_duplicate=True)
+
+
+def update_shift_totals_on_submit(doc, method=None):
+	"""Add a submitted Sales Invoice (sale or return) to its shift's running totals."""
+	_apply_invoice_to_shift_totals(doc, 1)
+
+
+def update_shift_totals_on_cancel(doc, method=None):
+	"""Remove a cancelled Sales Invoice from its shift's running totals."""
+	_apply_invoice_to_shift_totals(doc, -1)
+
+
+def _apply_invoice_to_shift_totals(doc, sign):
+	"""
+	Apply the invoice's contribution to the shift totals with in-place increments.
+
+	Runs inside the submit/cancel transaction, so the totals move together with the invoice.
+	"""
+	opening_entry = doc.get("custom_pos_opening_entry")
+	if not opening_entry:
+		return
+
+	if not _lock_shift_totals(opening_entry):
+		# Shift opened before running totals existed: the rebuild already reflects this invoice
+		# because its docstatus has been written by the time on_submit/on_cancel runs.
+		rebuild_shift_totals(opening_entry)
+		return
+
+	modified = now_datetime()
+	frappe.db.sql(
+		"""
+		UPDATE `tabKlik Shift Totals`
+		SET invoice_count = invoice_count + %(count)s,
+		    return_count = return_count + %(returns)s,
+		    total_quantity = total_quantity + %(qty)s,
+		    net_total = net_total + %(net_total)s,
+		    total_taxes_and_charges = total_taxes_and_charges + %(taxes)s,
+		    grand_total = grand_total + %(grand_total)s,
+		    modified = %(modified)s
+		WHERE name = %(name)s
+		""",
+		{
+			"count": sign,
+			"returns": sign if doc.get("is_return") else 0,
+			"qty": sign * sum(flt(item.qty) for item in doc.get("items", [])),
+			"net_total": sign * flt(doc.net_total),
+			"taxes": sign * flt(doc.total_taxes_and_charges),
+			"grand_total": sign * flt(doc.grand_total),
+			"modified": modified,
+			"name": opening_entry,
+		},
+	)
+
+	payment_map = {}
+	for payment in doc.get("payments", []):
+		if payment.mode_of_payment:
+			payment_map[payment.mode_of_payment] = payment_map.get(payment.mode_of_payment, 0.0) + flt(
+				payment.amount
+			)
+
+	for mode_of_payment, amount in payment_map.items():
+		_increment_payment_total(opening_entry, mode_of_payment, sign * amount, sign, modified)
+
+
+def _lock_shift_totals(opening_entry):
+	"""
+	Lock the shift's totals record and return whether it exists.
+
+	When it is missing the POS Opening Entry row is locked as well, so concurrent submits of the
+	shift cannot both create the record: the second waits for the first to commit and its locking
+	read then sees the record instead of its own transaction's snapshot.
+	"""
+	query = "SELECT name FROM `tabKlik Shift Totals` WHERE name = %s FOR UPDATE"
+	if frappe.db.sql(query, (opening_entry,)):
+		return True
+
+	frappe.db.sql("SELECT name FROM `tabPOS Opening Entry` WHERE name = %s FOR UPDATE", (opening_entry,))
+	return bool(frappe.db.sql(query, (opening_entry,)))
+
+
+def _increment_payment_total(opening_entry, mode_of_payment, amount, transactions, modified):
+	"""Upsert the per-mode-of-payment row keyed by a deterministic child name."""
+	next_idx = frappe.db.sql(
+		"SELECT COALESCE(MAX(idx), 0) + 1 FROM `tabKlik Shift Payment Total` WHERE parent = %s",
+		(opening_entry,),
+	)[0][0]
+
+	frappe.db.sql(
+		"""
+		INSERT INTO `tabKlik Shift Payment Total`
+			(name, parent, parenttype, parentfield, idx, docstatus, owner, modified_by,
+			 creation, modified, mode_of_payment, amount, transactions)
+		VALUES
+			(%(name)s, %(parent)s, %(parenttype)s, 'payments', %(idx)s, 0, %(user)s, %(user)s,
+			 %(modified)s, %(modified)s, %(mode_of_payment)s, %(amount)s, %(transactions)s)
+		ON DUPLICATE KEY UPDATE
+			amount = amount + VALUES(amount),
+			transactions = transactions + VALUES(transactions),
+			modified = VALUES(modified)
+		""",
+		{
+			"name": _payment_row_name(opening_entry, mode_of_payment),
+			"parent": opening_entry,
+			"parenttype": SHIFT_TOTALS_DOCTYPE,
+			"idx": next_idx,
+			"user": frappe.session.user,
+			"modified": modified,
+			"mode_of_payment": mode_of_payment,
+			"amount": amount,
+			"transactions": transactions,
+		},
+	)
+
+
+def _payment_row_name(opening_entry, mode_of_payment):
+	return hashlib.sha1(f"{opening_entry}|{mode_of_payment}".encode()).hexdigest()[:10]
+
+
+def rebuild_shift_totals(opening_entry):
+	"""
+	Recompute the running totals for a shift from its submitted Sales Invoices.
+	Used for shifts opened before running totals existed and for manual repair.
+	"""
+	opening = frappe.db.get_value(
+		"POS Opening Entry", opening_entry, ["name", "pos_profile", "user"], as_dict=True
+	)
+	if not opening:
+		return None
+
+	totals = aggregate_shift(opening_entry=opening_entry)
+
+	is_new = not frappe.db.exists(SHIFT_TOTALS_DOCTYPE, opening_entry)
+	if is_new:
+		doc = frappe.new_doc(SHIFT_TOTALS_DOCTYPE)
+		doc.pos_opening_entry = opening_entry
+	else:
+		doc = frappe.get_doc(SHIFT_TOTALS_DOCTYPE, opening_entry)
+
+	doc.pos_profile = opening.pos_profile
+	doc.user = opening.user
+	doc.invoice_count = totals["invoice_count"]
+	doc.return_count = totals["return_count"]
+	doc.total_quantity = totals["total_quantity"]
+	doc.net_total = totals["net_total"]
+	doc.total_taxes_and_charges = totals["total_taxes_and_charges"]
+	doc.grand_total = totals["grand_total"]
+
+	# Payment rows carry the deterministic names later increments hit through ON DUPLICATE KEY
+	existing_rows = {row.name for row in doc.payments}
+	doc.set("payments", [])
+	for mode_of_payment, row in totals["payments"].items():
+		payment = doc.append(
+			"payments",
+			{
+				"name": _payment_row_name(opening_entry, mode_of_payment),
+				"mode_of_payment": mode_of_payment,
+				"amount": row["amount"],
+				"transactions": row["transactions"],
+			},
+		)
+		if payment.name not in existing_rows:
+			# A named child row is otherwise treated as stored and only UPDATEd
+			payment.set("__islocal", 1)
+
+	if is_new:
+		doc.insert(ignore_permissions=True, set_child_names=False)
+	else:
+		doc.save(ignore_permissions=True)
+
+	return doc
+
+
+def get_shift_totals(opening_entry):
+	"""
+	Return the running totals for a shift without touching Sales Invoices.
+
+	Returns:
+		dict with invoice_count, return_count, total_quantity, net_total,
+		total_taxes_and_charges, grand_total and payments keyed by mode of payment.
+	"""
+	fields = [
+		"invoice_count",
+		"return_count",
+		"total_quantity",
+		"net_total",
+		"total_taxes_and_charges",
+		"grand_total",
+	]
+	totals = frappe.db.get_value(SHIFT_TOTALS_DOCTYPE, opening_entry, fields, as_dict=True)
+	if not totals:
+		if not rebuild_shift_totals(opening_entry):
+			return None
+		totals = frappe.db.get_value(SHIFT_TOTALS_DOCTYPE, opening_entry, fields, as_dict=True)
+
+	payment_rows = frappe.get_all(
+		SHIFT_PAYMENT_DOCTYPE,
+		filters={"parent": opening_entry, "parenttype": SHIFT_TOTALS_DOCTYPE},
+		fields=["mode_of_payment", "amount", "transactions"],
+		order_by="idx asc",
+	)
+
+	totals["payments"] = {
+		row.mode_of_payment: {"amount": flt(row.amount), "transactions": int(row.transactions or 0)}
+		for row in payment_rows
+	}
+	return totals
+
+
+@frappe.whitelist()
+def repair_shift_totals(opening_entry):
+	"""Recompute a shift's running totals from its invoices (System Manager only)."""
+	frappe.only_for("System Manager")
+	doc = rebuild_shift_totals(opening_entry)
+	if not doc:
+		frappe.throw(_("POS Opening Entry {0} not found").format(opening_entry))
+	return get_shift_totals(opening_entry)
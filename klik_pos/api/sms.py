@@ -1,16 +1,17 @@
 import json
 
 import frappe
-from frappe.core.doctype.sms_settings.sms_settings import send_sms
-from frappe.utils import fmt_money, now
+from frappe.utils import fmt_money, get_url, now
 
-from klik_pos.klik_pos.utils import get_current_pos_profile
+from klik_pos.api.customer_phone import format_for_messaging
+from klik_pos.api.outbound import enqueue_message
+from klik_pos.api.receipt import get_receipt_file_url, get_receipt_print_format, queue_invoice_delivery
 
 
 @frappe.whitelist()
 def send_invoice_sms(**kwargs):
 	"""
-	Accepts frontend payload and sends invoice SMS using ERPNext's built-in SMS functionality.
+	Accepts frontend payload and queues the invoice SMS, with a link to the stored receipt PDF.
 	"""
 	data = kwargs
 
@@ -22,51 +23,57 @@ def send_invoice_sms(**kwargs):
 	if not (mobile and invoice_no):
 		frappe.throw("Mobile number and invoice number are required.")
 
-	try:
-		doc = frappe.get_doc("Sales Invoice", invoice_no)
-
-		# Get POS print format
-		pos_profile = get_current_pos_profile()
-		print_format = pos_profile.custom_pos_printformat or "Standard"
-
-		# Format invoice amount
-		invoice_amount = fmt_money(doc.rounded_total or doc.grand_total, currency=doc.currency)
-
-		# Create SMS message with invoice details
-		sms_message = f"""
+	if not frappe.db.exists("Sales Invoice", invoice_no):
+		frappe.throw(f"Sales Invoice {invoice_no} not found.")
+
+	job_id = queue_invoice_delivery(
+		"sms",
+		"klik_pos.api.sms.deliver_invoice_sms",
+		invoice_no,
+		mobile=mobile,
+		customer_name=customer_name,
+		invoice_no=invoice_no,
+		message_text=message_text,
+	)
+
+	return {
+		"status": "queued",
+		"job_id": job_id,
+		"recipient": mobile,
+		"invoice": invoice_no,
+		"timestamp": now(),
+	}
+
+
+def deliver_invoice_sms(mobile, customer_name, invoice_no, message_text=None):
+	"""Delivery job: queue the invoice SMS with a link to the stored receipt PDF."""
+	doc = frappe.get_doc("Sales Invoice", invoice_no)
+	print_format = get_receipt_print_format(doc.pos_profile)
+
+	# Format invoice amount
+	invoice_amount = fmt_money(doc.rounded_total or doc.grand_total, currency=doc.currency)
+
+	# Create SMS message with invoice details and the receipt link
+	sms_message = f"""
 Hi {customer_name}!
 Thank you for your purchase at {frappe.defaults.get_user_default('Company')}.
 Invoice: {doc.name}
 Amount: {invoice_amount}
+Receipt: {get_url(get_receipt_file_url(doc.name, print_format))}
 Thank you!
-		""".strip()
+	""".strip()
 
-		# Use custom message if provided
-		if message_text and message_text != "Your invoice is ready!":
-			sms_message = message_text
-
-		# Send SMS using ERPNext's built-in SMS functionality
-		send_sms(receiver_list=[mobile], msg=sms_message, success_msg=True)
-
-		return {
-			"status": "success",
-			"recipient": mobile,
-			"invoice": invoice_no,
-			"amount": invoice_amount,
-			"print_format": print_format,
-			"message": sms_message,
-			"timestamp": now(),
-		}
+	# Use custom message if provided
+	if message_text and message_text != "Your invoice is ready!":
+		sms_message = message_text
 
-	except Exception as e:
-		frappe.log_error(frappe.get_traceback(), "Send Invoice SMS Failed")
-		frappe.throw(f"Failed to send SMS: {e!s}")
+	return enqueue_message("sms", {"receivers": [format_for_messaging(mobile)], "message": sms_message})
 
 
 @frappe.whitelist()
 def send_sms_message(**kwargs):
 	"""
-	Send a simple SMS message using ERPNext's built-in SMS functionality.
+	Queue a simple SMS message, sent through ERPNext's built-in SMS functionality.
 	"""
 	data = kwargs
 
@@ -87,11 +94,14 @@ def send_sms_message(**kwargs):
 		else:
 			formatted_message = message_text
 
-		# Send SMS using ERPNext's built-in SMS functionality
-		send_sms(receiver_list=[mobile], msg=formatted_message, success_msg=True)
+		# Queue the SMS; it is sent through ERPNext's built-in SMS functionality
+		job_id = enqueue_message(
+			"sms", {"receivers": [format_for_messaging(mobile)], "message": formatted_message}
+		)
 
 		return {
-			"status": "success",
+			"status": "queued",
+			"job_id": job_id,
 			"recipient": mobile,
 			"message": formatted_message,
 			"timestamp": now(),
@@ -0,0 +1,408 @@
+import json
+
+import frappe
+from erpnext.stock.doctype.stock_reconciliation.stock_reconciliation import EmptyStockReconciliationItemsError
+from frappe import _
+from frappe.utils import flt, getdate, nowdate, nowtime
+
+from klik_pos.api.item import _fetch_batch_balances, _get_pos_context
+from klik_pos.api.jobs import get_job_status, publish_job_progress, set_job_status
+
+RECONCILIATION_CHUNK_SIZE = 1000
+# A stock take posts few, large documents so ERPNext queues one repost per document
+STOCK_TAKE_CHUNK_SIZE = 5000
+STOCK_TAKE_SYNC_LIMIT = 200
+JOB_KIND = "stock_take"
+
+
+def get_opening_stock_account(company, warehouse=None):
+	"""
+	Return the balance-sheet account opening stock is booked against.
+
+	Tries the warehouse's stock account, the company's default inventory account, any Stock
+	account and the company's Temporary account, in that order, skipping any Profit and Loss
+	account.
+	"""
+	candidates = []
+	if warehouse:
+		candidates.append(frappe.db.get_value("Warehouse", warehouse, "account"))
+	candidates.append(frappe.get_cached_value("Company", company, "default_inventory_account"))
+	for account_type in ("Stock", "Temporary"):
+		candidates.append(
+			frappe.db.get_value(
+				"Account",
+				{"company": company, "account_type": account_type, "is_group": 0},
+				"name",
+				order_by="creation DESC",
+			)
+		)
+	candidates = [account for account in candidates if account]
+	if candidates:
+		balance_sheet = {
+			row.name
+			for row in frappe.get_all(
+				"Account",
+				filters={"name": ["in", candidates], "report_type": ["!=", "Profit and Loss"]},
+				fields=["name"],
+			)
+		}
+		for account in candidates:
+			if account in balance_sheet:
+				return account
+
+	frappe.throw(
+		_(
+			"No suitable Asset account found for Opening Stock. Please configure a Stock Asset account "
+			"in Warehouse '{0}' or set Default Inventory Account in Company '{1}'"
+		).format(warehouse, company)
+	)
+
+
+def submit_stock_reconciliations(
+	company,
+	rows,
+	purpose="Opening Stock",
+	expense_account=None,
+	remarks=None,
+	posting_date=None,
+	chunk_size=RECONCILIATION_CHUNK_SIZE,
+	log_errors=True,
+):
+	"""
+	Post many stock rows as a few Stock Reconciliation documents of up to chunk_size rows.
+
+	Each document is submitted and committed on its own, so a failing chunk does not undo the
+	ones before it.
+
+	Args:
+		rows: list of dicts with item_code, warehouse, qty, valuation_rate and optional batch_no
+		purpose: "Opening Stock" or "Stock Reconciliation"
+		log_errors: Write an Error Log for each failing chunk
+
+	Returns:
+		list of {"name", "rows", "error", "unchanged"} per chunk, where rows are the indexes into
+		rows and unchanged marks a chunk ERPNext rejected because no row changes the stock
+	"""
+	if purpose == "Opening Stock" and not expense_account:
+		expense_account = get_opening_stock_account(company, rows[0]["warehouse"] if rows else None)
+
+	results = []
+	for start in range(0, len(rows), chunk_size):
+		chunk = rows[start : start + chunk_size]
+		indexes = list(range(start, start + len(chunk)))
+		items = []
+		for row in chunk:
+			item = {
+				"item_code": row["item_code"],
+				"warehouse": row["warehouse"],
+				"qty": flt(row["qty"]),
+				"valuation_rate": flt(row.get("valuation_rate")),
+				"allow_zero_valuation_rate": 0 if flt(row.get("valuation_rate")) else 1,
+			}
+			if row.get("batch_no"):
+				# Old-style batch fields let ERPNext build the Serial and Batch Bundles itself
+				item["use_serial_batch_fields"] = 1
+				item["batch_no"] = row["batch_no"]
+			items.append(item)
+
+		try:
+			reconciliation = frappe.get_doc(
+				{
+					"doctype": "Stock Reconciliation",
+					"purpose": purpose,
+					"company": company,
+					"posting_date": posting_date or nowdate(),
+					"posting_time": nowtime(),
+					"set_posting_time": 1 if posting_date else 0,
+					"expense_account": expense_account,
+					"remarks": remarks or purpose,
+					"items": items,
+				}
+			)
+			reconciliation.insert(ignore_permissions=True)
+			reconciliation.submit()
+			frappe.db.commit()
+			results.append({"name": reconciliation.name, "rows": indexes, "error": None, "unchanged": False})
+		except Exception as e:
+			frappe.db.rollback()
+			unchanged = isinstance(e, EmptyStockReconciliationItemsError)
+			if log_errors and not unchanged:
+				frappe.log_error(frappe.get_traceback(), "Error submitting Stock Reconciliation")
+			results.append({"name": None, "rows": indexes, "error": str(e), "unchanged": unchanged})
+
+	return results
+
+
+@frappe.whitelist()
+def bulk_stock_take(rows, warehouse=None, purpose="Stock Reconciliation", posting_date=None, remarks=None):
+	"""
+	Set the counted quantity of many items in one warehouse.
+
+	Args:
+		rows: list (or JSON) of {item_code, qty, batch_no (optional), valuation_rate (optional)}
+		warehouse: warehouse counted, defaults to the POS profile warehouse
+		purpose: "Stock Reconciliation" or "Opening Stock"
+		posting_date: posting date, defaults to today
+
+	Returns:
+		dict with reconciliations and per-row errors; takes of more than STOCK_TAKE_SYNC_LIMIT
+		rows run as a background job and return its job_id to poll with get_stock_take_status.
+	"""
+	try:
+		frappe.has_permission("Stock Reconciliation", "create", throw=True)
+		if isinstance(rows, str):
+			rows = json.loads(rows)
+		if purpose not in ("Stock Reconciliation", "Opening Stock"):
+			frappe.throw(_("Unsupported purpose: {0}").format(purpose))
+		warehouse = warehouse or _get_pos_context()[1]
+		if not warehouse:
+			frappe.throw(_("Warehouse is required"))
+
+		if len(rows) > STOCK_TAKE_SYNC_LIMIT:
+			job_id = f"klik_pos_stock_take_{frappe.generate_hash(length=10)}"
+			set_job_status(JOB_KIND, job_id, {"status": "queued", "total": len(rows)})
+			frappe.enqueue(
+				"klik_pos.api.stock_reconciliation.run_stock_take",
+				queue="long",
+				timeout=7200,
+				job_id=job_id,
+				stock_take_id=job_id,
+				rows=rows,
+				warehouse=warehouse,
+				purpose=purpose,
+				posting_date=posting_date,
+				remarks=remarks,
+				user=frappe.session.user,
+			)
+			return {"success": True, "queued": True, "job_id": job_id}
+
+		result = stock_take(rows, warehouse, purpose, posting_date, remarks)
+		return {"success": True, "queued": False, **result}
+
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Error in bulk stock take")
+		return {"success": False, "error": str(e)}
+
+
+@frappe.whitelist()
+def get_stock_take_status(job_id):
+	"""Return {status, total, reconciliations, errors} of a queued stock take."""
+	return get_job_status(JOB_KIND, job_id)
+
+
+def run_stock_take(stock_take_id, rows, warehouse, purpose, posting_date, remarks, user):
+	"""Background job for large stock takes."""
+	progress = {"status": "running", "total": len(rows), "user": user}
+	publish_job_progress(JOB_KIND, stock_take_id, progress)
+	try:
+		progress.update(stock_take(rows, warehouse, purpose, posting_date, remarks), status="completed")
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(frappe.get_traceback(), "Error in bulk stock take")
+		progress.update(status="failed", error=str(e))
+	publish_job_progress(JOB_KIND, stock_take_id, progress)
+
+
+def stock_take(rows, warehouse, purpose="Stock Reconciliation", posting_date=None, remarks=None):
+	"""
+	Validate counted rows in sets and post them as one or a few Stock Reconciliations.
+
+	Invalid rows are reported before any chunk is built, so chunks only hold rows that passed
+	validation. A chunk ERPNext still rejects is split in halves and retried, so a row that only
+	fails on submit does not take the rest of its chunk down with it.
+
+	Returns:
+		dict with posted (row count), unchanged (rows already at the counted stock),
+		reconciliations (names) and errors ({"row", "item_code", "error"})
+	"""
+	valid_rows, errors = validate_stock_take_rows(rows, warehouse, posting_date)
+	result = {"posted": 0, "unchanged": 0, "reconciliations": [], "errors": errors}
+	if not valid_rows:
+		return result
+
+	company = frappe.db.get_value("Warehouse", warehouse, "company")
+	_post_stock_take_rows(
+		result,
+		company,
+		valid_rows,
+		STOCK_TAKE_CHUNK_SIZE,
+		purpose=purpose,
+		remarks=remarks or _("Stock take"),
+		posting_date=posting_date,
+	)
+	return result
+
+
+def _post_stock_take_rows(result, company, rows, chunk_size, parent_error=None, **kwargs):
+	chunk_results = submit_stock_reconciliations(
+		company, rows, chunk_size=chunk_size, log_errors=parent_error is None, **kwargs
+	)
+	# Every half failing the way the whole chunk did means the document, not a row, is at fault
+	document_error = parent_error is not None and all(
+		chunk_result["error"] == parent_error for chunk_result in chunk_results
+	)
+
+	for chunk_result in chunk_results:
+		chunk = [rows[index] for index in chunk_result["rows"]]
+		if chunk_result["name"]:
+			result["reconciliations"].append(chunk_result["name"])
+			result["posted"] += len(chunk)
+		elif chunk_result["unchanged"]:
+			result["unchanged"] += len(chunk)
+		elif len(chunk) > 1 and not document_error:
+			_post_stock_take_rows(
+				result, company, chunk, (len(chunk) + 1) // 2, parent_error=chunk_result["error"], **kwargs
+			)
+		else:
+			result["errors"].extend(
+				{"row": row["row"], "item_code": row["item_code"], "error": chunk_result["error"]}
+				for row in chunk
+			)
+
+
+def validate_stock_take_rows(rows, warehouse, posting_date=None):
+	"""
+	Check counted rows against item masters, batches and bins with a fixed number of queries.
+
+	Rows ERPNext would reject on submit (missing, disabled, template or end-of-life items,
+	serialized items, negative quantities or rates, an item and batch counted twice) are
+	reported here with one error each, so they never reach a chunk.
+
+	Batch items counted without a batch use their only batch in stock in the warehouse, found
+	with one ledger aggregate. An item with no batch at all gets a new one. Rows without a
+	valuation rate take the warehouse's current rate, then the item's.
+
+	Returns:
+		(rows ready for submit_stock_reconciliations, errors)
+	"""
+	errors = []
+	parsed = []
+	for index, row in enumerate(rows, start=1):
+		item_code = (row.get("item_code") or "").strip()
+		try:
+			qty = float(row.get("qty"))
+		except (TypeError, ValueError):
+			errors.append({"row": index, "item_code": item_code, "error": _("Quantity must be a number")})
+			continue
+		if not item_code:
+			errors.append({"row": index, "item_code": item_code, "error": _("Item Code is required")})
+		elif qty < 0:
+			error = _("Stock quantity cannot be negative")
+			errors.append({"row": index, "item_code": item_code, "error": error})
+		elif flt(row.get("valuation_rate")) < 0:
+			error = _("Valuation rate cannot be negative")
+			errors.append({"row": index, "item_code": item_code, "error": error})
+		else:
+			parsed.append(
+				{
+					"row": index,
+					"item_code": item_code,
+					"warehouse": warehouse,
+					"qty": qty,
+					"batch_no": (row.get("batch_no") or "").strip() or None,
+					"valuation_rate": flt(row.get("valuation_rate")),
+				}
+			)
+	if not parsed:
+		return [], errors
+
+	item_codes = tuple({row["item_code"] for row in parsed})
+	items = {
+		item.name: item
+		for item in frappe.db.sql(
+			"""
+			SELECT i.name, i.has_batch_no, i.has_serial_no, i.is_stock_item, i.disabled,
+			       i.has_variants, i.end_of_life, i.valuation_rate,
+			       bin.valuation_rate as bin_valuation_rate
+			FROM `tabItem` i
+			LEFT JOIN `tabBin` bin ON bin.item_code = i.name AND bin.warehouse = %(warehouse)s
+			WHERE i.name IN %(item_codes)s
+			""",
+			{"item_codes": item_codes, "warehouse": warehouse},
+			as_dict=True,
+		)
+	}
+	batch_items = [code for code in item_codes if code in items and items[code].has_batch_no]
+	batches = {}
+	balances = {}
+	if batch_items:
+		for batch in frappe.db.sql(
+			"""
+			SELECT name, item FROM `tabBatch`
+			WHERE item IN %(item_codes)s AND disabled = 0
+			ORDER BY creation DESC
+			""",
+			{"item_codes": tuple(batch_items)},
+			as_dict=True,
+		):
+			batches.setdefault(batch.item, []).append(batch.name)
+		balances = _fetch_batch_balances(batch_items, warehouse)
+
+	posting_date = getdate(posting_date or nowdate())
+	valid = []
+	seen = set()
+	for row in parsed:
+		item = items.get(row["item_code"])
+		error = None
+		if not item:
+			error = _("Item '{0}' does not exist").format(row["item_code"])
+		elif item.disabled or not item.is_stock_item:
+			error = _("Item '{0}' is disabled or not a stock item").format(row["item_code"])
+		elif item.has_variants:
+			error = _("Item '{0}' is a template, count its variants instead").format(row["item_code"])
+		elif item.end_of_life and getdate(item.end_of_life) < posting_date:
+			error = _("Item '{0}' reached its end of life on {1}").format(row["item_code"], item.end_of_life)
+		elif item.has_serial_no:
+			error = _("Serialized item '{0}' must be counted by serial number").format(row["item_code"])
+		elif item.has_batch_no:
+			error = _resolve_stock_take_batch(row, batches.get(item.name, []), balances.get(item.name, []))
+		elif row["batch_no"]:
+			row["batch_no"] = None
+
+		if not error and (row["item_code"], row["batch_no"]) in seen:
+			error = _("Item '{0}' is counted more than once").format(row["item_code"])
+
+		if error:
+			errors.append({"row": row["row"], "item_code": row["item_code"], "error": error})
+			continue
+
+		seen.add((row["item_code"], row["batch_no"]))
+		row["valuation_rate"] = (
+			row["valuation_rate"] or flt(item.bin_valuation_rate) or flt(item.valuation_rate)
+		)
+		valid.append(row)
+
+	_create_stock_take_batches([row for row in valid if row.get("new_batch")])
+	return valid, errors
+
+
+def _resolve_stock_take_batch(row, item_batches, batches_in_stock):
+	"""Pick the batch of a counted batch item in place, returning an error message or None."""
+	if row["batch_no"]:
+		if row["batch_no"] not in item_batches:
+			return _("Batch '{0}' does not belong to item '{1}'").format(row["batch_no"], row["item_code"])
+		return None
+
+	if len(batches_in_stock) == 1:
+		row["batch_no"] = batches_in_stock[0]["batch_id"]
+	elif len(batches_in_stock) > 1:
+		return _("Item '{0}' has stock in several batches, count each batch separately").format(
+			row["item_code"]
+		)
+	elif item_batches:
+		row["batch_no"] = item_batches[0]
+	else:
+		row["batch_no"] = f"OPENING-{row['item_code'][:10]}-{frappe.generate_hash(length=6).upper()}"
+		row["new_batch"] = True
+	return None
+
+
+def _create_stock_take_batches(rows):
+	for row in rows:
+		del row["new_batch"]
+		frappe.get_doc({"doctype": "Batch", "batch_id": row["batch_no"], "item": row["item_code"]}).insert(
+			ignore_permissions=True
+		)
+	if rows:
+		# A failing chunk rolls back the whole transaction; the batches its rows are retried with must stay
+		frappe.db.commit()
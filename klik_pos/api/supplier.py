@@ -8,6 +8,10 @@ import json
 import frappe
 from frappe import _
 
+from klik_pos.api.party import fetch_primary_addresses, fetch_primary_contacts
+from klik_pos.api.supplier_search import search_suppliers
+from klik_pos.api.supplier_stats import get_supplier_stats, get_supplier_stats_map
+
 
 @frappe.whitelist(allow_guest=True)
 def get_suppliers(limit: int = 100, start: int = 0, search: str = ""):
@@ -18,54 +22,24 @@ def get_suppliers(limit: int = 100, start: int = 0, search: str = ""):
 	try:
 		result = []
 
-		# If there's a search term, search across name, supplier_name, contact email/phone
+		# If there's a search term, rank matches on name tokens, phone digits, email and tax id
 		if search:
-			like_param = f"%{search}%"
-
-			try:
-				limit_val = int(limit) if limit else 100
-			except Exception:
-				limit_val = 100
-			# Boost limits for search to show more matches
-			limit_val = max(limit_val, 500)
-
-			supplier_names = frappe.db.sql(
-				"""
-				SELECT DISTINCT s.name, s.supplier_name, s.supplier_type, s.supplier_group, s.country
-				FROM `tabSupplier` s
-				LEFT JOIN `tabDynamic Link` dl ON dl.link_doctype='Supplier' AND dl.link_name=s.name AND dl.parenttype='Contact'
-				LEFT JOIN `tabContact` ct ON ct.name = dl.parent
-				LEFT JOIN `tabContact Email` ce ON ce.parent = ct.name
-				LEFT JOIN `tabContact Phone` cp ON cp.parent = ct.name
-				WHERE s.disabled = 0 AND (
-					s.supplier_name LIKE %s OR s.name LIKE %s OR
-					ce.email_id LIKE %s OR cp.phone LIKE %s
-				)
-				ORDER BY s.creation DESC
-				LIMIT %s OFFSET %s
-				""",
-				(like_param, like_param, like_param, like_param, limit_val, int(start) or 0),
-				as_dict=True,
+			ranked_names, total_count = search_suppliers(
+				search,
+				limit=int(limit) if limit else 100,
+				start=int(start) if start else 0,
 			)
 
-			# Total count for search
-			total_count_row = frappe.db.sql(
-				"""
-				SELECT COUNT(DISTINCT s.name) as total
-				FROM `tabSupplier` s
-				LEFT JOIN `tabDynamic Link` dl ON dl.link_doctype='Supplier' AND dl.link_name=s.name AND dl.parenttype='Contact'
-				LEFT JOIN `tabContact` ct ON ct.name = dl.parent
-				LEFT JOIN `tabContact Email` ce ON ce.parent = ct.name
-				LEFT JOIN `tabContact Phone` cp ON cp.parent = ct.name
-				WHERE s.disabled = 0 AND (
-					s.supplier_name LIKE %s OR s.name LIKE %s OR
-					ce.email_id LIKE %s OR cp.phone LIKE %s
+			# Load the ranked page in one query and keep the rank order
+			rows_by_name = {}
+			if ranked_names:
+				rows = frappe.get_all(
+					"Supplier",
+					filters={"name": ["in", ranked_names]},
+					fields=["name", "supplier_name", "supplier_type", "supplier_group", "country"],
 				)
-				""",
-				(like_param, like_param, like_param, like_param),
-				as_dict=True,
-			)
-			total_count = (total_count_row[0].total if total_count_row else 0) or 0
+				rows_by_name = {row.name: row for row in rows}
+			supplier_names = [rows_by_name[name] for name in ranked_names if name in rows_by_name]
 		else:
 			# Original logic for when no search term
 			filters = {"disabled": 0}
@@ -87,48 +61,28 @@ def get_suppliers(limit: int = 100, start: int = 0, search: str = ""):
 
 			total_count = frappe.db.count("Supplier", filters=filters)
 
-		# Process each supplier to get detailed information
-		for supp in supplier_names:
-			doc = frappe.get_doc("Supplier", supp.name)
-
-			contact = (
-				frappe.db.get_value(
-					"Contact",
-					{"name": doc.supplier_primary_contact},
-					["first_name", "last_name", "email_id", "phone", "mobile_no"],
-					as_dict=True,
-				)
-				if doc.supplier_primary_contact
-				else None
-			)
+		# Enrich the page with a constant number of set-based queries
+		page_names = [supp.name for supp in supplier_names]
+		contacts_map = fetch_primary_contacts("Supplier", page_names)
+		addresses_map = fetch_primary_addresses("Supplier", page_names)
+		stats_map = get_supplier_stats_map(page_names)
 
-			address = (
-				frappe.db.get_value(
-					"Address",
-					{"name": doc.supplier_primary_address},
-					["address_line1", "city", "state", "country", "pincode"],
-					as_dict=True,
-				)
-				if doc.supplier_primary_address
-				else None
-			)
-
-			# Get supplier statistics
-			stats = get_supplier_statistics(doc.name)
-			supplier_stats = stats.get("data", {}) if stats.get("success") else {}
+		for supp in supplier_names:
+			supplier_stats = stats_map.get(supp.name, {})
 
 			result.append(
 				{
-					"id": doc.name,
-					"name": doc.name,
-					"supplier_name": doc.supplier_name,
-					"supplier_type": doc.supplier_type,
-					"supplier_group": doc.supplier_group,
-					"country": doc.country,
-					"contact": contact,
-					"address": address,
+					"id": supp.name,
+					"name": supp.name,
+					"supplier_name": supp.supplier_name,
+					"supplier_type": supp.supplier_type,
+					"supplier_group": supp.supplier_group,
+					"country": supp.country,
+					"contact": contacts_map.get(supp.name),
+					"address": addresses_map.get(supp.name),
 					"total_orders": supplier_stats.get("total_orders", 0),
-					"total_spent": supplier_stats.get("total_spent", 0),
+					"total_spent": supplier_stats.get("total_purchases", 0),
+					"total_outstanding": supplier_stats.get("total_outstanding", 0),
 					"last_purchase": supplier_stats.get("last_purchase"),
 				}
 			)
@@ -413,55 +367,15 @@ def get_supplier_groups():
 def get_supplier_statistics(supplier_id):
 	"""Get supplier statistics including total orders and total spent."""
 	try:
-		# Get total purchase invoices for the supplier
-		total_orders = frappe.db.count(
-			"Purchase Invoice",
-			filters={
-				"supplier": supplier_id,
-				"docstatus": 1,
-				"is_return": 0,
-				"status": ["!=", "Cancelled"],
-			},
-		)
-
-		# Get total amount spent with the supplier
-		total_spent_result = frappe.db.sql(
-			"""
-			SELECT COALESCE(SUM(grand_total), 0) as total_spent
-			FROM `tabPurchase Invoice`
-			WHERE supplier = %s
-			AND docstatus = 1
-			AND is_return = 0
-			AND status != 'Cancelled'
-			""",
-			(supplier_id,),
-			as_dict=True,
-		)
-
-		total_spent = total_spent_result[0].total_spent if total_spent_result else 0
-
-		# Get last purchase date
-		last_purchase_result = frappe.db.sql(
-			"""
-			SELECT MAX(posting_date) as last_purchase
-			FROM `tabPurchase Invoice`
-			WHERE supplier = %s
-			AND docstatus = 1
-			AND is_return = 0
-			AND status != 'Cancelled'
-			""",
-			(supplier_id,),
-			as_dict=True,
-		)
-
-		last_purchase = last_purchase_result[0].last_purchase if last_purchase_result else None
+		stats = get_supplier_stats(supplier_id)
 
 		return {
 			"success": True,
 			"data": {
-				"total_orders": total_orders,
-				"total_spent": total_spent,
-				"last_purchase": last_purchase,
+				"total_orders": stats["total_orders"],
+				"total_spent": stats["total_purchases"],
+				"total_outstanding": stats["total_outstanding"],
+				"last_purchase": stats["last_purchase"],
 			},
 		}
 
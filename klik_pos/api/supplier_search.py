@@ -0,0 +1,72 @@
+import re
+
+from klik_pos.api.party_search import MIN_PHONE_PREFIX, PartySearchIndex
+
+SEARCH_TERM_DOCTYPE = "Klik Supplier Search Term"
+
+
+def normalize_tax_id(tax_id):
+	"""Upper-case a tax id and drop spaces, dashes and dots, e.g. 'p05-1234 567x' -> 'P051234567X'."""
+	return re.sub(r"[\s\-./]", "", tax_id or "").upper()
+
+
+SUPPLIER_SEARCH_INDEX = PartySearchIndex(
+	"Supplier",
+	SEARCH_TERM_DOCTYPE,
+	extra_fields=["tax_id"],
+	extra_terms=lambda supplier: [("Tax ID", normalize_tax_id(supplier.tax_id))],
+)
+
+
+def reindex_supplier_on_update(doc, method=None):
+	"""Supplier doc_event: rebuild the search terms of the saved supplier."""
+	SUPPLIER_SEARCH_INDEX.reindex([doc.name])
+
+
+def reindex_supplier_on_rename(doc, method=None, old=None, new=None, merge=False):
+	"""Supplier doc_event: index the new name; renaming already moved the terms' supplier links."""
+	SUPPLIER_SEARCH_INDEX.reindex([new or doc.name])
+
+
+def remove_supplier_from_index(doc, method=None):
+	"""Supplier doc_event: drop the search terms of a deleted supplier."""
+	SUPPLIER_SEARCH_INDEX.remove(doc.name)
+
+
+def reindex_contact_suppliers(doc, method=None):
+	"""Contact doc_event: rebuild the search terms of every supplier the contact is linked to."""
+	SUPPLIER_SEARCH_INDEX.reindex_contact(doc)
+
+
+def reindex_suppliers(supplier_names):
+	"""Replace the search terms of the given suppliers with freshly collected ones."""
+	SUPPLIER_SEARCH_INDEX.reindex(supplier_names)
+
+
+def rebuild_supplier_search_index(chunk_size=2000):
+	"""
+	Rebuild the whole supplier search index in chunks.
+
+	Run with `bench --site <site> execute klik_pos.api.supplier_search.rebuild_supplier_search_index`.
+	"""
+	count = SUPPLIER_SEARCH_INDEX.rebuild(chunk_size)
+	print(f"✅ Supplier search index rebuilt for {count} suppliers")
+	return count
+
+
+def search_suppliers(search, limit=20, start=0):
+	"""
+	Rank enabled suppliers matching the search text on name tokens, phone digits, emails and
+	normalized tax ids.
+
+	Returns:
+		(list of supplier names in rank order, total number of matches)
+	"""
+	extra_matches = []
+	tax_id = normalize_tax_id(search)
+	if len(tax_id) >= MIN_PHONE_PREFIX and re.search(r"\d", tax_id):
+		extra_matches.append(("Tax ID", tax_id))
+
+	return SUPPLIER_SEARCH_INDEX.search(
+		search, extra_matches=extra_matches, conditions=["p.disabled = 0"], limit=limit, start=start
+	)
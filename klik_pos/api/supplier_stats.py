@@ -0,0 +1,81 @@
+import frappe
+
+from klik_pos.api.party_stats import PartyStats
+
+SUPPLIER_STATS_DOCTYPE = "Klik Supplier Stats"
+
+# Submitted, non-return invoices count towards orders, purchases and last purchase
+PURCHASE_CONDITIONS = """
+	docstatus = 1
+	AND is_return = 0
+	AND status != 'Cancelled'
+"""
+
+SUPPLIER_STATS = PartyStats(
+	"Supplier",
+	invoice_doctype="Purchase Invoice",
+	stats_doctype=SUPPLIER_STATS_DOCTYPE,
+	amount_field="total_purchases",
+	date_field="last_purchase",
+	conditions=PURCHASE_CONDITIONS,
+)
+
+
+def update_supplier_stats_on_submit(doc, method=None):
+	"""Add a submitted Purchase Invoice to its supplier's rollup."""
+	SUPPLIER_STATS.apply_invoice(doc, 1)
+
+
+def update_supplier_stats_on_cancel(doc, method=None):
+	"""Remove a cancelled Purchase Invoice from its supplier's rollup."""
+	SUPPLIER_STATS.apply_invoice(doc, -1)
+
+
+def update_supplier_stats_on_payment(doc, method=None):
+	"""Refresh outstanding for every supplier a Payment Entry touches."""
+	SUPPLIER_STATS.apply_payment(doc)
+
+
+def compute_supplier_stats(supplier):
+	"""Compute a supplier's rollup directly from Purchase Invoices."""
+	return SUPPLIER_STATS.compute(supplier)
+
+
+def get_supplier_stats_map(supplier_names):
+	"""
+	Batch-read rollups for the given suppliers with one indexed query.
+
+	Returns:
+		dict of supplier -> {total_orders, total_purchases, last_purchase, total_outstanding}
+	"""
+	return SUPPLIER_STATS.get_map(supplier_names)
+
+
+def get_supplier_stats(supplier):
+	"""Read one supplier's rollup, computing and storing it the first time it is needed."""
+	return SUPPLIER_STATS.get(supplier)
+
+
+def backfill_supplier_stats(chunk_size=1000):
+	"""
+	Rebuild every supplier's rollup from Purchase Invoices with two grouped scans.
+
+	Run with `bench --site <site> execute klik_pos.api.supplier_stats.backfill_supplier_stats`.
+	"""
+	count = SUPPLIER_STATS.backfill(chunk_size)
+	print(f"✅ Supplier statistics rebuilt for {count} suppliers")
+	return count
+
+
+@frappe.whitelist()
+def enqueue_supplier_stats_backfill():
+	"""Queue a full rebuild of supplier statistics (System Manager only)."""
+	frappe.only_for("System Manager")
+	frappe.enqueue(
+		"klik_pos.api.supplier_stats.backfill_supplier_stats",
+		queue="long",
+		timeout=3600,
+		job_id="klik_pos_supplier_stats_backfill",
+		deduplicate=True,
+	)
+	return {"success": True}
@@ -0,0 +1,302 @@
+"""
+Bulk WhatsApp campaigns.
+
+A campaign runs as one background job. WhatsApp Setup and the message template are read once,
+requests share one pooled requests.Session across a bounded thread pool, and WhatsApp Chat rows
+are written with one bulk insert per batch. Sends draw on the outbound queue's shared WhatsApp
+RateWindow, so a campaign and the outbound drainers stay within one quota together. Progress is
+published after every batch; pausing stops the job at the next batch boundary and resuming starts
+a new job from the saved position.
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+import requests
+from frappe import _
+from frappe.model.naming import set_name_from_naming_options
+from frappe.utils import now_datetime
+from requests.adapters import HTTPAdapter
+
+from klik_pos.api.jobs import JOB_STATUS_TTL, get_job_status, publish_job_progress, set_job_status
+from klik_pos.api.outbound import RateWindow, error_message, is_transient
+from klik_pos.api.whatsap.utils import build_template_data, format_phone_number
+
+JOB_KIND = "bulk_whatsapp"
+BATCH_SIZE = 200
+SEND_CONCURRENCY = 8
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 1
+REQUEST_TIMEOUT = 30
+MAX_REPORTED_ERRORS = 100
+
+
+@frappe.whitelist()
+def start_bulk_whatsapp(
+	recipients,
+	message_type="text",
+	message_content=None,
+	template_name=None,
+	template_parameters=None,
+):
+	"""
+	Queue a WhatsApp campaign to a list of phone numbers.
+
+	Returns:
+		dict with the campaign_id to poll with get_bulk_whatsapp_status; progress is also
+		published on the realtime event "klik_pos_bulk_whatsapp_progress".
+	"""
+	if isinstance(recipients, str):
+		recipients = json.loads(recipients)
+	if isinstance(template_parameters, str):
+		template_parameters = json.loads(template_parameters)
+
+	if message_type == "text" and not message_content:
+		frappe.throw(_("Message content is required."))
+	elif message_type == "template" and not template_name:
+		frappe.throw(_("Template name is required."))
+	elif message_type not in ("text", "template"):
+		frappe.throw(_("Unsupported message type: {0}").format(message_type))
+
+	numbers, errors = [], []
+	for recipient in recipients:
+		number = format_phone_number(recipient)
+		if number and number.isdigit():
+			numbers.append(number)
+		else:
+			errors.append({"recipient": recipient, "error": "Invalid phone number"})
+
+	campaign_id = f"klik_pos_bulk_whatsapp_{frappe.generate_hash(length=10)}"
+	frappe.cache().set_value(
+		_spec_key(campaign_id),
+		{
+			"recipients": numbers,
+			"message_type": message_type,
+			"message_content": message_content,
+			"template_name": template_name,
+			"template_parameters": template_parameters,
+		},
+		expires_in_sec=JOB_STATUS_TTL,
+	)
+	set_job_status(
+		JOB_KIND,
+		campaign_id,
+		{
+			"status": "queued",
+			"total": len(numbers),
+			"position": 0,
+			"sent": 0,
+			"failed": 0,
+			"errors": errors[:MAX_REPORTED_ERRORS],
+		},
+	)
+	_enqueue_campaign(campaign_id)
+	return {"success": True, "campaign_id": campaign_id, "total": len(numbers), "invalid": len(errors)}
+
+
+@frappe.whitelist()
+def get_bulk_whatsapp_status(campaign_id):
+	"""Return {status, total, position, sent, failed, errors, messages_per_second} of a campaign."""
+	return get_job_status(JOB_KIND, campaign_id)
+
+
+@frappe.whitelist()
+def pause_bulk_whatsapp(campaign_id):
+	"""Ask a running campaign to stop after its current batch."""
+	status = get_job_status(JOB_KIND, campaign_id)
+	if status["status"] not in ("queued", "running"):
+		frappe.throw(_("Campaign {0} is not running").format(campaign_id))
+
+	frappe.cache().set_value(_control_key(campaign_id), "pause", expires_in_sec=JOB_STATUS_TTL)
+	return {"success": True}
+
+
+@frappe.whitelist()
+def resume_bulk_whatsapp(campaign_id):
+	"""Continue a paused campaign from the first recipient it has not sent to."""
+	status = get_job_status(JOB_KIND, campaign_id)
+	if status["status"] != "paused":
+		frappe.throw(_("Campaign {0} is not paused").format(campaign_id))
+
+	frappe.cache().delete_value(_control_key(campaign_id))
+	set_job_status(JOB_KIND, campaign_id, {**status, "status": "queued"})
+	_enqueue_campaign(campaign_id)
+	return {"success": True}
+
+
+def run_bulk_whatsapp(campaign_id):
+	"""Background job: send the campaign from its saved position until it completes or is paused."""
+	spec = frappe.cache().get_value(_spec_key(campaign_id))
+	progress = get_job_status(JOB_KIND, campaign_id)
+	if not spec or progress["status"] == "not_found":
+		return
+
+	progress["status"] = "running"
+	publish_job_progress(JOB_KIND, campaign_id, progress)
+
+	try:
+		_send_campaign(campaign_id, spec, progress)
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(frappe.get_traceback(), "Bulk WhatsApp campaign failed")
+		progress.update(status="failed", error=str(e))
+		publish_job_progress(JOB_KIND, campaign_id, progress)
+
+
+def _send_campaign(campaign_id, spec, progress):
+	cache = frappe.cache()
+	recipients = spec["recipients"]
+	settings = frappe.get_doc("WhatsApp Setup", "WhatsApp Setup")
+	url = f"{settings.url}/{settings.version}/{settings.phone_id}/messages"
+	template = None
+	if spec["message_type"] == "template":
+		template = frappe.get_doc("WhatsApp Message Templates", spec["template_name"])
+	rate_window = RateWindow("whatsapp")
+	started, sent_before = time.monotonic(), progress["sent"]
+
+	with (
+		_pooled_session(settings.get_password("token")) as session,
+		ThreadPoolExecutor(max_workers=SEND_CONCURRENCY) as pool,
+	):
+		while progress["position"] < len(recipients):
+			if cache.get_value(_control_key(campaign_id)) == "pause":
+				progress["status"] = "paused"
+				publish_job_progress(JOB_KIND, campaign_id, progress)
+				return
+
+			batch = recipients[progress["position"] : progress["position"] + BATCH_SIZE]
+			payloads = [_build_payload(spec, template, number) for number in batch]
+			results = list(pool.map(lambda data: _post(session, url, data, rate_window), payloads))
+			_log_chats(campaign_id, spec, payloads, results)
+			frappe.db.commit()
+
+			for number, result in zip(batch, results, strict=True):
+				if result.get("error"):
+					progress["failed"] += 1
+					if len(progress["errors"]) < MAX_REPORTED_ERRORS:
+						progress["errors"].append({"recipient": number, "error": result["error"]})
+				else:
+					progress["sent"] += 1
+			progress["position"] += len(batch)
+			progress["messages_per_second"] = round(
+				(progress["sent"] - sent_before) / max(time.monotonic() - started, 0.001), 1
+			)
+			publish_job_progress(JOB_KIND, campaign_id, progress)
+
+	progress["status"] = "completed"
+	publish_job_progress(JOB_KIND, campaign_id, progress)
+
+
+def _enqueue_campaign(campaign_id):
+	frappe.enqueue(
+		"klik_pos.api.whatsap.bulk.run_bulk_whatsapp",
+		queue="long",
+		timeout=4 * 3600,
+		job_id=campaign_id,
+		deduplicate=True,
+		campaign_id=campaign_id,
+	)
+
+
+def _pooled_session(token):
+	session = requests.Session()
+	session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=SEND_CONCURRENCY))
+	session.headers.update({"authorization": f"Bearer {token}", "content-type": "application/json"})
+	return session
+
+
+def _build_payload(spec, template, number):
+	if template:
+		return build_template_data(number, template, spec["template_parameters"])[0]
+	return {
+		"messaging_product": "whatsapp",
+		"to": number,
+		"type": "text",
+		"text": {"preview_url": True, "body": spec["message_content"]},
+	}
+
+
+def _post(session, url, data, rate_window):
+	"""Send one message from a pool thread; it must not touch frappe, whose state is per thread."""
+	for attempt in range(1, MAX_ATTEMPTS + 1):
+		rate_window.acquire()
+		try:
+			response = session.post(url, data=json.dumps(data), timeout=REQUEST_TIMEOUT)
+			response.raise_for_status()
+			return {"message_id": response.json().get("messages", [{}])[0].get("id")}
+		except requests.RequestException as e:
+			if attempt == MAX_ATTEMPTS or not is_transient(e):
+				return {"error": error_message(e)}
+			time.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+
+
+def _log_chats(campaign_id, spec, payloads, results):
+	"""Write the batch's WhatsApp Chat rows with one INSERT."""
+	now = now_datetime()
+	user = frappe.session.user
+	is_template = spec["message_type"] == "template"
+	template_parameters = json.dumps(spec["template_parameters"]) if spec["template_parameters"] else None
+
+	frappe.db.bulk_insert(
+		"WhatsApp Chat",
+		fields=[
+			"name",
+			"type",
+			"to",
+			"message_type",
+			"content_type",
+			"status",
+			"message",
+			"message_id",
+			"use_template",
+			"template",
+			"template_parameters",
+			"bulk_message_reference",
+			"owner",
+			"modified_by",
+			"creation",
+			"modified",
+		],
+		values=[
+			(
+				name,
+				"Outgoing",
+				data["to"],
+				"Template" if is_template else "Manual",
+				"text",
+				"Failed" if result.get("error") else "Success",
+				str(data["template"]) if is_template else data["text"]["body"],
+				result.get("message_id"),
+				1 if is_template else 0,
+				spec["template_name"] if is_template else None,
+				template_parameters if is_template else None,
+				campaign_id,
+				user,
+				user,
+				now,
+				now,
+			)
+			for name, data, result in zip(_new_chat_names(len(payloads)), payloads, results, strict=True)
+		],
+	)
+
+
+def _new_chat_names(count):
+	"""Name count WhatsApp Chat rows with the doctype's own autoname, as insert() would."""
+	autoname = frappe.get_meta("WhatsApp Chat").autoname
+	names = []
+	for _i in range(count):
+		chat = frappe._dict()
+		set_name_from_naming_options(autoname, chat)
+		names.append(chat.name)
+	return names
+
+
+def _spec_key(campaign_id):
+	return f"klik_pos_bulk_whatsapp_spec:{campaign_id}"
+
+
+def _control_key(campaign_id):
+	return f"klik_pos_bulk_whatsapp_control:{campaign_id}"
@@ -8,10 +8,11 @@ import json
 import frappe
 from frappe import _
 from frappe.desk.form.utils import get_pdf_link
-from frappe.integrations.utils import make_post_request
 from frappe.utils import get_url
 
-from klik_pos.klik_pos.utils import get_current_pos_profile
+from klik_pos.api.customer_phone import format_for_messaging
+from klik_pos.api.outbound import enqueue_message
+from klik_pos.api.receipt import get_receipt_file_url
 
 
 @frappe.whitelist()
@@ -162,7 +163,58 @@ def send_template_message(
 	"""Send a template message"""
 	# Get template details
 	template = frappe.get_doc("WhatsApp Message Templates", template_name)
+	data, template_parameters = build_template_data(to_number, template, template_parameters)
 
+	# Handle attachments
+	if attach_document and reference_doctype and reference_name:
+		url = get_document_attachment_url(reference_doctype, reference_name)
+		if url:
+			data["template"]["components"].append(
+				{
+					"type": "header",
+					"parameters": [
+						{
+							"type": "document",
+							"document": {
+								"link": url,
+								"filename": f"{reference_name}.pdf",
+							},
+						}
+					],
+				}
+			)
+	elif custom_attachment:
+		url = get_custom_attachment_url(custom_attachment)
+		if url:
+			data["template"]["components"].append(
+				{
+					"type": "header",
+					"parameters": [
+						{
+							"type": "document",
+							"document": {
+								"link": url,
+								"filename": file_name or "attachment.pdf",
+							},
+						}
+					],
+				}
+			)
+
+	return make_whatsapp_api_call(
+		data,
+		settings,
+		token,
+		reference_doctype,
+		reference_name,
+		"Template",
+		template_name,
+		template_parameters,
+	)
+
+
+def build_template_data(to_number, template, template_parameters=None):
+	"""Build the API request body of a template message; returns (data, cleaned parameters)"""
 	# Validate template parameters
 	if template_parameters:
 		# Ensure template_parameters is a list
@@ -210,52 +262,7 @@ def send_template_message(
 		if parameters:  # Only add components if we have parameters
 			data["template"]["components"].append({"type": "body", "parameters": parameters})
 
-	# Handle attachments
-	if attach_document and reference_doctype and reference_name:
-		url = get_document_attachment_url(reference_doctype, reference_name)
-		if url:
-			data["template"]["components"].append(
-				{
-					"type": "header",
-					"parameters": [
-						{
-							"type": "document",
-							"document": {
-								"link": url,
-								"filename": f"{reference_name}.pdf",
-							},
-						}
-					],
-				}
-			)
-	elif custom_attachment:
-		url = get_custom_attachment_url(custom_attachment)
-		if url:
-			data["template"]["components"].append(
-				{
-					"type": "header",
-					"parameters": [
-						{
-							"type": "document",
-							"document": {
-								"link": url,
-								"filename": file_name or "attachment.pdf",
-							},
-						}
-					],
-				}
-			)
-
-	return make_whatsapp_api_call(
-		data,
-		settings,
-		token,
-		reference_doctype,
-		reference_name,
-		"Template",
-		template_name,
-		template_parameters,
-	)
+	return data, template_parameters
 
 
 def make_whatsapp_api_call(
@@ -268,9 +275,7 @@ def make_whatsapp_api_call(
 	template_name=None,
 	template_parameters=None,
 ):
-	"""Make the actual API call to WhatsApp"""
-	headers = {"authorization": f"Bearer {token}", "content-type": "application/json"}
-
+	"""Log the message as a Queued WhatsApp Chat and hand it to the outbound queue for the API call"""
 	try:
 		# Validate required settings
 		if not settings.url:
@@ -289,22 +294,13 @@ def make_whatsapp_api_call(
 				"error": f"Invalid phone number format: {data.get('to')}. Must be digits only (without +)",
 			}
 
-		# Make the API call
-		response = make_post_request(
-			f"{settings.url}/{settings.version}/{settings.phone_id}/messages",
-			headers=headers,
-			data=json.dumps(data),
-		)
-
-		frappe.logger().debug(f"WhatsApp API Response: {json.dumps(response, indent=2)}")
-
-		# Create WhatsApp message record
+		# Create WhatsApp message record; the outbound queue moves it to Success or Failed
 		message_doc = frappe.new_doc("WhatsApp Chat")
 		message_doc.type = "Outgoing"
 		message_doc.to = data["to"]
 		message_doc.message_type = message_type
 		message_doc.content_type = "text"
-		message_doc.status = "Success"
+		message_doc.status = "Queued"
 
 		if message_type == "Template":
 			message_doc.template = template_name
@@ -323,57 +319,22 @@ def make_whatsapp_api_call(
 			message_doc.reference_doctype = reference_doctype
 			message_doc.reference_name = reference_name
 
-		if "messages" in response:
-			message_doc.message_id = response["messages"][0]["id"]
-
 		message_doc.insert(ignore_permissions=True)
 
 		return {
 			"success": True,
-			"message_id": response.get("messages", [{}])[0].get("id"),
+			"queue_id": enqueue_message("whatsapp", data, chat=message_doc.name),
 			"whatsapp_message_name": message_doc.name,
 		}
 
 	except Exception as e:
-		error_message = str(e)
-		error_details = {}
-
-		# Try to get detailed error information
-		if frappe.flags.integration_request:
-			try:
-				error_response = frappe.flags.integration_request.json()
-				error_details = error_response
-				if "error" in error_response:
-					error_message = error_response["error"].get(
-						"message", error_response["error"].get("Error", error_message)
-					)
-			except Exception:
-				pass
-
-		# Log detailed error information
-		frappe.log_error(
-			f"WhatsApp API Error Details:\n"
-			f"Error: {error_message}\n"
-			f"URL: {settings.url}/{settings.version}/{settings.phone_id}/messages\n"
-			f"Data: {json.dumps(data, indent=2)}\n"
-			f"Error Details: {json.dumps(error_details, indent=2)}\n"
-			f"Response Status: {getattr(frappe.flags.integration_request, 'status_code', 'Unknown') if frappe.flags.integration_request else 'Unknown'}\n"
-			f"Response Text: {getattr(frappe.flags.integration_request, 'text', 'Unknown') if frappe.flags.integration_request else 'Unknown'}",
-			"WhatsApp Messaging",
-		)
-
-		return {
-			"success": False,
-			"error": error_message,
-			"error_details": error_details,
-		}
+		frappe.log_error(frappe.get_traceback(), "WhatsApp Messaging")
+		return {"success": False, "error": str(e)}
 
 
 def format_phone_number(number):
 	"""Format phone number for WhatsApp API"""
-	if number.startswith("+"):
-		number = number[1:]
-	return number
+	return format_for_messaging(number)
 
 
 def get_document_attachment_url(doctype, docname):
@@ -714,7 +675,7 @@ def send_bulk_whatsapp_messages(
 	template_parameters=None,
 ):
 	"""
-	Send WhatsApp messages to multiple recipients
+	Start a background campaign sending WhatsApp messages to multiple recipients
 
 	Args:
 	    recipients (list): List of phone numbers
@@ -724,39 +685,17 @@ def send_bulk_whatsapp_messages(
 	    template_parameters (list): Template parameters
 
 	Returns:
-	    dict: Results for each recipient
+	    dict: campaign_id to follow with klik_pos.api.whatsap.bulk.get_bulk_whatsapp_status
 	"""
-	if isinstance(recipients, str):
-		recipients = json.loads(recipients)
-
-	if isinstance(template_parameters, str):
-		template_parameters = json.loads(template_parameters)
-
-	results = []
+	from klik_pos.api.whatsap.bulk import start_bulk_whatsapp
 
-	for recipient in recipients:
-		result = send_whatsapp_message(
-			to_number=recipient,
-			message_type=message_type,
-			message_content=message_content,
-			template_name=template_name,
-			template_parameters=template_parameters,
-		)
-
-		results.append(
-			{
-				"recipient": recipient,
-				"success": result.get("success"),
-				"error": result.get("error"),
-				"message_id": result.get("message_id"),
-			}
-		)
-
-	return {
-		"total_sent": len([r for r in results if r.get("success")]),
-		"total_failed": len([r for r in results if not r.get("success")]),
-		"results": results,
-	}
+	return start_bulk_whatsapp(
+		recipients,
+		message_type=message_type,
+		message_content=message_content,
+		template_name=template_name,
+		template_parameters=template_parameters,
+	)
 
 
 @frappe.whitelist()
@@ -1062,33 +1001,8 @@ def test_template_with_parameters(template_name, phone_number, parameters=None):
 		}
 
 
-def generate_and_attach_invoice_pdf(invoice_name, print_format="Standard", lang="en"):
+def generate_and_attach_invoice_pdf(invoice_name, print_format=None):
 	"""
-	Generate PDF for a Sales Invoice, attach it, and return full URL
+	Return the full URL of the invoice's stored receipt PDF, rendering it only if it is missing
 	"""
-	pos_profile = get_current_pos_profile()
-	if pos_profile:
-		print_format = pos_profile.custom_pos_printformat
-	try:
-		# Generate PDF content
-		pdf_content = frappe.get_print("Sales Invoice", invoice_name, print_format, as_pdf=True)
-
-		# Create File record in /files
-		filedoc = frappe.get_doc(
-			{
-				"doctype": "File",
-				"file_name": f"{invoice_name}.pdf",
-				"attached_to_doctype": "Sales Invoice",
-				"attached_to_name": invoice_name,
-				"content": pdf_content,
-				"is_private": 0,
-			}
-		)
-		filedoc.save(ignore_permissions=True)
-
-		# Return full URL to the file
-		return get_url(filedoc.file_url)
-
-	except Exception:
-		frappe.log_error(frappe.get_traceback(), "generate_and_attach_invoice_pdf Failed")
-		raise
+	return get_url(get_receipt_file_url(invoice_name, print_format))
@@ -6,6 +6,14 @@ import frappe
 import requests
 from werkzeug.wrappers import Response
 
+WEBHOOK_EVENT_DOCTYPE = "Klik WhatsApp Webhook Event"
+WEBHOOK_JOB_ID = "klik_pos_whatsapp_webhook_events"
+EVENT_BATCH_SIZE = 500
+MEDIA_TYPES = ("image", "audio", "video", "document")
+# Delivery statuses only move forward: sent -> delivered -> read. A failure is final unless the
+# message was already delivered; the local Queued and Success statuses rank below every receipt.
+STATUS_RANK = {"sent": 1, "failed": 2, "delivered": 2, "read": 3}
+
 
 # Will check on this later just Incase we want to receive messaged from customers: Mania
 @frappe.whitelist(allow_guest=True)
@@ -19,7 +27,7 @@ def webhook():
 def get():
 	"""Get."""
 	hub_challenge = frappe.form_dict.get("hub.challenge")
-	webhook_verify_token = frappe.db.get_single_value("WhatsApp Settings", "webhook_verify_token")
+	webhook_verify_token = frappe.db.get_single_value("WhatsApp Setup", "webhook_verify_token")
 
 	if frappe.form_dict.get("hub.verify_token") != webhook_verify_token:
 		frappe.throw("Verify token does not match")
@@ -28,167 +36,192 @@ def get():
 
 
 def post():
-	"""Post."""
-	data = frappe.local.form_dict
-	# frappe.get_doc({
-	# 	"doctype": "WhatsApp Notification Log",
-	# 	"template": "Webhook",
-	# 	"meta_data": json.dumps(data)
-	# }).insert(ignore_permissions=True)
-
-	messages = []
-	try:
-		messages = data["entry"][0]["changes"][0]["value"].get("messages", [])
-	except KeyError:
-		messages = data["entry"]["changes"][0]["value"].get("messages", [])
-	sender_profile_name = next(
-		(
-			contact.get("profile", {}).get("name")
-			for entry in data.get("entry", [])
-			for change in entry.get("changes", [])
-			for contact in change.get("value", {}).get("contacts", [])
-		),
-		None,
+	"""Store the raw payload and acknowledge; process_webhook_events applies it in the background."""
+	frappe.get_doc(
+		{
+			"doctype": WEBHOOK_EVENT_DOCTYPE,
+			"status": "Pending",
+			"payload": frappe.request.get_data(as_text=True) or json.dumps(frappe.local.form_dict),
+		}
+	).insert(ignore_permissions=True)
+	_enqueue_event_processing()
+
+
+def resume_webhook_events():
+	"""Scheduler: restart processing for payloads that arrived while the last run was finishing."""
+	if frappe.db.exists(WEBHOOK_EVENT_DOCTYPE, {"status": "Pending"}):
+		_enqueue_event_processing()
+
+
+def _enqueue_event_processing():
+	# One processing job at a time, so concurrent runs never apply the same payload twice
+	frappe.enqueue(
+		"klik_pos.api.whatsap.webhook.process_webhook_events",
+		queue="short",
+		job_id=WEBHOOK_JOB_ID,
+		deduplicate=True,
+		enqueue_after_commit=True,
 	)
 
-	if messages:
-		for message in messages:
-			message_type = message["type"]
-			is_reply = True if message.get("context") and "forwarded" not in message.get("context") else False
-			reply_to_message_id = message["context"]["id"] if is_reply else None
-			if message_type == "text":
-				frappe.get_doc(
-					{
-						"doctype": "WhatsApp Chat",
-						"type": "Incoming",
-						"from": message["from"],
-						"message": message["text"]["body"],
-						"message_id": message["id"],
-						"reply_to_message_id": reply_to_message_id,
-						"is_reply": is_reply,
-						"content_type": message_type,
-						"profile_name": sender_profile_name,
-					}
-				).insert(ignore_permissions=True)
-			elif message_type == "reaction":
-				frappe.get_doc(
-					{
-						"doctype": "WhatsApp Chat",
-						"type": "Incoming",
-						"from": message["from"],
-						"message": message["reaction"]["emoji"],
-						"reply_to_message_id": message["reaction"]["message_id"],
-						"message_id": message["id"],
-						"content_type": "reaction",
-						"profile_name": sender_profile_name,
-					}
-				).insert(ignore_permissions=True)
-			elif message_type == "interactive":
-				frappe.get_doc(
-					{
-						"doctype": "WhatsApp Chat",
-						"type": "Incoming",
-						"from": message["from"],
-						"message": message["interactive"]["nfm_reply"]["response_json"],
-						"message_id": message["id"],
-						"content_type": "flow",
-						"profile_name": sender_profile_name,
-					}
-				).insert(ignore_permissions=True)
-			elif message_type in ["image", "audio", "video", "document"]:
-				settings = frappe.get_doc(
-					"WhatsApp Settings",
-					"WhatsApp Setup",
-				)
-				token = settings.get_password("token")
-				url = f"{settings.url}/{settings.version}/"
-
-				media_id = message[message_type]["id"]
-				headers = {"Authorization": "Bearer " + token}
-				response = requests.get(f"{url}{media_id}/", headers=headers)
-
-				if response.status_code == 200:
-					media_data = response.json()
-					media_url = media_data.get("url")
-					mime_type = media_data.get("mime_type")
-					file_extension = mime_type.split("/")[1]
-
-					media_response = requests.get(media_url, headers=headers)
-					if media_response.status_code == 200:
-						file_data = media_response.content
-						file_name = f"{frappe.generate_hash(length=10)}.{file_extension}"
-
-						message_doc = frappe.get_doc(
-							{
-								"doctype": "WhatsApp Chat",
-								"type": "Incoming",
-								"from": message["from"],
-								"message_id": message["id"],
-								"reply_to_message_id": reply_to_message_id,
-								"is_reply": is_reply,
-								"message": message[message_type].get("caption", f"/files/{file_name}"),
-								"content_type": message_type,
-								"profile_name": sender_profile_name,
-							}
-						).insert(ignore_permissions=True)
-
-						file = frappe.get_doc(
-							{
-								"doctype": "File",
-								"file_name": file_name,
-								"attached_to_doctype": "WhatsApp Chat",
-								"attached_to_name": message_doc.name,
-								"content": file_data,
-								"attached_to_field": "attach",
-							}
-						).save(ignore_permissions=True)
-
-						message_doc.attach = file.file_url
-						message_doc.save()
-			elif message_type == "button":
-				frappe.get_doc(
-					{
-						"doctype": "WhatsApp Chat",
-						"type": "Incoming",
-						"from": message["from"],
-						"message": message["button"]["text"],
-						"message_id": message["id"],
-						"reply_to_message_id": reply_to_message_id,
-						"is_reply": is_reply,
-						"content_type": message_type,
-						"profile_name": sender_profile_name,
-					}
-				).insert(ignore_permissions=True)
-			else:
-				frappe.get_doc(
-					{
-						"doctype": "WhatsApp Chat",
-						"type": "Incoming",
-						"from": message["from"],
-						"message_id": message["id"],
-						"message": message[message_type].get(message_type),
-						"content_type": message_type,
-						"profile_name": sender_profile_name,
-					}
-				).insert(ignore_permissions=True)
 
-	else:
-		changes = None
+def process_webhook_events():
+	"""Background job: apply pending webhook payloads in batches until none are left."""
+	while True:
+		events = frappe.get_all(
+			WEBHOOK_EVENT_DOCTYPE,
+			filters={"status": "Pending"},
+			fields=["name", "payload"],
+			order_by="creation asc",
+			limit=EVENT_BATCH_SIZE,
+		)
+		if not events:
+			return
+
 		try:
-			changes = data["entry"][0]["changes"][0]
-		except KeyError:
-			changes = data["entry"]["changes"][0]
-		update_status(changes)
-	return
+			_apply_events(events)
+		except Exception:
+			frappe.db.rollback()
+			# Apply the batch one payload at a time so a malformed payload only fails itself
+			for event in events:
+				try:
+					_apply_events([event])
+				except Exception as e:
+					frappe.db.rollback()
+					frappe.log_error(frappe.get_traceback(), "WhatsApp webhook processing failed")
+					_set_event_status([event.name], "Failed", str(e))
+				frappe.db.commit()
+		frappe.db.commit()
+
+
+def _apply_events(events):
+	messages, statuses = [], []
+	for event in events:
+		payload = json.loads(event.payload)
+		for entry in _as_list(payload.get("entry")):
+			for change in _as_list(entry.get("changes")):
+				value = change.get("value", {})
+				if change.get("field") == "message_template_status_update":
+					update_template_status(value)
+				elif change.get("field") == "messages":
+					profile_name = next(
+						(contact.get("profile", {}).get("name") for contact in value.get("contacts", [])),
+						None,
+					)
+					messages.extend((message, profile_name) for message in value.get("messages", []))
+					statuses.extend(value.get("statuses", []))
+
+	_insert_incoming_messages(messages)
+	update_message_statuses(statuses)
+	_set_event_status([event.name for event in events], "Processed")
+
+
+def _as_list(value):
+	if isinstance(value, list):
+		return value
+	return [value] if value else []
+
+
+def _set_event_status(names, status, error=None):
+	frappe.db.sql(
+		f"""
+		UPDATE `tab{WEBHOOK_EVENT_DOCTYPE}`
+		SET status = %(status)s, error = %(error)s, modified = NOW()
+		WHERE name IN %(names)s
+		""",
+		{"status": status, "error": error, "names": tuple(names)},
+	)
 
 
-def update_status(data):
-	"""Update status hook."""
-	if data.get("field") == "message_template_status_update":
-		update_template_status(data["value"])
+def _insert_incoming_messages(messages):
+	"""Insert incoming chats, skipping message ids already stored (Meta redelivers on timeouts)."""
+	if not messages:
+		return
 
-	elif data.get("field") == "messages":
-		update_message_status(data["value"])
+	seen = set(
+		frappe.get_all(
+			"WhatsApp Chat",
+			filters={"message_id": ["in", list({message["id"] for message, _profile in messages})]},
+			pluck="message_id",
+		)
+	)
+	for message, profile_name in messages:
+		if message["id"] in seen:
+			continue
+		seen.add(message["id"])
+
+		chat = frappe.get_doc(_incoming_chat(message, profile_name)).insert(ignore_permissions=True)
+		if message["type"] in MEDIA_TYPES:
+			frappe.enqueue(
+				"klik_pos.api.whatsap.webhook.download_incoming_media",
+				queue="default",
+				enqueue_after_commit=True,
+				chat=chat.name,
+				media_id=message[message["type"]]["id"],
+			)
+
+
+def _incoming_chat(message, profile_name):
+	"""WhatsApp Chat fields for an incoming message."""
+	message_type = message["type"]
+	is_reply = True if message.get("context") and "forwarded" not in message.get("context") else False
+	chat = {
+		"doctype": "WhatsApp Chat",
+		"type": "Incoming",
+		"from": message["from"],
+		"message_id": message["id"],
+		"content_type": message_type,
+		"profile_name": profile_name,
+	}
+	reply = {"reply_to_message_id": message["context"]["id"] if is_reply else None, "is_reply": is_reply}
+
+	if message_type == "text":
+		chat.update(message=message["text"]["body"], **reply)
+	elif message_type == "reaction":
+		chat.update(
+			message=message["reaction"]["emoji"],
+			reply_to_message_id=message["reaction"]["message_id"],
+		)
+	elif message_type == "interactive":
+		chat.update(message=message["interactive"]["nfm_reply"]["response_json"], content_type="flow")
+	elif message_type in MEDIA_TYPES:
+		# Without a caption the message becomes the file URL once download_incoming_media has run
+		chat.update(message=message[message_type].get("caption"), **reply)
+	elif message_type == "button":
+		chat.update(message=message["button"]["text"], **reply)
+	else:
+		chat.update(message=message[message_type].get(message_type))
+	return chat
+
+
+def download_incoming_media(chat, media_id):
+	"""Background job: fetch an incoming media message from the Graph API and attach it to its chat."""
+	settings = frappe.get_doc("WhatsApp Setup", "WhatsApp Setup")
+	headers = {"Authorization": "Bearer " + settings.get_password("token")}
+
+	with requests.Session() as session:
+		response = session.get(f"{settings.url}/{settings.version}/{media_id}/", headers=headers, timeout=30)
+		response.raise_for_status()
+		media_data = response.json()
+
+		media_response = session.get(media_data.get("url"), headers=headers, timeout=120)
+		media_response.raise_for_status()
+
+	file_extension = media_data.get("mime_type").split(";")[0].split("/")[1]
+	file = frappe.get_doc(
+		{
+			"doctype": "File",
+			"file_name": f"{frappe.generate_hash(length=10)}.{file_extension}",
+			"attached_to_doctype": "WhatsApp Chat",
+			"attached_to_name": chat,
+			"content": media_response.content,
+			"attached_to_field": "attach",
+		}
+	).save(ignore_permissions=True)
+
+	values = {"attach": file.file_url}
+	if not frappe.db.get_value("WhatsApp Chat", chat, "message"):
+		values["message"] = file.file_url
+	frappe.db.set_value("WhatsApp Chat", chat, values)
 
 
 def update_template_status(data):
@@ -201,16 +234,50 @@ def update_template_status(data):
 	)
 
 
-# UPdate
-def update_message_status(data):
-	"""Update message status."""
-	id = data["statuses"][0]["id"]
-	status = data["statuses"][0]["status"]
-	conversation = data["statuses"][0].get("conversation", {}).get("id")
-	name = frappe.db.get_value("WhatsApp Chat", filters={"message_id": id})
+def update_message_statuses(statuses):
+	"""
+	Apply delivery status receipts with a single UPDATE that only moves status forward.
 
-	doc = frappe.get_doc("WhatsApp Chat", name)
-	doc.status = status
-	if conversation:
-		doc.conversation_id = conversation
-	doc.save(ignore_permissions=True)
+	Receipts arrive out of order and are redelivered, so each message takes its most advanced
+	receipt and a row is only changed when that receipt ranks above the status it already has.
+	"""
+	latest = {}
+	for status in statuses:
+		current = latest.setdefault(status["id"], {"rank": 0, "status": None, "conversation": None})
+		rank = STATUS_RANK.get(status["status"], 0)
+		if rank > current["rank"]:
+			current.update(rank=rank, status=status["status"])
+		current["conversation"] = current["conversation"] or status.get("conversation", {}).get("id")
+	if not latest:
+		return
+
+	values = {"message_ids": tuple(latest)}
+	status_cases, rank_cases, conversation_cases = [], [], []
+	for i, (message_id, receipt) in enumerate(latest.items()):
+		values.update(
+			{
+				f"id_{i}": message_id,
+				f"status_{i}": receipt["status"],
+				f"rank_{i}": receipt["rank"],
+				f"conversation_{i}": receipt["conversation"],
+			}
+		)
+		status_cases.append(f"WHEN %(id_{i})s THEN %(status_{i})s")
+		rank_cases.append(f"WHEN %(id_{i})s THEN %(rank_{i})s")
+		conversation_cases.append(f"WHEN %(id_{i})s THEN %(conversation_{i})s")
+
+	current_rank = " ".join(f"WHEN '{status}' THEN {rank}" for status, rank in STATUS_RANK.items())
+	frappe.db.sql(
+		f"""
+		UPDATE `tabWhatsApp Chat`
+		SET
+			conversation_id = COALESCE(CASE message_id {" ".join(conversation_cases)} END, conversation_id),
+			status = IF(
+				CASE status {current_rank} ELSE 0 END < CASE message_id {" ".join(rank_cases)} END,
+				CASE message_id {" ".join(status_cases)} END,
+				status
+			)
+		WHERE message_id IN %(message_ids)s
+		""",
+		values,
+	)
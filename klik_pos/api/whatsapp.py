@@ -1,15 +1,15 @@
 import json
 
 import frappe
-from frappe.utils import fmt_money, now
+from frappe.utils import now
 
+from klik_pos.api.receipt import queue_invoice_delivery
 from klik_pos.api.whatsap.utils import send_whatsapp_message
-from klik_pos.klik_pos.utils import get_current_pos_profile
 
 
 def _send_invoice_whatsapp(invoice_name=None, mobile_no=None, message=None, customer_name=None):
 	"""
-	Internal reusable function to send WhatsApp message with/without invoice.
+	Internal reusable function to queue a WhatsApp message with/without the invoice receipt.
 	"""
 
 	if not mobile_no:
@@ -21,39 +21,48 @@ def _send_invoice_whatsapp(invoice_name=None, mobile_no=None, message=None, cust
 		else:
 			message = "Your invoice is ready! Thank you for shopping with us."
 
-	try:
-		if invoice_name:
-			result = send_whatsapp_message(
-				to_number=mobile_no,
-				message_type="text",
-				message_content=message,
-				reference_doctype="Sales Invoice",
-				reference_name=invoice_name,
-				attach_document=True,
-			)
-		else:
-			result = send_whatsapp_message(
-				to_number=mobile_no,
-				message_type="text",
-				message_content=message,
-			)
+	job_id = queue_invoice_delivery(
+		"whatsapp",
+		"klik_pos.api.whatsapp.deliver_invoice_whatsapp",
+		invoice_name,
+		mobile_no=mobile_no,
+		message=message,
+		invoice_name=invoice_name,
+	)
 
-		if result.get("success"):
-			return {
-				"status": "success",
-				"recipient": mobile_no,
-				"message": message,
-				"invoice": invoice_name,
-				"customer_name": customer_name,
-				"message_id": result.get("message_id"),
-				"timestamp": now(),
-			}
-		else:
-			frappe.throw(f"Failed to send WhatsApp message: {result.get('error')}")
+	return {
+		"status": "queued",
+		"job_id": job_id,
+		"recipient": mobile_no,
+		"message": message,
+		"invoice": invoice_name,
+		"customer_name": customer_name,
+		"timestamp": now(),
+	}
 
-	except Exception as e:
-		frappe.log_error(frappe.get_traceback(), "Send WhatsApp Failed")
-		frappe.throw(f"Failed to send WhatsApp message: {e!s}")
+
+def deliver_invoice_whatsapp(mobile_no, message, invoice_name=None):
+	"""Delivery job: queue the WhatsApp message, attaching the stored receipt PDF for an invoice."""
+	if invoice_name:
+		result = send_whatsapp_message(
+			to_number=mobile_no,
+			message_type="text",
+			message_content=message,
+			reference_doctype="Sales Invoice",
+			reference_name=invoice_name,
+			attach_document=True,
+		)
+	else:
+		result = send_whatsapp_message(
+			to_number=mobile_no,
+			message_type="text",
+			message_content=message,
+		)
+
+	if not result.get("success"):
+		frappe.throw(f"Failed to send WhatsApp message: {result.get('error')}")
+
+	return result.get("queue_id")
 
 
 @frappe.whitelist()
@@ -73,10 +82,9 @@ def deliver_invoice_via_whatsapp(**kwargs):
 @frappe.whitelist()
 def send_invoice_whatsapp(**kwargs):
 	"""
-	Accepts frontend payload and sends invoice WhatsApp message with PDF attachment.
+	Accepts frontend payload and queues the invoice WhatsApp message with its receipt PDF.
 	"""
 	data = kwargs
-	print("Invoice WhatsApp data", data)
 	mobile = data.get("mobile_no")
 	# customer_name is not used here; message_text may already include name
 	invoice_no = data.get("invoice_data")
@@ -85,42 +93,10 @@ def send_invoice_whatsapp(**kwargs):
 	if not (mobile and invoice_no):
 		frappe.throw("Mobile number and invoice number are required.")
 
-	try:
-		doc = frappe.get_doc("Sales Invoice", invoice_no)
-
-		# Get POS print format
-		pos_profile = get_current_pos_profile()
-		print_format = pos_profile.custom_pos_printformat or "Standard"
-
-		# Format invoice amount
-		invoice_amount = fmt_money(doc.rounded_total or doc.grand_total, currency=doc.currency)
-
-		# Send WhatsApp message with document attachment using the utility function
-		result = send_whatsapp_message(
-			to_number=mobile,
-			message_type="text",
-			message_content=message_text,
-			reference_doctype="Sales Invoice",
-			reference_name=invoice_no,
-			attach_document=True,
-		)
+	if not frappe.db.exists("Sales Invoice", invoice_no):
+		frappe.throw(f"Sales Invoice {invoice_no} not found.")
 
-		if result.get("success"):
-			return {
-				"status": "success",
-				"recipient": mobile,
-				"invoice": invoice_no,
-				"amount": invoice_amount,
-				"print_format": print_format,
-				"message_id": result.get("message_id"),
-				"timestamp": now(),
-			}
-		else:
-			frappe.throw(f"Failed to send WhatsApp message: {result.get('error')}")
-
-	except Exception as e:
-		frappe.log_error(frappe.get_traceback(), "Send Invoice WhatsApp Failed")
-		frappe.throw(f"Failed to send WhatsApp message: {e!s}")
+	return _send_invoice_whatsapp(invoice_name=invoice_no, mobile_no=mobile, message=message_text)
 
 
 @frappe.whitelist()
@@ -152,11 +128,11 @@ def send_template_whatsapp(**kwargs):
 
 		if result.get("success"):
 			return {
-				"status": "success",
+				"status": "queued",
+				"job_id": result.get("queue_id"),
 				"recipient": mobile,
 				"template": template_name,
 				"parameters": template_parameters,
-				"message_id": result.get("message_id"),
 				"timestamp": now(),
 			}
 		else:
@@ -58,6 +58,7 @@ fixtures = [
 					"Sales Invoice-custom_column_break_hnemi",
 					"Sales Invoice-custom_delivery_personnel",
 					"Sales Invoice-custom_delivery_personnel_name",
+					"POS Profile-custom_summarize_closing_invoices",
 				),
 			]
 		],
@@ -79,6 +80,15 @@ doc_events = {
 			"klik_pos.api.sales_invoice.set_base_roundoff_amount",
 			"klik_pos.api.sales_invoice.set_grand_total_with_roundoff",
 		],
+		"on_submit": [
+			"klik_pos.api.shift_totals.update_shift_totals_on_submit",
+			"klik_pos.api.customer_stats.update_customer_stats_on_submit",
+			"klik_pos.api.receipt.enqueue_receipt_render",
+		],
+		"on_cancel": [
+			"klik_pos.api.shift_totals.update_shift_totals_on_cancel",
+			"klik_pos.api.customer_stats.update_customer_stats_on_cancel",
+		],
 		# "before_save": [
 		# 	"klik_pos.api.sales_invoice.sync_return_payments_before_save",
 		# ],
@@ -87,6 +97,80 @@ doc_events = {
 		"validate": [
 			"klik_pos.api.pos_entry.validate_opening_entry",
 		],
+		"on_submit": "klik_pos.api.shift_totals.create_shift_totals",
+	},
+	"Item": {
+		"on_update": [
+			"klik_pos.api.item.clear_item_group_counts_cache",
+			"klik_pos.api.item_uom.clear_uom_matrix_cache",
+		],
+		"on_trash": [
+			"klik_pos.api.item.clear_item_group_counts_cache",
+			"klik_pos.api.item_uom.clear_uom_matrix_cache",
+		],
+	},
+	"Item Group": {
+		"on_update": "klik_pos.api.item.clear_item_group_counts_cache",
+		"on_trash": "klik_pos.api.item.clear_item_group_counts_cache",
+	},
+	"POS Profile": {
+		"on_update": "klik_pos.api.item.clear_item_group_counts_cache",
+	},
+	"Serial No": {
+		"on_update": "klik_pos.api.serial_index.refresh_serial_on_update",
+		"on_trash": "klik_pos.api.serial_index.remove_serial_from_index",
+	},
+	"Serial and Batch Bundle": {
+		"on_submit": "klik_pos.api.serial_index.refresh_bundle_serials",
+		"on_cancel": "klik_pos.api.serial_index.refresh_bundle_serials",
+	},
+	"Customer": {
+		"on_update": [
+			"klik_pos.api.customer_search.reindex_customer_on_update",
+			"klik_pos.api.customer_phone.index_customer_on_update",
+		],
+		"after_rename": "klik_pos.api.customer_search.reindex_customer_on_rename",
+		"on_trash": [
+			"klik_pos.api.customer_search.remove_customer_from_index",
+			"klik_pos.api.customer_phone.remove_customer_phones",
+		],
+	},
+	"Supplier": {
+		"on_update": "klik_pos.api.supplier_search.reindex_supplier_on_update",
+		"after_rename": "klik_pos.api.supplier_search.reindex_supplier_on_rename",
+		"on_trash": "klik_pos.api.supplier_search.remove_supplier_from_index",
+	},
+	"Contact": {
+		"on_update": [
+			"klik_pos.api.customer_search.reindex_contact_customers",
+			"klik_pos.api.customer_phone.index_contact_customers",
+			"klik_pos.api.supplier_search.reindex_contact_suppliers",
+		],
+		# Runs once the contact and its links are gone, so its terms and numbers are released
+		"after_delete": [
+			"klik_pos.api.customer_search.reindex_contact_customers",
+			"klik_pos.api.customer_phone.index_contact_customers",
+			"klik_pos.api.supplier_search.reindex_contact_suppliers",
+		],
+	},
+	"Purchase Invoice": {
+		"after_insert": "klik_pos.api.purchase_invoice.clear_purchase_invoice_count_cache",
+		"on_submit": "klik_pos.api.supplier_stats.update_supplier_stats_on_submit",
+		"on_cancel": "klik_pos.api.supplier_stats.update_supplier_stats_on_cancel",
+		"on_trash": "klik_pos.api.purchase_invoice.clear_purchase_invoice_count_cache",
+	},
+	"File": {
+		"on_trash": "klik_pos.api.receipt.clear_receipt_cache",
+	},
+	"Payment Entry": {
+		"on_submit": [
+			"klik_pos.api.customer_stats.update_customer_stats_on_payment",
+			"klik_pos.api.supplier_stats.update_supplier_stats_on_payment",
+		],
+		"on_cancel": [
+			"klik_pos.api.customer_stats.update_customer_stats_on_payment",
+			"klik_pos.api.supplier_stats.update_supplier_stats_on_payment",
+		],
 	},
 }
 
@@ -95,7 +179,11 @@ override_doctype_class = {
 }
 
 # Migration hooks
-before_migrate = ["klik_pos.setup.pos_opening_entry_links.ensure_pos_opening_entry_links"]
+before_migrate = [
+	"klik_pos.setup.pos_opening_entry_links.ensure_pos_opening_entry_links",
+	"klik_pos.setup.indexes.drop_obsolete_indexes",
+]
+after_migrate = ["klik_pos.setup.indexes.ensure_indexes"]
 # Includes in <head>
 # ------------------
 
@@ -225,6 +313,16 @@ doctype_js.update({"Company": "public/js/company.js"})
 # Scheduled Tasks
 # ---------------
 
+scheduler_events = {
+	"cron": {
+		# Picks up outbound retries that are due and work left by a job that stopped early
+		"* * * * *": [
+			"klik_pos.api.outbound.resume_outbound_queues",
+			"klik_pos.api.whatsap.webhook.resume_webhook_events",
+		],
+	},
+}
+
 # scheduler_events = {
 # 	"all": [
 # 		"klik_pos.tasks.all"
@@ -315,9 +413,9 @@ doctype_js.update({"Company": "public/js/company.js"})
 # Automatically update python controller files with type annotations for this app.
 # export_python_type_annotations = True
 
-# default_log_clearing_doctypes = {
-# 	"Logging DocType Name": 30  # days to retain logs
-# }
+default_log_clearing_doctypes = {
+	"Klik WhatsApp Webhook Event": 7,
+}
 
 
 website_route_rules = [
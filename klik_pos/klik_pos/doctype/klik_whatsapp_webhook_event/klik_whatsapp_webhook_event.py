@@ -0,0 +1,18 @@
+# Copyright (c) 2026, Beveren Sooftware Inc and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder import Interval
+from frappe.query_builder.functions import Now
+
+
+class KlikWhatsAppWebhookEvent(Document):
+	@staticmethod
+	def clear_old_logs(days=7):
+		"""Delete processed webhook payloads older than days; failed ones are kept for inspection."""
+		table = frappe.qb.DocType("Klik WhatsApp Webhook Event")
+		frappe.db.delete(
+			table,
+			filters=(table.modified < (Now() - Interval(days=days))) & (table.status == "Processed"),
+		)
@@ -120,8 +120,8 @@ function send_whatsapp_for_invoice(frm, values) {
 												currency: invoice.currency,
 											}
 										)}</p>
-                                        <p><strong>Message ID:</strong> ${
-											response.message.message_id
+                                        <p><strong>Queue ID:</strong> ${
+											response.message.queue_id
 										}</p>
                                     </div>
                                 `),
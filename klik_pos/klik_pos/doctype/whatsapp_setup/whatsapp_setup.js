@@ -124,16 +124,16 @@ function send_test_whatsapp_message(values) {
 		},
 		callback: function (r) {
 			if (r.message && r.message.success) {
-				frappe.show_alert(__("Test message sent successfully!"), 5, "green");
+				frappe.show_alert(__("Test message queued successfully!"), 5, "green");
 
 				frappe.msgprint({
-					title: __("Test Message Sent"),
+					title: __("Test Message Queued"),
 					message: __(`
                         <div style="padding: 10px;">
-                            <p><strong>Status:</strong> ✅ Sent</p>
+                            <p><strong>Status:</strong> ⏳ Queued</p>
                             <p><strong>To:</strong> ${values.mobile_number}</p>
                             <p><strong>Message:</strong> ${values.test_message}</p>
-                            <p><strong>Message ID:</strong> ${r.message.message_id}</p>
+                            <p><strong>Queue ID:</strong> ${r.message.queue_id}</p>
                         </div>
                     `),
 					indicator: "green",
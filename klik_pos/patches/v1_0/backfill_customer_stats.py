@@ -0,0 +1,5 @@
+from klik_pos.api.customer_stats import backfill_customer_stats
+
+
+def execute():
+	backfill_customer_stats()
@@ -0,0 +1,5 @@
+from klik_pos.api.supplier_stats import backfill_supplier_stats
+
+
+def execute():
+	backfill_supplier_stats()
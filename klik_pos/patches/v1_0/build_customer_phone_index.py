@@ -0,0 +1,5 @@
+from klik_pos.api.customer_phone import rebuild_customer_phone_index
+
+
+def execute():
+	rebuild_customer_phone_index()
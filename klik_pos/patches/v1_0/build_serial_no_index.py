@@ -0,0 +1,5 @@
+from klik_pos.api.serial_index import rebuild_serial_index
+
+
+def execute():
+	rebuild_serial_index()
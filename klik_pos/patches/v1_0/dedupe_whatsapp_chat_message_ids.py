@@ -0,0 +1,22 @@
+import frappe
+
+
+def execute():
+	"""Clear blank and duplicate WhatsApp Chat message ids so the unique index on message_id can be added."""
+	if not frappe.db.table_exists("WhatsApp Chat"):
+		return
+
+	frappe.db.sql("UPDATE `tabWhatsApp Chat` SET message_id = NULL WHERE message_id = ''")
+	# Keep the id on the oldest chat of each duplicate group (the one status receipts were applied to)
+	frappe.db.sql(
+		"""
+		UPDATE `tabWhatsApp Chat` chat
+		JOIN (
+			SELECT name, ROW_NUMBER() OVER (PARTITION BY message_id ORDER BY creation, name) AS position
+			FROM `tabWhatsApp Chat`
+			WHERE message_id IS NOT NULL
+		) ranked ON ranked.name = chat.name
+		SET chat.message_id = NULL
+		WHERE ranked.position > 1
+		"""
+	)
@@ -0,0 +1,5 @@
+from klik_pos.api.customer_search import rebuild_customer_search_index
+
+
+def execute():
+	rebuild_customer_search_index()
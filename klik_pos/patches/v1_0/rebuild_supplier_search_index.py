@@ -0,0 +1,5 @@
+from klik_pos.api.supplier_search import rebuild_supplier_search_index
+
+
+def execute():
+	rebuild_supplier_search_index()
@@ -32,9 +32,9 @@ frappe.ui.form.on("Sales Invoice", {
 								message: values.message,
 							},
 							callback: function (r) {
-								if (r.message && r.message.status === "success") {
+								if (r.message && r.message.status === "queued") {
 									frappe.msgprint(
-										`WhatsApp message sent to ${r.message.recipient}`
+										`WhatsApp message queued for ${r.message.recipient}`
 									);
 								}
 								d.hide();
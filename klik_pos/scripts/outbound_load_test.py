@@ -0,0 +1,54 @@
+"""
+Console script to load-test the outbound message queue against the local stub provider.
+
+Requires in site_config.json:
+    "klik_pos_outbound_provider": "stub"
+Optional: "klik_pos_outbound_stub_latency_ms", "klik_pos_outbound_stub_failure_rate",
+"klik_pos_outbound_limits".
+
+Usage:
+    bench --site [site-name] execute klik_pos.scripts.outbound_load_test.run_outbound_load_test --kwargs "{'count': 2000}"
+"""
+
+import time
+
+import frappe
+
+from klik_pos.api.outbound import JOB_KIND, enqueue_message
+
+POLL_INTERVAL = 2
+
+
+def run_outbound_load_test(channel="whatsapp", count=1000, timeout=900):
+	"""
+	Queue count stub messages on channel and report how long the drainers take to settle them.
+
+	Args:
+		channel: Outbound channel to load
+		count: Number of messages to queue
+		timeout: Seconds to wait before reporting whatever has settled
+	"""
+	if frappe.conf.get("klik_pos_outbound_provider") != "stub":
+		print('❌ Set klik_pos_outbound_provider to "stub" in site config first.')
+		return
+
+	started = time.monotonic()
+	message_ids = [
+		enqueue_message(channel, {"to": f"{i:010d}", "type": "text", "text": {"body": "Load test"}})
+		for i in range(count)
+	]
+	frappe.db.commit()
+	print(f"📤 Queued {count} {channel} messages in {time.monotonic() - started:.1f}s")
+
+	keys = [f"klik_pos_{JOB_KIND}:{message_id}" for message_id in message_ids]
+	while time.monotonic() - started < timeout:
+		time.sleep(POLL_INTERVAL)
+		statuses = [(frappe.cache().get_value(key) or {}).get("status") for key in keys]
+		settled = sum(status in ("sent", "failed") for status in statuses)
+		print(f"  ⏳ {settled}/{count} settled")
+		if settled == count:
+			break
+
+	elapsed = time.monotonic() - started
+	print(f"\n✅ Sent: {statuses.count('sent')}  ❌ Failed: {statuses.count('failed')}")
+	print(f"   {elapsed:.1f}s, {statuses.count('sent') / elapsed:.1f} messages/s")
@@ -5,28 +5,34 @@ Replaces them with proper unique EAN-13 standard barcodes.
 Usage:
     bench --site [site-name] console
     >>> exec(open('apps/klik_pos/klik_pos/scripts/update_item_code_barcodes.py').read())
-    
+
 Or run directly:
     bench --site [site-name] execute klik_pos.scripts.update_item_code_barcodes.update_item_code_barcodes
 """
 
 import frappe
-from klik_pos.api.item import _generate_unique_barcode
+from klik_pos.api.barcode import allocate_barcodes
+
+UPDATE_CHUNK_SIZE = 1000
+PREVIEW_ROWS = 20
 
 
 def update_item_code_barcodes(dry_run=True):
 	"""
 	Update items where barcode equals item_code to use proper EAN-13 barcodes.
-	
+
+	All new barcodes are allocated from the barcode sequence in one call and written with
+	one UPDATE per chunk of UPDATE_CHUNK_SIZE rows.
+
 	Args:
 		dry_run: If True, only show what would be changed without making changes
 	"""
 	frappe.flags.in_console = True
-	
+
 	# Find all items where barcode equals item_code
 	# Query Item Barcode child table to find barcodes that match their parent item_code
 	items_to_update = frappe.db.sql("""
-		SELECT 
+		SELECT
 			ib.parent as item_code,
 			ib.name as barcode_name,
 			ib.barcode as current_barcode,
@@ -37,65 +43,58 @@ def update_item_code_barcodes(dry_run=True):
 		AND i.disabled = 0
 		ORDER BY i.modified DESC
 	""", as_dict=True)
-	
+
 	if not items_to_update:
 		print("✅ No items found where barcode equals item_code.")
 		return
-	
+
 	print(f"\n📊 Found {len(items_to_update)} items to update:\n")
-	
-	updated_count = 0
-	error_count = 0
-	
-	for item in items_to_update:
-		try:
-			# Generate new unique barcode
-			new_barcode = _generate_unique_barcode()
-			
+
+	if dry_run:
+		for item in items_to_update[:PREVIEW_ROWS]:
 			print(f"Item: {item.item_code} ({item.item_name})")
 			print(f"  Current barcode: {item.current_barcode}")
-			print(f"  New barcode: {new_barcode}")
-			
-			if not dry_run:
-				# Update the barcode in Item Barcode child table
-				frappe.db.set_value(
-					"Item Barcode",
-					item.barcode_name,
-					"barcode",
-					new_barcode
-				)
-				
-				# Also update barcode_type to EAN for EAN-13
-				frappe.db.set_value(
-					"Item Barcode",
-					item.barcode_name,
-					"barcode_type",
-					"EAN"
-				)
-				
-				print(f"  ✅ Updated successfully")
-				updated_count += 1
-			else:
-				print(f"  ⏸️  Would update (dry run mode)")
-			
-			print()
-			
-		except Exception as e:
-			error_count += 1
-			print(f"  ❌ Error: {str(e)}")
-			print()
-			frappe.log_error(f"Error updating barcode for {item.item_code}: {str(e)}")
-	
-	# Commit if not dry run
-	if not dry_run:
-		frappe.db.commit()
-		print(f"\n✅ Successfully updated {updated_count} items.")
-		if error_count > 0:
-			print(f"⚠️  {error_count} items had errors (check logs).")
-	else:
+		if len(items_to_update) > PREVIEW_ROWS:
+			print(f"... and {len(items_to_update) - PREVIEW_ROWS} more")
+
 		print(f"\n⏸️  DRY RUN MODE - No changes made.")
 		print(f"   To apply changes, run with dry_run=False:")
 		print(f"   >>> update_item_code_barcodes(dry_run=False)")
+		return
+
+	new_barcodes = allocate_barcodes(len(items_to_update))
+	updated_count = 0
+	error_count = 0
+
+	for start in range(0, len(items_to_update), UPDATE_CHUNK_SIZE):
+		chunk = items_to_update[start : start + UPDATE_CHUNK_SIZE]
+		barcodes = new_barcodes[start : start + UPDATE_CHUNK_SIZE]
+		cases = " ".join(f"WHEN %(name_{i})s THEN %(barcode_{i})s" for i in range(len(chunk)))
+		try:
+			frappe.db.sql(
+				f"""
+				UPDATE `tabItem Barcode`
+				SET barcode = CASE name {cases} END, barcode_type = 'EAN'
+				WHERE name IN %(names)s
+				""",
+				{
+					"names": tuple(item.barcode_name for item in chunk),
+					**{f"name_{i}": item.barcode_name for i, item in enumerate(chunk)},
+					**{f"barcode_{i}": barcode for i, barcode in enumerate(barcodes)},
+				},
+			)
+			frappe.db.commit()
+			updated_count += len(chunk)
+			print(f"  ✅ Updated {updated_count}/{len(items_to_update)}")
+		except Exception as e:
+			frappe.db.rollback()
+			error_count += len(chunk)
+			print(f"  ❌ Error: {str(e)}")
+			frappe.log_error(frappe.get_traceback(), "Error updating item code barcodes")
+
+	print(f"\n✅ Successfully updated {updated_count} items.")
+	if error_count > 0:
+		print(f"⚠️  {error_count} items had errors (check logs).")
 
 
 # Auto-run if executed directly in console
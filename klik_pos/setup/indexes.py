@@ -0,0 +1,290 @@
+"""
+Managed database indexes for KLiK PoS.
+
+All indexes the app relies on are declared in MANAGED_INDEXES. They are created in
+after_migrate, indexes from the old optimize_invoice_performance.py script that are
+redundant are dropped in before_migrate, and get_index_report() verifies every
+declaration with EXPLAIN and reports missing or unused indexes.
+"""
+
+import frappe
+
+# Each entry: doctype, index name, columns, and a probe WHERE clause used for the EXPLAIN check
+MANAGED_INDEXES = [
+	{
+		"doctype": "Sales Invoice",
+		"index_name": "idx_sales_invoice_pos_composite",
+		"columns": ["custom_pos_opening_entry", "docstatus", "modified"],
+		"probe": "custom_pos_opening_entry = %(value)s AND docstatus = 1",
+	},
+	{
+		"doctype": "Sales Invoice",
+		"index_name": "idx_sales_invoice_profile_date",
+		"columns": ["pos_profile", "posting_date", "docstatus"],
+		"probe": "pos_profile = %(value)s AND posting_date = '2000-01-01' AND docstatus = 1",
+	},
+	{
+		"doctype": "Sales Invoice",
+		"index_name": "idx_sales_invoice_posting_date",
+		"columns": ["posting_date"],
+		"probe": "posting_date = '2000-01-01'",
+	},
+	{
+		"doctype": "Sales Invoice",
+		"index_name": "idx_sales_invoice_customer_return",
+		"columns": ["customer", "docstatus", "is_return"],
+		"probe": "customer = %(value)s AND docstatus = 1 AND is_return = 0",
+	},
+	{
+		"doctype": "Sales Invoice",
+		"index_name": "idx_sales_invoice_return_against",
+		"columns": ["return_against", "is_return"],
+		"probe": "return_against = %(value)s AND is_return = 1",
+	},
+	{
+		"doctype": "Bin",
+		"index_name": "idx_bin_warehouse_item",
+		"columns": ["warehouse", "item_code"],
+		"probe": "warehouse = %(value)s AND item_code = %(value)s",
+	},
+	{
+		"doctype": "Item Price",
+		"index_name": "idx_item_price_lookup",
+		"columns": ["item_code", "price_list", "selling", "valid_from"],
+		"probe": "item_code = %(value)s AND price_list = %(value)s AND selling = 1",
+	},
+	{
+		"doctype": "Item Barcode",
+		"index_name": "idx_item_barcode_barcode",
+		"columns": ["barcode"],
+		"probe": "barcode = %(value)s",
+	},
+	{
+		"doctype": "Payment Entry Reference",
+		"index_name": "idx_payment_entry_reference_doc",
+		"columns": ["reference_doctype", "reference_name"],
+		"probe": "reference_doctype = 'Sales Invoice' AND reference_name = %(value)s",
+	},
+	{
+		"doctype": "Klik Customer Search Term",
+		"index_name": "idx_customer_search_term",
+		"columns": ["term_type", "term"],
+		"probe": "term_type = 'Phone' AND term LIKE '0712%%'",
+	},
+	{
+		"doctype": "Klik Supplier Search Term",
+		"index_name": "idx_supplier_search_term",
+		"columns": ["term_type", "term"],
+		"probe": "term_type = 'Tax ID' AND term LIKE 'P05%%'",
+	},
+	{
+		"doctype": "Klik Serial No Index",
+		"index_name": "idx_serial_no_index_item_warehouse",
+		"columns": ["item_code", "warehouse", "status"],
+		"probe": "item_code = %(value)s AND warehouse = %(value)s AND status = 'Active'",
+	},
+	{
+		"doctype": "Purchase Invoice",
+		"index_name": "idx_purchase_invoice_supplier_return",
+		"columns": ["supplier", "docstatus", "is_return"],
+		"probe": "supplier = %(value)s AND docstatus = 1 AND is_return = 0",
+	},
+	{
+		"doctype": "Purchase Invoice",
+		"index_name": "idx_purchase_invoice_supplier_posting_date",
+		"columns": ["supplier", "posting_date"],
+		"probe": "supplier = %(value)s AND posting_date < '2000-01-01'",
+	},
+	{
+		"doctype": "Purchase Invoice",
+		"index_name": "idx_purchase_invoice_posting_date",
+		"columns": ["posting_date"],
+		"probe": "posting_date < '2000-01-01'",
+	},
+	{
+		# Unique index Frappe creates for the unique message_id field
+		"doctype": "WhatsApp Chat",
+		"index_name": "message_id",
+		"columns": ["message_id"],
+		"probe": "message_id = %(value)s",
+	},
+]
+
+# Indexes created by the old manual script that are now redundant (doctype, index name)
+OBSOLETE_INDEXES = [
+	# Left prefix of idx_sales_invoice_pos_composite
+	("Sales Invoice", "idx_sales_invoice_pos_opening_entry"),
+	# Left prefix of idx_sales_invoice_customer_return
+	("Sales Invoice", "idx_sales_invoice_customer"),
+	# Child tables are already indexed on parent by Frappe
+	("Sales Invoice Payment", "idx_sales_invoice_payment_parent"),
+	("Sales Invoice Item", "idx_sales_invoice_item_parent"),
+]
+
+
+def drop_obsolete_indexes():
+	"""Drop redundant legacy indexes from the table each one was actually created on."""
+	for doctype, index_name in OBSOLETE_INDEXES:
+		table = f"tab{doctype}"
+		if not frappe.db.table_exists(doctype) or not frappe.db.has_index(table, index_name):
+			continue
+		frappe.db.sql_ddl(f"ALTER TABLE `{table}` DROP INDEX `{index_name}`")
+		print(f"🧹 Dropped obsolete index {index_name} on {table}")
+
+
+def ensure_indexes():
+	"""Create every managed index that is missing and not already covered by another index."""
+	for spec in MANAGED_INDEXES:
+		if not frappe.db.table_exists(spec["doctype"]):
+			continue
+
+		table = f"tab{spec['doctype']}"
+		if frappe.db.has_index(table, spec["index_name"]):
+			continue
+
+		covering_index = _find_covering_index(table, spec["columns"])
+		if covering_index:
+			continue
+
+		frappe.db.add_index(spec["doctype"], spec["columns"], index_name=spec["index_name"])
+		print(f"✅ Added index {spec['index_name']} on {table}")
+
+	report = get_index_report()
+	missing = [row["index_name"] for row in report if row["status"] == "missing"]
+	if missing:
+		print(f"⚠️ KLiK PoS indexes still missing: {', '.join(missing)}")
+
+
+def get_index_report():
+	"""
+	Verify every managed index.
+
+	Returns:
+		list of dicts with doctype, index_name, columns, status ("ok", "covered", "missing"),
+		covered_by, usable (index appears in EXPLAIN possible_keys for the probe query),
+		chosen_key (index the optimizer picked) and used (True/False, None when the server
+		does not collect index usage statistics).
+	"""
+	usage = _get_index_usage()
+	report = []
+
+	for spec in MANAGED_INDEXES:
+		table = f"tab{spec['doctype']}"
+		row = {
+			"doctype": spec["doctype"],
+			"index_name": spec["index_name"],
+			"columns": spec["columns"],
+			"status": "missing",
+			"covered_by": None,
+			"usable": False,
+			"chosen_key": None,
+			"used": None,
+		}
+		report.append(row)
+
+		if not frappe.db.table_exists(spec["doctype"]):
+			continue
+
+		effective_index = None
+		if frappe.db.has_index(table, spec["index_name"]):
+			row["status"] = "ok"
+			effective_index = spec["index_name"]
+		else:
+			covering_index = _find_covering_index(table, spec["columns"])
+			if covering_index:
+				row["status"] = "covered"
+				row["covered_by"] = covering_index
+				effective_index = covering_index
+
+		if not effective_index:
+			continue
+
+		plan = _explain_probe(table, spec["probe"])
+		possible_keys = (plan.get("possible_keys") or "").split(",")
+		row["usable"] = effective_index in possible_keys
+		row["chosen_key"] = plan.get("key")
+		if usage is not None:
+			row["used"] = (table, effective_index) in usage
+
+	return report
+
+
+@frappe.whitelist()
+def index_report():
+	"""Return the managed index report (System Manager only)."""
+	frappe.only_for("System Manager")
+	return get_index_report()
+
+
+def print_index_report():
+	"""Print the managed index report, e.g. via `bench execute klik_pos.setup.indexes.print_index_report`."""
+	for row in get_index_report():
+		details = f"covered by {row['covered_by']}" if row["covered_by"] else row["status"]
+		used = {True: "used", False: "unused", None: "usage unknown"}[row["used"]]
+		print(
+			f"{row['doctype']:<26} {row['index_name']:<36} {details:<28} "
+			f"explain={'usable' if row['usable'] else 'NOT USABLE'} chosen={row['chosen_key']} {used}"
+		)
+
+
+def _find_covering_index(table, columns):
+	"""Return the name of an existing index whose leading columns match the given columns."""
+	index_columns = {}
+	for row in frappe.db.sql(f"SHOW INDEX FROM `{table}`", as_dict=True):
+		index_columns.setdefault(row.Key_name, {})[row.Seq_in_index] = row.Column_name
+
+	for index_name, seq_columns in index_columns.items():
+		ordered = [seq_columns[seq] for seq in sorted(seq_columns)]
+		if ordered[: len(columns)] == list(columns):
+			return index_name
+
+	return None
+
+
+def _explain_probe(table, probe):
+	"""Run EXPLAIN for the probe query against the table and return the first plan row."""
+	try:
+		plan = frappe.db.sql(
+			f"EXPLAIN SELECT name FROM `{table}` WHERE {probe}",
+			{"value": "__klik_pos_index_probe__"},
+			as_dict=True,
+		)
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), f"Index EXPLAIN check failed for {table}")
+		return {}
+
+	return plan[0] if plan else {}
+
+
+def _get_index_usage():
+	"""
+	Return a set of (table, index) pairs that have been read since server start,
+	or None when neither MariaDB user statistics nor performance_schema is enabled.
+	"""
+	try:
+		if frappe.db.sql("SELECT @@userstat")[0][0]:
+			rows = frappe.db.sql(
+				"""
+				SELECT TABLE_NAME, INDEX_NAME
+				FROM information_schema.INDEX_STATISTICS
+				WHERE TABLE_SCHEMA = DATABASE() AND ROWS_READ > 0
+				"""
+			)
+			return {(table, index) for table, index in rows}
+	except Exception:
+		pass
+
+	try:
+		if frappe.db.sql("SELECT @@performance_schema")[0][0]:
+			rows = frappe.db.sql(
+				"""
+				SELECT OBJECT_NAME, INDEX_NAME
+				FROM performance_schema.table_io_waits_summary_by_index_usage
+				WHERE OBJECT_SCHEMA = DATABASE() AND INDEX_NAME IS NOT NULL AND COUNT_STAR > 0
+				"""
+			)
+			return {(table, index) for table, index in rows}
+	except Exception:
+		pass
+
+	return None
@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from klik_pos.api.barcode import BLOCK_SIZE, allocate_barcodes, calculate_ean13_check_digit
+
+
+class TestBarcodeAllocator(FrappeTestCase):
+	"""Test sequence-backed EAN-13 allocation"""
+
+	def test_bulk_allocation_spans_blocks_without_duplicates(self):
+		barcodes = allocate_barcodes(BLOCK_SIZE * 2 + 50) + allocate_barcodes(3)
+
+		self.assertEqual(len(set(barcodes)), len(barcodes))
+		for barcode in barcodes:
+			self.assertEqual(len(barcode), 13)
+			self.assertTrue(barcode.startswith("2"))
+			self.assertEqual(barcode[-1], calculate_ean13_check_digit(barcode[:12]))
+
+	def test_threads_sharing_a_block_get_distinct_barcodes(self):
+		site = frappe.local.site
+		block_starts = count(1, BLOCK_SIZE)
+
+		def reserve_block(size):
+			start = next(block_starts)
+			return [start, start + BLOCK_SIZE]
+
+		def allocate(_):
+			# frappe.local is per thread; the reserved block is shared per site
+			frappe.local.site = site
+			return allocate_barcodes(7)
+
+		with (
+			patch("klik_pos.api.barcode._reserve_block", side_effect=reserve_block),
+			patch.dict("klik_pos.api.barcode._reserved_blocks", clear=True),
+			ThreadPoolExecutor(max_workers=8) as executor,
+		):
+			barcodes = [barcode for batch in executor.map(allocate, range(40)) for barcode in batch]
+
+		self.assertEqual(len(set(barcodes)), len(barcodes))
+
+	def test_check_digit(self):
+		self.assertEqual(calculate_ean13_check_digit("400638133393"), "1")
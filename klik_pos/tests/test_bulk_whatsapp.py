@@ -0,0 +1,77 @@
+from unittest.mock import MagicMock, patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from klik_pos.api.whatsap.bulk import _send_campaign
+
+
+class TestBulkWhatsApp(FrappeTestCase):
+	"""Test bulk WhatsApp sending and pause handling"""
+
+	@patch("klik_pos.api.whatsap.bulk.publish_job_progress")
+	@patch("klik_pos.api.whatsap.bulk._post")
+	def test_paused_campaign_stops_before_sending(self, mock_post, mock_publish):
+		campaign_id = "_test_bulk_whatsapp_campaign"
+		spec = {"recipients": ["254700000001"], "message_type": "text", "message_content": "Hi"}
+		progress = {"status": "running", "position": 0, "sent": 0, "failed": 0, "errors": []}
+
+		with (
+			patch("klik_pos.api.whatsap.bulk.frappe.cache") as mock_cache,
+			patch("klik_pos.api.whatsap.bulk.frappe.get_doc"),
+		):
+			mock_cache.return_value.get_value.return_value = "pause"
+			_send_campaign(campaign_id, spec, progress)
+
+		mock_post.assert_not_called()
+		self.assertEqual(progress["status"], "paused")
+		self.assertEqual(progress["position"], 0)
+
+	@patch("klik_pos.api.whatsap.bulk.publish_job_progress")
+	@patch("klik_pos.api.whatsap.bulk.RateWindow")
+	@patch("klik_pos.api.whatsap.bulk._pooled_session")
+	@patch("klik_pos.api.whatsap.bulk._new_chat_names")
+	@patch("klik_pos.api.whatsap.bulk._post")
+	def test_batch_is_sent_counted_and_logged(
+		self, mock_post, mock_chat_names, mock_session, mock_rate_window, mock_publish
+	):
+		recipients = ["254700000001", "254700000002", "254700000003"]
+		spec = {
+			"recipients": recipients,
+			"message_type": "text",
+			"message_content": "Hi",
+			"template_name": None,
+			"template_parameters": None,
+		}
+		progress = {"status": "running", "position": 0, "sent": 0, "failed": 0, "errors": []}
+		mock_post.side_effect = lambda session, url, data, rate_window: (
+			{"error": "Invalid recipient"}
+			if data["to"] == "254700000002"
+			else {"message_id": f"wamid.{data['to']}"}
+		)
+		mock_chat_names.side_effect = lambda count: [f"10-26-{number:04d}" for number in range(1, count + 1)]
+
+		with (
+			patch("klik_pos.api.whatsap.bulk.frappe.cache") as mock_cache,
+			patch("klik_pos.api.whatsap.bulk.frappe.get_doc", return_value=MagicMock()),
+			patch("klik_pos.api.whatsap.bulk.frappe.db.bulk_insert") as mock_bulk_insert,
+			patch("klik_pos.api.whatsap.bulk.frappe.db.commit"),
+		):
+			mock_cache.return_value.get_value.return_value = None
+			_send_campaign("_test_bulk_whatsapp_campaign", spec, progress)
+
+		self.assertEqual(mock_post.call_count, 3)
+		self.assertEqual(progress["status"], "completed")
+		self.assertEqual(progress["position"], 3)
+		self.assertEqual((progress["sent"], progress["failed"]), (2, 1))
+		self.assertEqual(progress["errors"], [{"recipient": "254700000002", "error": "Invalid recipient"}])
+
+		mock_bulk_insert.assert_called_once()
+		fields = mock_bulk_insert.call_args.kwargs["fields"]
+		rows = [
+			dict(zip(fields, values, strict=True)) for values in mock_bulk_insert.call_args.kwargs["values"]
+		]
+		self.assertEqual([row["name"] for row in rows], ["10-26-0001", "10-26-0002", "10-26-0003"])
+		self.assertEqual([row["to"] for row in rows], recipients)
+		self.assertEqual([row["status"] for row in rows], ["Success", "Failed", "Success"])
+		self.assertEqual(rows[0]["message_id"], "wamid.254700000001")
+		mock_chat_names.assert_called_once_with(3)
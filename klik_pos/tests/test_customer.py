@@ -12,9 +12,7 @@ class TestCustomerAPI(FrappeTestCase):
 	def setUp(self):
 		super().setUp()
 
-	@patch("klik_pos.api.customer.get_customer_statistics")
-	@patch("frappe.db.get_value")
-	@patch("frappe.get_doc")
+	@patch("klik_pos.api.customer.get_customer_stats_map")
 	@patch("klik_pos.api.customer.get_current_pos_profile")
 	@patch("klik_pos.api.customer.get_user_company_and_currency")
 	@patch("frappe.permissions.get_user_permissions")
@@ -23,9 +21,7 @@ class TestCustomerAPI(FrappeTestCase):
 		mock_user_permissions,
 		mock_company_currency,
 		mock_pos_profile,
-		mock_get_doc,
-		mock_db_get_value,
-		mock_get_stats,
+		mock_stats_map,
 	):
 		"""Test basic functionality of get_customers function"""
 
@@ -36,41 +32,31 @@ class TestCustomerAPI(FrappeTestCase):
 		# Mock user permissions (no specific customer permissions)
 		mock_user_permissions.return_value = {}
 
-		from types import SimpleNamespace
+		mock_stats_map.return_value = {
+			"CUST-001": {"total_orders": 3, "total_spent": 120.0, "last_visit": None}
+		}
 
 		with patch("frappe.get_all") as mock_get_all:
+			# Page rows carry every customer field; no per-row document loads are needed
 			mock_get_all.return_value = [
-				SimpleNamespace(name="CUST-001"),
-				SimpleNamespace(name="CUST-002"),
+				frappe._dict(
+					name="CUST-001",
+					customer_name="Test Customer 1",
+					customer_type="Individual",
+					customer_group="All Customer Groups",
+					territory="All Territories",
+					default_currency="USD",
+				),
+				frappe._dict(
+					name="CUST-002",
+					customer_name="Test Customer 2",
+					customer_type="Individual",
+					customer_group="All Customer Groups",
+					territory="All Territories",
+					default_currency="USD",
+				),
 			]
 
-			# Mock frappe.get_doc to return full Customer docs for each name
-			doc1 = MagicMock()
-			doc1.name = "CUST-001"
-			doc1.customer_name = "Test Customer 1"
-			doc1.customer_type = "Individual"
-			doc1.customer_group = "All Customer Groups"
-			doc1.territory = "All Territories"
-			doc1.default_currency = "USD"
-			doc1.customer_primary_contact = None
-			doc1.customer_primary_address = None
-
-			doc2 = MagicMock()
-			doc2.name = "CUST-002"
-			doc2.customer_name = "Test Customer 2"
-			doc2.customer_type = "Individual"
-			doc2.customer_group = "All Customer Groups"
-			doc2.territory = "All Territories"
-			doc2.default_currency = "USD"
-			doc2.customer_primary_contact = None
-			doc2.customer_primary_address = None
-
-			mock_get_doc.side_effect = [doc1, doc2]
-
-			mock_db_get_value.return_value = None
-
-			mock_get_stats.return_value = {"success": True, "data": {}}
-
 			result = get_customers(limit=10, start=0, search="")
 
 			self.assertTrue(result["success"])
@@ -78,10 +64,50 @@ class TestCustomerAPI(FrappeTestCase):
 			self.assertEqual(result["data"][0]["name"], "CUST-001")
 			self.assertEqual(result["data"][0]["customer_name"], "Test Customer 1")
 			self.assertIn(result["data"][0]["customer_type"], ["individual", "Individual"])
+			self.assertEqual(result["data"][0]["custom_total_orders"], 3)
+			self.assertEqual(result["data"][1]["custom_total_orders"], 0)
+			self.assertIsNone(result["data"][0]["contact"])
 
 			mock_pos_profile.assert_called_once()
 			mock_company_currency.assert_called_once()
 			mock_user_permissions.assert_called_once()
+			mock_stats_map.assert_called_once_with(["CUST-001", "CUST-002"])
+
+	@patch("klik_pos.api.customer.get_current_pos_profile")
+	@patch("klik_pos.api.customer.get_user_company_and_currency")
+	@patch("frappe.permissions.get_user_permissions")
+	def test_get_customers_query_count_independent_of_page_size(
+		self, mock_user_permissions, mock_company_currency, mock_pos_profile
+	):
+		"""get_customers must issue the same number of queries for a page of 2 and a page of 10"""
+		mock_pos_profile.return_value = MagicMock(custom_business_type="B2C", customer_groups=[])
+		mock_company_currency.return_value = ("Test Company", "USD")
+		mock_user_permissions.return_value = {}
+
+		for i in range(10):
+			customer_name = f"_Test KLiK Query Count Customer {i}"
+			if frappe.db.exists("Customer", {"customer_name": customer_name}):
+				continue
+			frappe.get_doc(
+				{
+					"doctype": "Customer",
+					"customer_name": customer_name,
+					"customer_type": "Individual",
+					"customer_group": "All Customer Groups",
+					"territory": "All Territories",
+					"email_id": f"klik-query-count-{i}@example.com",
+					"mobile_no": f"+1555000{i:04d}",
+				}
+			).insert(ignore_permissions=True)
+
+		def count_queries(limit):
+			with patch.object(frappe.db, "sql", wraps=frappe.db.sql) as sql_spy:
+				result = get_customers(limit=limit, start=0, search="")
+			self.assertTrue(result["success"])
+			self.assertEqual(len(result["data"]), limit)
+			return sql_spy.call_count
+
+		self.assertEqual(count_queries(2), count_queries(10))
 
 	@patch("klik_pos.api.customer.get_current_pos_profile")
 	@patch("frappe.permissions.get_user_permissions")
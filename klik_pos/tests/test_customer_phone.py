@@ -0,0 +1,25 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from klik_pos.api.customer_phone import claim_phone, get_customer_by_phone, to_e164
+
+
+class TestCustomerPhone(FrappeTestCase):
+	def test_to_e164_normalizes_local_and_international_formats(self):
+		self.assertEqual(to_e164("0712 345 678", "KE"), "+254712345678")
+		self.assertEqual(to_e164("+254 712-345-678", "US"), "+254712345678")
+		self.assertEqual(to_e164("00254712345678"), "+254712345678")
+		self.assertIsNone(to_e164("n/a", "KE"))
+		self.assertIsNone(to_e164(None, "KE"))
+
+	def test_first_claim_owns_the_number(self):
+		customers = frappe.get_all("Customer", pluck="name", limit=2)
+		if len(customers) < 2:
+			self.skipTest("Needs two customers")
+
+		phone = "+254700000099"
+		frappe.db.delete("Klik Customer Phone", {"name": phone})
+
+		self.assertEqual(claim_phone(phone, customers[0]), customers[0])
+		self.assertEqual(claim_phone(phone, customers[1]), customers[0])
+		self.assertEqual(get_customer_by_phone(phone), customers[0])
@@ -0,0 +1,59 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from klik_pos.api.customer_search import search_customers
+
+
+def _make_customer(customer_name, phone=None, email=None):
+	customer = frappe.get_doc(
+		{"doctype": "Customer", "customer_name": customer_name, "customer_type": "Individual"}
+	).insert(ignore_permissions=True)
+	if phone or email:
+		# Saving the contact reindexes the customers it links to
+		frappe.get_doc(
+			{
+				"doctype": "Contact",
+				"first_name": customer_name,
+				"phone_nos": [{"phone": phone, "is_primary_mobile_no": 1}] if phone else [],
+				"email_ids": [{"email_id": email, "is_primary": 1}] if email else [],
+				"links": [{"link_doctype": "Customer", "link_name": customer.name}],
+			}
+		).insert(ignore_permissions=True)
+	return customer.name
+
+
+class TestCustomerSearch(FrappeTestCase):
+	"""Test prefix matching, ranking and upkeep of the customer search index"""
+
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.quimby = _make_customer(
+			"_Test Zorblat Quimby", phone="+254799123456", email="zorblat.quimby@example.com"
+		)
+		cls.quennell = _make_customer("_Test Zorblat Quennell")
+
+	def test_prefix_matches_name_phone_and_email(self):
+		names, total = search_customers("zorb")
+		self.assertIn(self.quimby, names)
+		self.assertIn(self.quennell, names)
+		self.assertEqual(total, len(names))
+
+		self.assertEqual(search_customers("254799123")[0], [self.quimby])
+		self.assertIn(self.quimby, search_customers("zorblat.quimby@exa")[0])
+
+	def test_more_matched_tokens_rank_first(self):
+		names, _total = search_customers("zorblat quen")
+		self.assertEqual(names[0], self.quennell)
+		self.assertIn(self.quimby, names)
+
+	def test_index_follows_rename_and_delete(self):
+		customer = _make_customer("_Test Zorblat Ulmus")
+		renamed = frappe.rename_doc("Customer", customer, "_Test Zorblat Vantablack", force=True)
+
+		self.assertEqual(search_customers("vantablack")[0], [renamed])
+		# The customer name still matches, under the new name only
+		self.assertEqual(search_customers("ulmus")[0], [renamed])
+
+		frappe.delete_doc("Customer", renamed, force=True)
+		self.assertEqual(search_customers("vantablack"), ([], 0))
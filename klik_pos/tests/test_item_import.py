@@ -0,0 +1,38 @@
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from klik_pos.api.item_import import validate_import_rows
+
+
+class TestItemImportValidation(FrappeTestCase):
+	"""Test set-based validation of item import rows"""
+
+	@patch("klik_pos.api.item_import._existing_values")
+	def test_rows_are_checked_against_database_and_file(self, mock_existing):
+		existing = {
+			"tabItem`": {"OLD-ITEM"},
+			"tabItem Barcode`": {"111"},
+			"tabItem Group`": {"Products"},
+			"tabUOM`": {"Nos"},
+			"tabBatch`": set(),
+		}
+		mock_existing.side_effect = lambda query, values: next(
+			found for table, found in existing.items() if table in query
+		)
+
+		rows = [
+			(2, {"item_code": "NEW-1", "item_name": "New 1", "barcode": "222", "selling_price": "10"}),
+			(3, {"item_code": "OLD-ITEM", "item_name": "Old"}),
+			(4, {"item_code": "NEW-2", "item_name": "New 2", "barcode": "111"}),
+			(5, {"item_code": "NEW-3", "item_name": "New 3", "barcode": "222"}),
+			(6, {"item_code": "NEW-4", "item_name": "New 4", "stock_qty": "ten"}),
+			(7, {"item_code": "NEW-5", "item_name": "New 5", "uom": "Crate"}),
+		]
+
+		valid, errors = validate_import_rows(rows)
+
+		self.assertEqual([row["item_code"] for row in valid], ["NEW-1"])
+		self.assertEqual(valid[0]["selling_price"], 10.0)
+		self.assertEqual(sorted(error["row"] for error in errors), [3, 4, 5, 6, 7])
+		self.assertEqual(mock_existing.call_count, 5)
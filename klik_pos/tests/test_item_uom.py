@@ -0,0 +1,34 @@
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from klik_pos.api.item_uom import derive_uom_prices
+
+
+class TestItemUOMPrices(FrappeTestCase):
+	"""Test price derivation across the UOMs of several items"""
+
+	@patch("klik_pos.api.item_uom.frappe.db.sql")
+	@patch("klik_pos.api.item_uom.fetch_selling_prices")
+	@patch("klik_pos.api.item_uom.get_uom_matrix")
+	def test_direct_prices_win_and_others_are_converted(self, mock_matrix, mock_prices, mock_sql):
+		mock_matrix.return_value = {
+			"ITEM-A": {"stock_uom": "Nos", "factors": {"Nos": 1.0, "Box": 12.0, "Pack": 6.0}},
+			"ITEM-B": {"stock_uom": "Kg", "factors": {"Kg": 1.0, "Bag": 25.0}},
+		}
+		mock_prices.return_value = {
+			("ITEM-A", "Nos"): {"price": 2.0, "currency": "KES"},
+			("ITEM-A", "Box"): {"price": 20.0, "currency": "KES"},
+		}
+		# ITEM-B has no stock UOM price, so its valuation rate is used
+		mock_sql.return_value = [("ITEM-B", 4.0)]
+
+		result = derive_uom_prices(["ITEM-A", "ITEM-B"], "Standard Selling")
+
+		prices_a = {row["uom"]: row["price"] for row in result["ITEM-A"]["uoms"]}
+		self.assertEqual(prices_a, {"Nos": 2.0, "Box": 20.0, "Pack": 12.0})
+		self.assertEqual(result["ITEM-A"]["base_uom"], "Nos")
+
+		prices_b = {row["uom"]: row["price"] for row in result["ITEM-B"]["uoms"]}
+		self.assertEqual(prices_b, {"Kg": 4.0, "Bag": 100.0})
+		mock_sql.assert_called_once()
@@ -0,0 +1,105 @@
+from unittest.mock import MagicMock, patch
+
+import requests
+from frappe.tests.utils import FrappeTestCase
+
+from klik_pos.api.outbound import MAX_ATTEMPTS, RateWindow, _deliver
+
+
+def _message(attempt=0):
+	return {
+		"id": "msg-1",
+		"channel": "whatsapp",
+		"payload": {"to": "254700000000"},
+		"chat": "CHAT-1",
+		"attempt": attempt,
+		"user": "Administrator",
+	}
+
+
+class _FakeRedis:
+	"""Counts INCRs per key like Redis, for the rate window's pipeline."""
+
+	def __init__(self):
+		self.counts = {}
+
+	def make_key(self, key):
+		return f"_test|{key}".encode()
+
+	def pipeline(self):
+		return _FakePipeline(self)
+
+
+class _FakePipeline:
+	def __init__(self, redis):
+		self.redis = redis
+		self.key = None
+
+	def incr(self, key):
+		self.key = key
+
+	def expire(self, key, seconds):
+		pass
+
+	def execute(self):
+		self.redis.counts[self.key] = self.redis.counts.get(self.key, 0) + 1
+		return [self.redis.counts[self.key], True]
+
+
+@patch("klik_pos.api.outbound.publish_job_progress")
+@patch("klik_pos.api.outbound._update_chat")
+@patch("klik_pos.api.outbound._schedule_retry")
+class TestOutboundDelivery(FrappeTestCase):
+	"""Test retry and status handling of outbound messages"""
+
+	def test_sent_message_updates_chat(self, mock_retry, mock_update_chat, mock_publish):
+		_deliver(MagicMock(return_value={"message_id": "wamid.1"}), _message())
+
+		mock_update_chat.assert_called_once_with("CHAT-1", "Success", "wamid.1")
+		mock_retry.assert_not_called()
+		self.assertEqual(mock_publish.call_args[0][2]["status"], "sent")
+
+	def test_transient_error_is_retried_with_backoff(self, mock_retry, mock_update_chat, mock_publish):
+		message = _message(attempt=1)
+		_deliver(MagicMock(side_effect=requests.ConnectionError("reset")), message)
+
+		retried, delay = mock_retry.call_args[0]
+		self.assertEqual(retried["attempt"], 2)
+		self.assertGreaterEqual(delay, 10)
+		mock_update_chat.assert_not_called()
+		self.assertEqual(mock_publish.call_args[0][2]["status"], "retrying")
+
+	def test_exhausted_or_permanent_errors_fail(self, mock_retry, mock_update_chat, mock_publish):
+		_deliver(MagicMock(side_effect=requests.ConnectionError("reset")), _message(MAX_ATTEMPTS - 1))
+		_deliver(MagicMock(side_effect=ValueError("bad payload")), _message())
+
+		mock_retry.assert_not_called()
+		self.assertEqual(mock_update_chat.call_count, 2)
+		mock_update_chat.assert_called_with("CHAT-1", "Failed")
+
+
+class TestRateWindow(FrappeTestCase):
+	"""Test the per-second quota shared by drainers and bulk campaigns"""
+
+	def test_windows_of_one_channel_share_the_quota(self):
+		clock = [100.0]
+		sleeps = []
+
+		def sleep(seconds):
+			sleeps.append(seconds)
+			clock[0] += seconds
+
+		with (
+			patch("klik_pos.api.outbound.frappe.cache", return_value=_FakeRedis()),
+			patch("klik_pos.api.outbound.channel_limits", return_value={"concurrency": 1, "rate": 5}),
+			patch("klik_pos.api.outbound.time.time", side_effect=lambda: clock[0]),
+			patch("klik_pos.api.outbound.time.sleep", side_effect=sleep),
+		):
+			drainer, campaign = RateWindow("whatsapp"), RateWindow("whatsapp")
+			for window in (drainer, campaign, drainer, campaign, drainer):
+				window.acquire()
+			self.assertEqual(sleeps, [])
+
+			campaign.acquire()
+
+		self.assertEqual(sleeps, [1.0])
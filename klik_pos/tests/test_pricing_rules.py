@@ -0,0 +1,50 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from klik_pos.api.item import apply_pricing_rules_to_cart
+
+
+def _cached_value(doctype, name, fieldname, as_dict=False):
+	if doctype == "Company":
+		return "KES"
+	if fieldname == "stock_uom":
+		return "Nos"
+	return frappe._dict(item_group="Products", brand=None)
+
+
+@patch("klik_pos.api.item.get_current_pos_profile")
+@patch("klik_pos.api.item.fetch_item_price", return_value={"price": 2.0})
+@patch("klik_pos.api.item.frappe.get_doc", return_value=frappe._dict(stock_uom="Nos"))
+@patch("klik_pos.api.item.frappe.db.get_value", return_value=None)
+@patch("klik_pos.api.item.frappe.get_cached_value", side_effect=_cached_value)
+@patch("klik_pos.api.item_uom.get_uom_matrix")
+@patch("klik_pos.api.item.apply_pricing_rule")
+class TestCartPricingRules(FrappeTestCase):
+	"""Test pricing rules on cart lines sold in a UOM other than the stock UOM"""
+
+	def test_alternate_uom_line_is_converted(
+		self,
+		mock_apply_rule,
+		mock_matrix,
+		mock_cached_value,
+		mock_get_value,
+		mock_get_doc,
+		mock_fetch_price,
+		mock_profile,
+	):
+		mock_profile.return_value = frappe._dict(
+			company="_Test Company", warehouse="Stores - _TC", selling_price_list="Standard Selling"
+		)
+		mock_matrix.return_value = {"ITEM-A": {"stock_uom": "Nos", "factors": {"Nos": 1.0, "Box": 12.0}}}
+		mock_apply_rule.return_value = [{"has_pricing_rule": 0, "pricing_rules": ""}]
+
+		result = apply_pricing_rules_to_cart([{"item_code": "ITEM-A", "uom": "Box", "quantity": 2}])
+
+		erpnext_item = mock_apply_rule.call_args[0][0]["items"][0]
+		self.assertEqual(erpnext_item["conversion_factor"], 12.0)
+		self.assertEqual(erpnext_item["stock_qty"], 24.0)
+		self.assertEqual(erpnext_item["price_list_rate"], 24.0)
+		self.assertEqual(result[0]["price"], 24.0)
+		self.assertEqual(result[0]["uom"], "Box")
@@ -0,0 +1,60 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from klik_pos.api.item_uom import UOM_MATRIX_CACHE_KEY
+from klik_pos.api.purchase_invoice import _build_purchase_items, _resolve_purchase_context
+
+LINE_COUNT = 300
+ITEM_PREFIX = "_TEST-PI-BUILD-"
+
+
+class TestPurchaseInvoiceBuild(FrappeTestCase):
+	"""Test building a 300-line purchase invoice from the pre-resolved context"""
+
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.company = frappe.db.get_single_value("Global Defaults", "default_company") or "_Test Company"
+		cls.item_codes = [f"{ITEM_PREFIX}{i:03d}" for i in range(LINE_COUNT)]
+		frappe.db.bulk_insert(
+			"Item",
+			fields=["name", "item_code", "item_name", "stock_uom", "has_batch_no", "is_stock_item"],
+			values=[(code, code, code, "Nos", i % 3 == 0, 1) for i, code in enumerate(cls.item_codes)],
+		)
+		frappe.db.bulk_insert(
+			"UOM Conversion Detail",
+			fields=["name", "parent", "parenttype", "parentfield", "idx", "uom", "conversion_factor"],
+			values=[(f"{code}-box", code, "Item", "uoms", 1, "Box", 12) for code in cls.item_codes[::2]],
+		)
+		for code in cls.item_codes:
+			frappe.cache().hdel(UOM_MATRIX_CACHE_KEY, code)
+
+	def test_300_lines_resolve_in_a_fixed_number_of_queries(self):
+		lines = [
+			{
+				"id": code,
+				"quantity": 2,
+				"purchase_price": 5,
+				"selling_price": 8,
+				"uom": "Box" if i % 2 == 0 else None,
+				"batch": f"B-{i}",
+			}
+			for i, code in enumerate(self.item_codes)
+		]
+		payment_methods = [{"mode_of_payment": "Cash", "amount": 3000}]
+
+		with patch.object(frappe.db, "sql", wraps=frappe.db.sql) as mock_sql:
+			context = _resolve_purchase_context(self.company, lines, payment_methods)
+			rows, price_changes = _build_purchase_items(lines, context, "_Test Warehouse - _TC")
+
+		self.assertLessEqual(mock_sql.call_count, 4)
+		self.assertEqual(len(rows), LINE_COUNT)
+		self.assertEqual(len(price_changes), LINE_COUNT)
+
+		self.assertEqual(rows[0]["uom"], "Box")
+		self.assertEqual(rows[0]["conversion_factor"], 12)
+		self.assertEqual(rows[0]["batch_no"], "B-0")
+		self.assertEqual(rows[1]["uom"], "Nos")
+		self.assertNotIn("batch_no", rows[1])
@@ -0,0 +1,35 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from klik_pos.api.receipt import _receipt_file_name, get_receipt_file_url
+
+INVOICE = "_TEST-RECEIPT-SINV-0001"
+
+
+class TestReceipt(FrappeTestCase):
+	"""Test that receipts are rendered once per invoice state and then reused"""
+
+	def test_receipt_address_follows_invoice_inputs(self):
+		name = _receipt_file_name(INVOICE, "POS Receipt", "2026-01-01 10:00:00")
+
+		self.assertEqual(name, _receipt_file_name(INVOICE, "POS Receipt", "2026-01-01 10:00:00"))
+		self.assertNotEqual(name, _receipt_file_name(INVOICE, "POS Receipt", "2026-01-01 10:05:00"))
+		self.assertNotEqual(name, _receipt_file_name(INVOICE, "Standard", "2026-01-01 10:00:00"))
+
+	@patch("klik_pos.api.receipt.frappe.get_print", return_value=b"%PDF-1.4 receipt")
+	def test_stored_receipt_is_reused(self, mock_get_print):
+		get_value = frappe.db.get_value
+
+		def invoice_get_value(doctype, *args, **kwargs):
+			if doctype == "Sales Invoice":
+				return frappe._dict(pos_profile=None, modified="2026-01-01 10:00:00")
+			return get_value(doctype, *args, **kwargs)
+
+		with patch.object(frappe.db, "get_value", side_effect=invoice_get_value):
+			first = get_receipt_file_url(INVOICE)
+			second = get_receipt_file_url(INVOICE)
+
+		self.assertEqual(first, second)
+		mock_get_print.assert_called_once_with("Sales Invoice", INVOICE, "Standard", as_pdf=True)
@@ -0,0 +1,136 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import flt, nowdate
+
+from klik_pos.api.shift_aggregation import aggregate_shift
+
+TEST_OPENING_ENTRY = "_Test Shift Aggregation Opening"
+TEST_POS_PROFILE = "_Test Shift Aggregation Profile"
+
+
+class TestShiftAggregation(FrappeTestCase):
+	"""Compare the single-pass shift aggregation with a naive per-invoice computation."""
+
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		# (name, docstatus, is_return, net_total, taxes, grand_total, item qtys, payments)
+		invoices = [
+			("_TEST-SHIFT-SI-001", 1, 0, 100, 15, 115, [1, 2, 3], [("Cash", 115)]),
+			("_TEST-SHIFT-SI-002", 1, 0, 50, 7.5, 57.5, [5], [("Cash", 20), ("Card", 37.5)]),
+			("_TEST-SHIFT-SI-003", 1, 1, -20, -3, -23, [-1, -1], [("Cash", -23)]),
+			("_TEST-SHIFT-SI-004", 1, 0, 40, 6, 46, [4, 4], [("Card", 30), ("Card", 16)]),
+			("_TEST-SHIFT-SI-005", 2, 0, 999, 0, 999, [9], [("Cash", 999)]),
+			("_TEST-SHIFT-SI-006", 1, 0, 10, 0, 10, [], []),
+		]
+		for name, docstatus, is_return, net_total, taxes, grand_total, qtys, payments in invoices:
+			cls._insert_invoice(name, docstatus, is_return, net_total, taxes, grand_total, qtys, payments)
+
+	@staticmethod
+	def _insert_invoice(name, docstatus, is_return, net_total, taxes, grand_total, qtys, payments):
+		frappe.db.sql(
+			"""
+			INSERT INTO `tabSales Invoice`
+				(name, docstatus, is_return, custom_pos_opening_entry, pos_profile, posting_date,
+				 net_total, total_taxes_and_charges, grand_total)
+			VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+			""",
+			(
+				name,
+				docstatus,
+				is_return,
+				TEST_OPENING_ENTRY,
+				TEST_POS_PROFILE,
+				nowdate(),
+				net_total,
+				taxes,
+				grand_total,
+			),
+		)
+		for idx, qty in enumerate(qtys, start=1):
+			frappe.db.sql(
+				"""
+				INSERT INTO `tabSales Invoice Item` (name, parent, parenttype, parentfield, idx, docstatus, qty)
+				VALUES (%s, %s, 'Sales Invoice', 'items', %s, %s, %s)
+				""",
+				(f"{name}-item-{idx}", name, idx, docstatus, qty),
+			)
+		for idx, (mode_of_payment, amount) in enumerate(payments, start=1):
+			frappe.db.sql(
+				"""
+				INSERT INTO `tabSales Invoice Payment`
+					(name, parent, parenttype, parentfield, idx, docstatus, mode_of_payment, amount)
+				VALUES (%s, %s, 'Sales Invoice', 'payments', %s, %s, %s, %s)
+				""",
+				(f"{name}-pay-{idx}", name, idx, docstatus, mode_of_payment, amount),
+			)
+
+	def _naive_shift_totals(self):
+		"""Sum each invoice and its child rows separately, one invoice at a time."""
+		invoices = frappe.get_all(
+			"Sales Invoice",
+			filters={"custom_pos_opening_entry": TEST_OPENING_ENTRY, "docstatus": 1},
+			fields=["name", "is_return", "net_total", "total_taxes_and_charges", "grand_total"],
+		)
+		totals = {
+			"invoice_count": 0,
+			"return_count": 0,
+			"total_quantity": 0.0,
+			"net_total": 0.0,
+			"total_taxes_and_charges": 0.0,
+			"grand_total": 0.0,
+			"payments": {},
+		}
+		for invoice in invoices:
+			totals["invoice_count"] += 1
+			totals["return_count"] += invoice.is_return
+			totals["net_total"] += flt(invoice.net_total)
+			totals["total_taxes_and_charges"] += flt(invoice.total_taxes_and_charges)
+			totals["grand_total"] += flt(invoice.grand_total)
+
+			qtys = frappe.get_all("Sales Invoice Item", filters={"parent": invoice.name}, pluck="qty")
+			totals["total_quantity"] += sum(flt(qty) for qty in qtys)
+
+			payments = frappe.get_all(
+				"Sales Invoice Payment",
+				filters={"parent": invoice.name},
+				fields=["mode_of_payment", "amount"],
+			)
+			seen_modes = set()
+			for payment in payments:
+				row = totals["payments"].setdefault(
+					payment.mode_of_payment, {"amount": 0.0, "transactions": 0}
+				)
+				row["amount"] += flt(payment.amount)
+				if payment.mode_of_payment not in seen_modes:
+					row["transactions"] += 1
+					seen_modes.add(payment.mode_of_payment)
+
+		return totals
+
+	def _assert_totals_equal(self, actual, expected):
+		self.assertEqual(actual["invoice_count"], expected["invoice_count"])
+		self.assertEqual(actual["return_count"], expected["return_count"])
+		for field in ("total_quantity", "net_total", "total_taxes_and_charges", "grand_total"):
+			self.assertAlmostEqual(actual[field], expected[field], places=6, msg=field)
+
+		self.assertEqual(set(actual["payments"]), set(expected["payments"]))
+		for mode_of_payment, row in expected["payments"].items():
+			self.assertAlmostEqual(actual["payments"][mode_of_payment]["amount"], row["amount"], places=6)
+			self.assertEqual(actual["payments"][mode_of_payment]["transactions"], row["transactions"])
+
+	def test_opening_entry_aggregation_matches_naive(self):
+		expected = self._naive_shift_totals()
+		actual = aggregate_shift(opening_entry=TEST_OPENING_ENTRY)
+
+		self._assert_totals_equal(actual, expected)
+		self.assertEqual(actual["invoice_count"], 5)
+		self.assertAlmostEqual(actual["grand_total"], 205.5)
+		self.assertAlmostEqual(actual["total_quantity"], 17)
+		self.assertEqual(actual["payments"]["Card"]["transactions"], 2)
+
+	def test_daily_profile_aggregation_matches_naive(self):
+		expected = self._naive_shift_totals()
+		actual = aggregate_shift(pos_profile=TEST_POS_PROFILE, posting_date=nowdate())
+
+		self._assert_totals_equal(actual, expected)
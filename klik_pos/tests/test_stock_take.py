@@ -0,0 +1,206 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from klik_pos.api.stock_reconciliation import stock_take, validate_stock_take_rows
+
+
+def _item(name, has_batch_no=0, has_serial_no=0, bin_rate=0, rate=0):
+	return frappe._dict(
+		name=name,
+		has_batch_no=has_batch_no,
+		has_serial_no=has_serial_no,
+		is_stock_item=1,
+		disabled=0,
+		valuation_rate=rate,
+		bin_valuation_rate=bin_rate,
+	)
+
+
+class TestStockTakeValidation(FrappeTestCase):
+	"""Test set-based validation and batch resolution of stock take rows"""
+
+	@patch("klik_pos.api.stock_reconciliation._create_stock_take_batches")
+	@patch("klik_pos.api.stock_reconciliation._fetch_batch_balances")
+	@patch("klik_pos.api.stock_reconciliation.frappe.db.sql")
+	def test_rows_are_resolved_with_set_queries(self, mock_sql, mock_balances, mock_create_batches):
+		mock_sql.side_effect = [
+			[
+				_item("PLAIN", bin_rate=4),
+				_item("ONE-BATCH", has_batch_no=1),
+				_item("TWO-BATCHES", has_batch_no=1),
+				_item("NO-BATCH", has_batch_no=1, rate=2),
+				_item("SERIAL", has_serial_no=1),
+			],
+			[
+				frappe._dict(name="B-1", item="ONE-BATCH"),
+				frappe._dict(name="B-2", item="TWO-BATCHES"),
+				frappe._dict(name="B-3", item="TWO-BATCHES"),
+			],
+		]
+		mock_balances.return_value = {
+			"ONE-BATCH": [{"batch_id": "B-1", "qty": 5, "expiry_date": None}],
+			"TWO-BATCHES": [
+				{"batch_id": "B-2", "qty": 1, "expiry_date": None},
+				{"batch_id": "B-3", "qty": 1, "expiry_date": None},
+			],
+		}
+
+		rows = [
+			{"item_code": "PLAIN", "qty": 10},
+			{"item_code": "ONE-BATCH", "qty": 3},
+			{"item_code": "TWO-BATCHES", "qty": 3},
+			{"item_code": "TWO-BATCHES", "qty": 2, "batch_no": "B-3"},
+			{"item_code": "NO-BATCH", "qty": 1},
+			{"item_code": "SERIAL", "qty": 1},
+			{"item_code": "PLAIN", "qty": 4},
+			{"item_code": "MISSING", "qty": 1},
+			{"item_code": "PLAIN", "qty": -1},
+		]
+
+		valid, errors = validate_stock_take_rows(rows, "Stores - _TC")
+
+		resolved = {(row["item_code"], row["batch_no"]): row for row in valid}
+		self.assertEqual(resolved[("PLAIN", None)]["valuation_rate"], 4)
+		self.assertIn(("ONE-BATCH", "B-1"), resolved)
+		self.assertIn(("TWO-BATCHES", "B-3"), resolved)
+		self.assertEqual(len(valid), 4)
+		self.assertEqual(sorted(error["row"] for error in errors), [3, 6, 7, 8, 9])
+
+		self.assertEqual(mock_sql.call_count, 2)
+		mock_balances.assert_called_once()
+		new_batch_rows = mock_create_batches.call_args[0][0]
+		self.assertEqual([row["item_code"] for row in new_batch_rows], ["NO-BATCH"])
+
+
+def _fake_submit(failing_item=None, document_error=None):
+	"""Stand-in for submit_stock_reconciliations that rejects chunks holding failing_item."""
+	calls = []
+
+	def submit(company, rows, chunk_size, **kwargs):
+		results = []
+		for start in range(0, len(rows), chunk_size):
+			chunk = rows[start : start + chunk_size]
+			calls.append(len(chunk))
+			error = document_error
+			if any(row["item_code"] == failing_item for row in chunk):
+				error = f"{failing_item} cannot be reconciled"
+			results.append(
+				{
+					"name": None if error else f"MAT-RECO-{len(calls)}",
+					"rows": list(range(start, start + len(chunk))),
+					"error": error,
+					"unchanged": False,
+				}
+			)
+		return results
+
+	return submit, calls
+
+
+class TestStockTakePosting(FrappeTestCase):
+	"""Test that a rejected chunk only fails the rows ERPNext rejects"""
+
+	def _rows(self, count):
+		return [
+			{
+				"row": index,
+				"item_code": f"ITEM-{index}",
+				"warehouse": "Stores - _TC",
+				"qty": 1,
+				"batch_no": None,
+			}
+			for index in range(1, count + 1)
+		]
+
+	@patch("klik_pos.api.stock_reconciliation.frappe.db.get_value", return_value="_Test Company")
+	@patch("klik_pos.api.stock_reconciliation.validate_stock_take_rows")
+	def test_failed_chunk_is_split_down_to_the_bad_row(self, mock_validate, mock_get_value):
+		mock_validate.return_value = (self._rows(8), [])
+		submit, calls = _fake_submit(failing_item="ITEM-6")
+
+		with patch("klik_pos.api.stock_reconciliation.submit_stock_reconciliations", side_effect=submit):
+			result = stock_take([], "Stores - _TC")
+
+		self.assertEqual(result["posted"], 7)
+		self.assertEqual([error["row"] for error in result["errors"]], [6])
+		self.assertEqual(calls, [8, 4, 4, 2, 2, 1, 1])
+
+	@patch("klik_pos.api.stock_reconciliation.frappe.db.get_value", return_value="_Test Company")
+	@patch("klik_pos.api.stock_reconciliation.validate_stock_take_rows")
+	def test_document_error_is_not_split_row_by_row(self, mock_validate, mock_get_value):
+		mock_validate.return_value = (self._rows(8), [])
+		submit, calls = _fake_submit(document_error="Posting date is in a closed accounting period")
+
+		with patch("klik_pos.api.stock_reconciliation.submit_stock_reconciliations", side_effect=submit):
+			result = stock_take([], "Stores - _TC")
+
+		self.assertEqual(result["posted"], 0)
+		self.assertEqual(len(result["errors"]), 8)
+		self.assertEqual(calls, [8, 4, 4])
+
+
+class _FakeTransaction:
+	"""Batches and reconciliations that live or die with commit and rollback, like the database."""
+
+	def __init__(self, failing_item):
+		self.failing_item = failing_item
+		self.committed_batches = set()
+		self.pending_batches = set()
+		self.reconciliations = []
+
+	def commit(self):
+		self.committed_batches |= self.pending_batches
+		self.pending_batches = set()
+
+	def rollback(self):
+		self.pending_batches = set()
+
+	def get_doc(self, values):
+		doc = frappe._dict(values)
+		if values["doctype"] == "Batch":
+			doc.insert = lambda **kwargs: self.pending_batches.add(values["batch_id"])
+		else:
+			doc.insert = lambda **kwargs: self._insert_reconciliation(doc)
+			doc.submit = lambda: None
+		return doc
+
+	def _insert_reconciliation(self, doc):
+		for item in doc["items"]:
+			if item["item_code"] == self.failing_item:
+				raise frappe.ValidationError(f"{self.failing_item} cannot be reconciled")
+			batch_no = item.get("batch_no")
+			if batch_no and batch_no not in self.committed_batches | self.pending_batches:
+				raise frappe.ValidationError(f"Batch {batch_no} not found")
+		self.reconciliations.append(doc)
+		doc.name = f"MAT-RECO-{len(self.reconciliations)}"
+
+
+class TestStockTakeNewBatches(FrappeTestCase):
+	"""Test that batches created for a stock take survive a failing chunk"""
+
+	@patch("klik_pos.api.stock_reconciliation.frappe.log_error")
+	@patch("klik_pos.api.stock_reconciliation.frappe.db.get_value", return_value="_Test Company")
+	@patch("klik_pos.api.stock_reconciliation._fetch_batch_balances", return_value={})
+	@patch("klik_pos.api.stock_reconciliation.frappe.db.sql")
+	def test_row_with_new_batch_posts_after_its_chunk_fails(
+		self, mock_sql, mock_balances, mock_get_value, mock_log_error
+	):
+		mock_sql.side_effect = [[_item("NEW-BATCH", has_batch_no=1, rate=1), _item("BAD", rate=1)], []]
+		transaction = _FakeTransaction(failing_item="BAD")
+
+		with (
+			patch("klik_pos.api.stock_reconciliation.frappe.get_doc", side_effect=transaction.get_doc),
+			patch("klik_pos.api.stock_reconciliation.frappe.db.commit", side_effect=transaction.commit),
+			patch("klik_pos.api.stock_reconciliation.frappe.db.rollback", side_effect=transaction.rollback),
+		):
+			result = stock_take(
+				[{"item_code": "NEW-BATCH", "qty": 5}, {"item_code": "BAD", "qty": 1}], "Stores - _TC"
+			)
+
+		self.assertEqual(result["posted"], 1)
+		self.assertEqual([error["row"] for error in result["errors"]], [2])
+		posted_item = transaction.reconciliations[0]["items"][0]
+		self.assertEqual(posted_item["item_code"], "NEW-BATCH")
+		self.assertIn(posted_item["batch_no"], transaction.committed_batches)
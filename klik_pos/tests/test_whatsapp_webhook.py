@@ -0,0 +1,51 @@
+import json
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from klik_pos.api.whatsap.webhook import STATUS_RANK, _apply_events
+
+
+def _status(message_id, status, timestamp, conversation=None):
+	status = {"id": message_id, "status": status, "timestamp": str(timestamp)}
+	if conversation:
+		status["conversation"] = {"id": conversation}
+	return status
+
+
+class TestWhatsAppWebhook(FrappeTestCase):
+	"""Test batched application of stored webhook payloads"""
+
+	@patch("klik_pos.api.whatsap.webhook._set_event_status")
+	@patch("klik_pos.api.whatsap.webhook._insert_incoming_messages")
+	@patch("klik_pos.api.whatsap.webhook.frappe.db.sql")
+	def test_statuses_of_all_payloads_are_applied_in_one_update(self, mock_sql, mock_insert, mock_set_status):
+		payloads = [
+			{"entry": [{"changes": [{"field": "messages", "value": {"statuses": statuses}}]}]}
+			for statuses in (
+				[_status("wamid.1", "sent", 100, "conv.1"), _status("wamid.2", "sent", 100)],
+				[_status("wamid.1", "read", 110), _status("wamid.2", "delivered", 104)],
+				# Meta redelivered an older receipt after a timeout
+				[_status("wamid.1", "delivered", 105)],
+			)
+		]
+		events = [frappe._dict(name=f"EV-{i}", payload=json.dumps(p)) for i, p in enumerate(payloads)]
+
+		_apply_events(events)
+
+		self.assertEqual(mock_sql.call_count, 1)
+		params = mock_sql.call_args[0][1]
+		receipts = {
+			params[f"id_{i}"]: (params[f"status_{i}"], params[f"rank_{i}"], params[f"conversation_{i}"])
+			for i in range(2)
+		}
+		self.assertEqual(
+			receipts,
+			{
+				"wamid.1": ("read", STATUS_RANK["read"], "conv.1"),
+				"wamid.2": ("delivered", STATUS_RANK["delivered"], None),
+			},
+		)
+		self.assertEqual(sorted(params["message_ids"]), ["wamid.1", "wamid.2"])
+		mock_set_status.assert_called_once_with(["EV-0", "EV-1", "EV-2"], "Processed")
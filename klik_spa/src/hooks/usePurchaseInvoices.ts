@@ -1,4 +1,4 @@
-import { useEffect, useState, useCallback } from "react";
+import { useEffect, useState, useCallback, useRef } from "react";
 import type { PurchaseInvoice, PurchaseInvoiceItem } from "../../types";
 
 export function usePurchaseInvoices(
@@ -13,6 +13,8 @@ export function usePurchaseInvoices(
   const [currentPage, setCurrentPage] = useState(0);
   const [totalLoaded, setTotalLoaded] = useState(0);
   const [totalCount, setTotalCount] = useState(0);
+  // Keyset cursor of the next page, so deep pages do not scan skipped rows
+  const nextCursorRef = useRef<string | null>(null);
 
   const LIMIT = 100;
 
@@ -47,8 +49,12 @@ export function usePurchaseInvoices(
           userName && userName !== "all"
             ? `&user_name=${encodeURIComponent(userName)}`
             : "";
+        const cursorParam =
+          append && nextCursorRef.current
+            ? `&cursor=${encodeURIComponent(nextCursorRef.current)}`
+            : "";
         const response = await fetch(
-          `/api/method/klik_pos.api.purchase_invoice.get_purchase_invoices?limit=${LIMIT}&start=${start}${searchParam}${userParam}`,
+          `/api/method/klik_pos.api.purchase_invoice.get_purchase_invoices?limit=${LIMIT}&start=${start}${searchParam}${userParam}${cursorParam}`,
           {
             method: "GET",
             headers: {
@@ -73,6 +79,7 @@ export function usePurchaseInvoices(
         const rawInvoices = resData.message.data;
         const newInvoicesCount = rawInvoices.length;
         const totalCountFromAPI = resData.message.total_count || 0;
+        nextCursorRef.current = resData.message.next_cursor || null;
 
         // Check if we have more invoices to load
         setHasMore(newInvoicesCount === LIMIT);
@@ -256,6 +256,10 @@ const optimizeImage = (file: File): Promise<string> => {
 const commonUOMs = ["Nos", "Kg", "Gram", "Liter", "ML", "Box", "Pack", "Dozen", "Piece", "Unit"]
 const itemGroups = ["Products", "Services", "Raw Materials", "Consumables", "Sub Assemblies"]
 
+// Background item export polling
+const EXPORT_POLL_INTERVAL_MS = 1500
+const EXPORT_TIMEOUT_MS = 10 * 60 * 1000
+
 export default function ItemsPage() {
   const navigate = useNavigate()
   const [searchParams] = useSearchParams()
@@ -693,134 +697,63 @@ export default function ItemsPage() {
     }
   }
 
-  // Export all items to CSV
+  // Export all items to CSV: the server streams the catalog to a private File in a background job
   const handleExportCSV = async () => {
     setIsExporting(true)
     
     try {
-      // Fetch all items with complete details for export
-      const response = await fetch('/api/method/klik_pos.api.item.get_items_for_export', {
+      const startResponse = await fetch('/api/method/klik_pos.api.item_export.start_item_export', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({}),
+        body: JSON.stringify({ file_format: 'csv' }),
         credentials: 'include'
       })
+      const started = await startResponse.json()
+      const jobId: string | undefined = started.message?.job_id
+      if (!startResponse.ok || !jobId) {
+        throw new Error(started.exc || 'Failed to start export')
+      }
       
-      const data = await response.json()
+      toast.info('Preparing export...', { autoClose: 2000, toastId: 'item-export' })
       
-      let exportItems: Array<{
-        item_code: string
-        item_name: string
-        barcode: string
-        selling_price: number
-        buying_price: number
-        stock_qty: number
-        uom: string
-        shelf_life_in_days: number | null
-        item_group: string
-        has_batch_no: number
-        has_expiry_date: number
-      }> = []
+      // Poll the job until the File is ready
+      const deadline = Date.now() + EXPORT_TIMEOUT_MS
+      let job: { status: string; processed?: number; file_url?: string; error?: string } = { status: 'queued' }
+      while (job.status === 'queued' || job.status === 'running') {
+        if (Date.now() > deadline) {
+          throw new Error('Export is taking longer than expected. Please try again later.')
+        }
+        await new Promise(resolve => setTimeout(resolve, EXPORT_POLL_INTERVAL_MS))
+        const statusResponse = await fetch(
+          `/api/method/klik_pos.api.item_export.get_item_export_status?job_id=${encodeURIComponent(jobId)}`,
+          { credentials: 'include' }
+        )
+        const statusData = await statusResponse.json()
+        job = statusData.message || { status: 'failed' }
+      }
       
-      if (data.message?.items && data.message.items.length > 0) {
-        exportItems = data.message.items
-      } else {
-        // Fallback: use existing items list with available data
-        // Apply current search filter
-        const itemsToExport = localSearchQuery 
-          ? items.filter(item => 
-              item.item_name?.toLowerCase().includes(localSearchQuery.toLowerCase()) ||
-              item.item_code?.toLowerCase().includes(localSearchQuery.toLowerCase()) ||
-              item.barcode?.toLowerCase().includes(localSearchQuery.toLowerCase())
-            )
-          : items
-        
-        exportItems = itemsToExport.map(item => ({
-          item_code: item.item_code,
-          item_name: item.item_name,
-          barcode: item.barcode || '',
-          selling_price: item.price || 0,
-          buying_price: item.buying_price || 0,
-          stock_qty: item.available || 0,
-          uom: 'Nos', // Default if not available
-          shelf_life_in_days: null,
-          item_group: 'Products',
-          has_batch_no: 0,
-          has_expiry_date: 0
-        }))
+      if (job.status !== 'completed' || !job.file_url) {
+        throw new Error(job.error || 'Failed to export items')
       }
       
-      if (exportItems.length === 0) {
+      if (!job.processed) {
         toast.warning('No items to export')
         return
       }
       
-      // CSV headers
-      const headers = [
-        'Item Code',
-        'Item Name',
-        'Barcode',
-        'Selling Price',
-        'Buying Price',
-        'Stock Qty',
-        'UOM',
-        'Shelf Life (Days)',
-        'Item Group',
-        'Batch Tracked',
-        'Expiry Tracked'
-      ]
-      
-      // Escape CSV values (handle commas, quotes, newlines)
-      const escapeCSV = (value: string | number | null | undefined): string => {
-        const strValue = String(value ?? '')
-        if (strValue.includes(',') || strValue.includes('"') || strValue.includes('\n')) {
-          return `"${strValue.replace(/"/g, '""')}"`
-        }
-        return strValue
-      }
-      
-      // Build CSV rows
-      const csvRows = exportItems.map(item => [
-        escapeCSV(item.item_code),
-        escapeCSV(item.item_name),
-        escapeCSV(item.barcode),
-        escapeCSV(item.selling_price?.toFixed(2) || '0.00'),
-        escapeCSV(item.buying_price?.toFixed(2) || '0.00'),
-        escapeCSV(item.stock_qty?.toString() || '0'),
-        escapeCSV(item.uom),
-        escapeCSV(item.shelf_life_in_days?.toString() || ''),
-        escapeCSV(item.item_group),
-        escapeCSV(item.has_batch_no ? 'Yes' : 'No'),
-        escapeCSV(item.has_expiry_date ? 'Yes' : 'No')
-      ].join(','))
-      
-      // Build CSV content
-      const csvContent = [
-        headers.map(escapeCSV).join(','),
-        ...csvRows
-      ].join('\n')
-      
-      // Create blob and download
-      const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' })
       const link = document.createElement('a')
-      const url = URL.createObjectURL(blob)
-      
-      // Generate filename with date
-      const date = new Date().toISOString().split('T')[0]
-      const filename = `items_export_${date}.csv`
-      
-      link.setAttribute('href', url)
-      link.setAttribute('download', filename)
+      link.setAttribute('href', job.file_url)
+      link.setAttribute('download', `items_export_${new Date().toISOString().split('T')[0]}.csv`)
       link.style.visibility = 'hidden'
       document.body.appendChild(link)
       link.click()
       document.body.removeChild(link)
-      URL.revokeObjectURL(url)
       
-      toast.success(`Exported ${exportItems.length} items to CSV`)
+      toast.success(`Exported ${job.processed} items to CSV`)
     } catch (err) {
       console.error('Export error:', err)
-      toast.error('Failed to export items')
+      const errorMessage = err instanceof Error ? err.message : 'Failed to export items'
+      toast.error(errorMessage)
     } finally {
       setIsExporting(false)
     }
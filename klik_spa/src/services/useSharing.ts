@@ -16,7 +16,7 @@ export async function sendEmails(data: any) {
   const result = await response.json();
   console.log("Send email result:", result);
 
-  if (!response.ok || !result.message || result.message.status !== "success") {
+  if (!response.ok || !result.message || !["success", "queued"].includes(result.message.status)) {
     const serverMsg = result._server_messages
       ? JSON.parse(result._server_messages)[0]
       : 'Failed to send email';
@@ -63,7 +63,7 @@ export async function sendWhatsAppMessage(data: WhatsAppData) {
   const result = await response.json();
   console.log("Send Simple WhatsApp result:", result);
 
-  if (!response.ok || !result.message || result.message.status !== "success") {
+  if (!response.ok || !result.message || !["success", "queued"].includes(result.message.status)) {
     const serverMsg = result._server_messages
       ? JSON.parse(result._server_messages)[0]
       : 'Failed to send WhatsApp message';
@@ -100,7 +100,7 @@ export async function sendTemplateWhatsApp(mobile: string, templateName: string,
   const result = await response.json();
   console.log("Send Template WhatsApp result:", result);
 
-  if (!response.ok || !result.message || result.message.status !== "success") {
+  if (!response.ok || !result.message || !["success", "queued"].includes(result.message.status)) {
     const serverMsg = result._server_messages
       ? JSON.parse(result._server_messages)[0]
       : 'Failed to send WhatsApp message';
@@ -129,7 +129,7 @@ export async function sendSMSMessage(data: { mobile_no: string; message: string;
   const result = await response.json();
   console.log("Send SMS result:", result);
 
-  if (!response.ok || !result.message || result.message.status !== "success") {
+  if (!response.ok || !result.message || !["success", "queued"].includes(result.message.status)) {
     const serverMsg = result._server_messages
       ? JSON.parse(result._server_messages)[0]
       : 'Failed to send SMS message';
@@ -158,7 +158,7 @@ export async function sendInvoiceSMS(data: { mobile_no: string; customer_name: s
   const result = await response.json();
   console.log("Send Invoice SMS result:", result);
 
-  if (!response.ok || !result.message || result.message.status !== "success") {
+  if (!response.ok || !result.message || !["success", "queued"].includes(result.message.status)) {
     const serverMsg = result._server_messages
       ? JSON.parse(result._server_messages)[0]
       : 'Failed to send invoice SMS message';
@@ -195,7 +195,7 @@ export async function sendInvoiceWithPDF(mobile: string, invoiceNo: string, mess
   const result = await response.json();
   console.log("Send Invoice PDF result:", result);
 
-  if (!response.ok || !result.message || result.message.status !== "success") {
+  if (!response.ok || !result.message || !["success", "queued"].includes(result.message.status)) {
     const serverMsg = result._server_messages
       ? JSON.parse(result._server_messages)[0]
       : 'Failed to send invoice WhatsApp message';
@@ -234,7 +234,7 @@ export async function sendInvoiceWhatsApp(data: {
   const result = await response.json();
   console.log("Frontend Invoice WhatsApp result:", result);
 
-  if (!response.ok || !result.message || result.message.status !== "success") {
+  if (!response.ok || !result.message || !["success", "queued"].includes(result.message.status)) {
     const serverMsg = result._server_messages
       ? JSON.parse(result._server_messages)[0]
       : 'Failed to send invoice WhatsApp message';